@@ -50,7 +50,7 @@ class FinanceAgent(Agent):
                 "portfolio_id": portfolio_id,
                 "risk_level": risk_assessment["risk_level"],
                 "factors": risk_assessment["risk_factors"]
-            }, priority=TaskPriority.HIGH)
+            }, priority=TaskPriority.HIGH, affinity_key=f"portfolio:{portfolio_id}")
         
         return risk_assessment
 
@@ -32,7 +32,7 @@ class HealthcareAgent(Agent):
                 "type": "vital_alert",
                 "patient_id": patient_id,
                 "alerts": analysis["alerts"]
-            }, priority=TaskPriority.HIGH)
+            }, priority=TaskPriority.HIGH, affinity_key=f"patient:{patient_id}")
         
         return analysis
 
@@ -1,25 +1,44 @@
 """Monitoring Agent Module for Magnatronic Multi-Agent System"""
 
+import asyncio
+import os
 import time
-from typing import Dict, Any
+from typing import Dict, Any, Iterable, Optional
 from ..core.agent import BaseAgent
+from ..core.alert_store import AlertStore
 from ..core.communication import MessageBroker
+from ..core.rolling_counter import EventRateTracker, RateThreshold
 from ..core.task_queue import TaskQueue, TaskPriority
 
+# Alert types also tracked as security events
+SECURITY_ALERT_TYPES = ('failed_login', 'suspicious_activity')
+
+# Security event rates that raise an alert as soon as they are exceeded
+DEFAULT_SECURITY_THRESHOLDS = (
+    RateThreshold('failed_login', window=60, limit=10, severity='error'),
+    RateThreshold('failed_login', window=3600, limit=100, severity='critical'),
+    RateThreshold('suspicious_activity', window=300, limit=3, severity='critical')
+)
+
 class MonitoringAgent(BaseAgent):
     """Agent responsible for system performance monitoring, conflict detection, and resource management"""
 
-    def __init__(self, agent_id: str = None):
+    def __init__(self, agent_id: str = None, security_thresholds: Optional[Iterable[RateThreshold]] = None):
         super().__init__(agent_id, name="monitoring_agent")
+        self.security_rates = EventRateTracker(
+            windows=(60, 3600),
+            thresholds=DEFAULT_SECURITY_THRESHOLDS if security_thresholds is None else security_thresholds
+        )
         self.message_broker = MessageBroker()
         self.task_queue = TaskQueue()
+        self._process_sampler = None  # Created on first use; keeps psutil handles between passes
         self.state.update({
             "system_metrics": {},
-            "active_alerts": [],
+            "active_alerts": AlertStore(),
             "resource_usage": {},
             "agent_status": {},
             "healthcare_metrics": {},
-            "security_alerts": [],
+            "security_alerts": AlertStore(default_ttl=3600),  # Keep last hour
             "it_systems_status": {},
             "task_queue": [],
             "central_repository": {}
@@ -88,9 +107,8 @@ class MonitoringAgent(BaseAgent):
         try:
             # Simulate monitoring patient vital signs
             metrics['active_patients'] = len(self.state.get('healthcare_metrics', {}))
-            metrics['critical_alerts'] = sum(1 for alert in self.state['active_alerts'] 
-                                          if alert.get('priority') == 'critical' and 
-                                          alert.get('type') == 'healthcare')
+            self._clean_expired_alerts()
+            metrics['critical_alerts'] = self.state['active_alerts'].count('healthcare', 'critical')
 
             self.state['healthcare_metrics'] = metrics
             return {"status": "success", "metrics": metrics}
@@ -105,15 +123,12 @@ class MonitoringAgent(BaseAgent):
         """
         metrics = {}
         try:
-            # Monitor security-related metrics
-            metrics['failed_login_attempts'] = len([alert for alert in self.state['security_alerts'] 
-                                                  if alert.get('type') == 'failed_login'])
-            metrics['suspicious_activities'] = len([alert for alert in self.state['security_alerts'] 
-                                                  if alert.get('type') == 'suspicious_activity'])
-
-            # Update security alerts
-            self.state['security_alerts'] = [alert for alert in self.state['security_alerts'] 
-                                           if time.time() - alert.get('timestamp', 0) < 3600]  # Keep last hour
+            # Security event counts over the last hour, kept up to date on ingest
+            now = time.time()
+            self._clean_expired_alerts()
+            metrics['failed_login_attempts'] = self.security_rates.count('failed_login', 3600, now)
+            metrics['suspicious_activities'] = self.security_rates.count('suspicious_activity', 3600, now)
+            metrics['event_rates'] = self.security_rates.snapshot(now)
 
             return {"status": "success", "metrics": metrics}
         except Exception as e:
@@ -128,7 +143,7 @@ class MonitoringAgent(BaseAgent):
         try:
             self.state['central_repository'].update(data)
         except Exception as e:
-            self.state['active_alerts'].append({
+            self.state['active_alerts'].add({
                 "type": "repository_error",
                 "message": f"Failed to update central repository: {str(e)}",
                 "timestamp": time.time()
@@ -145,7 +160,7 @@ class MonitoringAgent(BaseAgent):
             # Implement task delegation logic here
             # This would involve communicating with other agents
         except Exception as e:
-            self.state['active_alerts'].append({
+            self.state['active_alerts'].add({
                 "type": "task_delegation_error",
                 "message": f"Failed to delegate task: {str(e)}",
                 "timestamp": time.time()
@@ -195,17 +210,29 @@ class MonitoringAgent(BaseAgent):
         
         # Monitor CPU and memory usage
         try:
-            import psutil
-            metrics['cpu_percent'] = psutil.cpu_percent(interval=1)
-            metrics['memory_percent'] = psutil.virtual_memory().percent
-            metrics['disk_usage'] = psutil.disk_usage('/').percent
+            from ..core.system_sampler import ProcessSampler, get_system_sampler
+            snapshot = get_system_sampler().latest
+            metrics['cpu_percent'] = snapshot.cpu_percent
+            metrics['memory_percent'] = snapshot.memory_percent
+            metrics['disk_usage'] = snapshot.disk_percent
+            
+            # Sample every agent process in one pass, off the event loop
+            if self._process_sampler is None:
+                self._process_sampler = ProcessSampler()
+            agent_pids = {
+                agent_id: status.get('pid') or os.getpid()
+                for agent_id, status in self.state['agent_status'].items()
+            }
+            processes = await asyncio.get_running_loop().run_in_executor(
+                None, self._process_sampler.sample, list(agent_pids.values())
+            )
             
             # Monitor per-agent performance
             for agent_id, status in self.state['agent_status'].items():
-                process = psutil.Process(status.get('pid'))
+                process = processes.get(agent_pids[agent_id])
                 metrics[f'agent_{agent_id}'] = {
-                    'cpu_percent': process.cpu_percent(),
-                    'memory_usage': process.memory_info().rss / 1024 / 1024,  # MB
+                    'cpu_percent': process.cpu_percent if process else None,
+                    'memory_usage': process.memory_rss / 1024 / 1024 if process else None,  # MB
                     'request_count': status.get('request_count', 0),
                     'error_count': status.get('error_count', 0),
                     'avg_processing_time': status.get('avg_processing_time', 0)
@@ -277,12 +304,11 @@ class MonitoringAgent(BaseAgent):
             Dict[str, Any]: Resource management results
         """
         try:
-            import psutil
+            from ..core.system_sampler import get_system_sampler
             
-            # Get current resource usage
-            cpu_usage = psutil.cpu_percent(interval=1, percpu=True)
-            memory = psutil.virtual_memory()
-            disk = psutil.disk_usage('/')
+            # Get current resource usage from the background sampler
+            snapshot = get_system_sampler().latest
+            cpu_usage = list(snapshot.per_cpu_percent)
             
             # Update resource usage state
             self.state['resource_usage'] = {
@@ -291,24 +317,24 @@ class MonitoringAgent(BaseAgent):
                     'per_cpu': cpu_usage
                 },
                 'memory': {
-                    'total': memory.total,
-                    'available': memory.available,
-                    'percent': memory.percent
+                    'total': snapshot.memory_total,
+                    'available': snapshot.memory_available,
+                    'percent': snapshot.memory_percent
                 },
                 'disk': {
-                    'total': disk.total,
-                    'used': disk.used,
-                    'free': disk.free,
-                    'percent': disk.percent
+                    'total': snapshot.disk_total,
+                    'used': snapshot.disk_used,
+                    'free': snapshot.disk_free,
+                    'percent': snapshot.disk_percent
                 },
-                'timestamp': time.time()
+                'timestamp': snapshot.timestamp
             }
             
             # Basic resource optimization logic
             recommendations = []
-            if memory.percent > 90:
+            if snapshot.memory_percent > 90:
                 recommendations.append("High memory usage detected - consider freeing up memory")
-            if disk.percent > 90:
+            if snapshot.disk_percent > 90:
                 recommendations.append("Low disk space - cleanup recommended")
             
             return {
@@ -339,6 +365,7 @@ class MonitoringAgent(BaseAgent):
             message (Dict[str, Any]): Alert message containing severity and details
         """
         alert_data = {
+            'type': message.get('alert_type', 'general'),
             'source': message.get('source', 'unknown'),
             'severity': message.get('severity', 'info'),
             'message': message.get('message', ''),
@@ -350,10 +377,61 @@ class MonitoringAgent(BaseAgent):
         alert_data['expires_at'] = time.time() + (
             3600 if alert_data['severity'] in ['critical', 'error'] else 1800
         )
-        self.state['active_alerts'].append(alert_data)
+        self.state['active_alerts'].add(alert_data)
         
         # Clean expired alerts
         self._clean_expired_alerts()
         
         # Process alert based on severity
-        await self._process_alert(alert_data)
\ No newline at end of file
+        await self._process_alert(alert_data)
+
+    def _clean_expired_alerts(self) -> None:
+        """Remove active and security alerts whose expiry time has passed."""
+        now = time.time()
+        self.state['active_alerts'].expire(now)
+        self.state['security_alerts'].expire(now)
+
+    async def _process_alert(self, alert_data: Dict[str, Any]) -> None:
+        """Route an alert by type and severity.
+
+        Security alerts are also tracked for the last hour and counted
+        against the security rate thresholds, and critical alerts are
+        delegated as response tasks.
+
+        Args:
+            alert_data (Dict[str, Any]): Alert that was just added
+        """
+        if alert_data['type'] in SECURITY_ALERT_TYPES:
+            self.state['security_alerts'].add({
+                key: value for key, value in alert_data.items() if key not in ('id', 'expires_at')
+            })
+            for threshold, count in self.security_rates.record(alert_data['type'], alert_data['timestamp']):
+                await self._raise_rate_alert(threshold, count)
+        if alert_data['severity'] == 'critical':
+            await self.delegate_task({
+                'type': 'alert_response',
+                'alert_id': alert_data['id'],
+                'source': alert_data['source'],
+                'message': alert_data['message']
+            })
+
+    async def _raise_rate_alert(self, threshold: RateThreshold, count: int) -> None:
+        """Raise an alert for an exceeded security event rate.
+
+        Args:
+            threshold (RateThreshold): Threshold that was exceeded
+            count (int): Events in the threshold's window
+        """
+        now = time.time()
+        alert_data = {
+            'type': 'security_rate',
+            'source': self.agent_id,
+            'severity': threshold.severity,
+            'message': f"{count} {threshold.event_type} events in the last {threshold.window:g}s "
+                       f"(limit {threshold.limit})",
+            'timestamp': now,
+            'expires_at': now + threshold.window,
+            'context': {'event_type': threshold.event_type, 'window': threshold.window, 'count': count}
+        }
+        self.state['active_alerts'].add(alert_data)
+        await self._process_alert(alert_data)
@@ -1,10 +1,14 @@
 from typing import Dict, List, Optional
 from ..core.agent import Agent
+from ..core.quantiles import LatencySketch
 from transformers import pipeline, AutoTokenizer, AutoModelForSeq2SeqTransummarization
 from nltk import ne_chunk, pos_tag, word_tokenize
 from nltk.tree import Tree
 import nltk
 
+# Processing times per sketch; reported figures cover the last one to two windows
+PROCESSING_WINDOW = 100
+
 class NLPAgent(Agent):
     """Natural Language Processing Agent for handling various NLP tasks."""
 
@@ -18,7 +22,8 @@ class NLPAgent(Agent):
         self.performance_metrics = {
             'request_count': 0,
             'error_count': 0,
-            'processing_times': []
+            'processing_times': LatencySketch(),
+            'previous_processing_times': LatencySketch()
         }
         self._initialize_models()
         self._start_performance_monitoring()
@@ -45,7 +50,8 @@ class NLPAgent(Agent):
         self.performance_metrics = {
             'request_count': 0,
             'error_count': 0,
-            'processing_times': [],
+            'processing_times': LatencySketch(),
+            'previous_processing_times': LatencySketch(),
             'last_update': time.time()
         }
 
@@ -54,14 +60,15 @@ class NLPAgent(Agent):
         self.performance_metrics['request_count'] += 1
         if error:
             self.performance_metrics['error_count'] += 1
-        self.performance_metrics['processing_times'].append(processing_time)
-        
-        # Keep only last 100 processing times
-        if len(self.performance_metrics['processing_times']) > 100:
-            self.performance_metrics['processing_times'].pop(0)
-        
-        # Calculate average processing time
-        avg_time = sum(self.performance_metrics['processing_times']) / len(self.performance_metrics['processing_times'])
+        current = self.performance_metrics['processing_times']
+        current.add(processing_time)
+        if current.count >= PROCESSING_WINDOW:
+            # Rotate so old requests age out, as the previous last-100 list did
+            self.performance_metrics['previous_processing_times'] = current
+            self.performance_metrics['processing_times'] = LatencySketch()
+        processing_times = LatencySketch()
+        processing_times.merge(self.performance_metrics['previous_processing_times'])
+        processing_times.merge(self.performance_metrics['processing_times'])
         
         # Send metrics to monitoring agent
         await self.message_broker.send_message(
@@ -72,7 +79,10 @@ class NLPAgent(Agent):
                 'metrics': {
                     'request_count': self.performance_metrics['request_count'],
                     'error_count': self.performance_metrics['error_count'],
-                    'avg_processing_time': avg_time,
+                    'avg_processing_time': processing_times.mean,
+                    'p50_processing_time': processing_times.quantile(0.5),
+                    'p95_processing_time': processing_times.quantile(0.95),
+                    'p99_processing_time': processing_times.quantile(0.99),
                     'timestamp': time.time()
                 }
             }
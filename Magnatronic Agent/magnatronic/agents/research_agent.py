@@ -1,6 +1,6 @@
 """Research Agent Module for Magnatronic Multi-Agent System"""
 
-from typing import Dict, List, Any
+from typing import Dict, List, Any, AsyncIterator
 from ..core.agent import BaseAgent
 from .research.news_aggregator import NewsAggregator
 from .research.market_analyzer import MarketAnalyzer
@@ -48,6 +48,41 @@ class ResearchAgent(BaseAgent):
         else:
             raise ValueError(f"Unknown task type: {task_type}")
 
+    async def stream_task(self, task: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        """Process a research task, yielding each article or paper as soon as it is processed.
+
+        Args:
+            task (Dict[str, Any]): Task data containing research parameters and requirements
+
+        Yields:
+            Dict[str, Any]: Partial events followed by the final result event
+        """
+        task_type = task.get("type")
+        if task_type == "news_research":
+            events = self._stream_news_research(task)
+        elif task_type == "academic_research":
+            events = self._stream_academic_research(task)
+        else:
+            events = super().stream_task(task)
+
+        async for event in events:
+            yield event
+
+    async def _collect_result(self, events: AsyncIterator[Dict[str, Any]]) -> Dict[str, Any]:
+        """Drain an event stream and return its final result.
+
+        Args:
+            events (AsyncIterator[Dict[str, Any]]): Stream of partial and result events
+
+        Returns:
+            Dict[str, Any]: Data of the final result event
+        """
+        result: Dict[str, Any] = {}
+        async for event in events:
+            if event["type"] == "result":
+                result = event["data"]
+        return result
+
     async def _conduct_news_research(self, task: Dict[str, Any]) -> Dict[str, Any]:
         """Conduct news research and gather credible information.
 
@@ -57,22 +92,37 @@ class ResearchAgent(BaseAgent):
         Returns:
             Dict[str, Any]: News research results
         """
+        return await self._collect_result(self._stream_news_research(task))
+
+    async def _stream_news_research(self, task: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        """Conduct news research, yielding each article once it is fact-checked.
+
+        Args:
+            task (Dict[str, Any]): News research parameters
+
+        Yields:
+            Dict[str, Any]: One partial event per article, then the news research results
+        """
         query = task.get("query")
         timeframe = task.get("timeframe", "24h")
         
         articles = await self.news_aggregator.gather_news(query, timeframe)
-        summary = await self.news_aggregator.summarize_articles(articles)
+        # Summarized as gathered, before fact-checking adds to each article
+        originals = [dict(article) for article in articles]
         
         for article in articles:
             fact_check = await self.news_aggregator.fact_check(article)
             article["fact_check"] = fact_check
             article["credibility_score"] = await self.news_aggregator.evaluate_source_credibility(article.get("source_url", ""))
+            yield {"type": "partial", "data": {"article": article}}
+
+        summary = await self.news_aggregator.summarize_articles(originals)
         
-        return {
+        yield {"type": "result", "data": {
             "summary": summary,
             "articles": articles,
             "timestamp": task.get("timestamp")
-        }
+        }}
 
     async def _conduct_market_research(self, task: Dict[str, Any]) -> Dict[str, Any]:
         """Conduct market research based on given parameters.
@@ -116,6 +166,17 @@ class ResearchAgent(BaseAgent):
         Returns:
             Dict[str, Any]: Academic research results
         """
+        return await self._collect_result(self._stream_academic_research(task))
+
+    async def _stream_academic_research(self, task: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        """Conduct academic research, yielding each paper once it is analyzed.
+
+        Args:
+            task (Dict[str, Any]): Academic research parameters
+
+        Yields:
+            Dict[str, Any]: One partial event per paper, then the academic research results
+        """
         query = task.get("query")
         field = task.get("field", "all")
 
@@ -124,18 +185,20 @@ class ResearchAgent(BaseAgent):
         for paper in papers:
             paper_analysis = await self.academic_researcher.analyze_paper(paper.get("id"))
             citation_analysis = await self.academic_researcher.citation_analysis(paper.get("id"))
-            analyzed_papers.append({
+            analyzed_paper = {
                 **paper,
                 "analysis": paper_analysis,
                 "citations": citation_analysis
-            })
+            }
+            analyzed_papers.append(analyzed_paper)
+            yield {"type": "partial", "data": {"paper": analyzed_paper}}
 
         literature_review = await self.academic_researcher.literature_review(analyzed_papers)
 
-        return {
+        yield {"type": "result", "data": {
             "papers": analyzed_papers,
             "literature_review": literature_review
-        }
+        }}
 
     async def _analyze_data(self, task: Dict[str, Any]) -> Dict[str, Any]:
         """Analyze provided data.
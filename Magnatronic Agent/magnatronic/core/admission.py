@@ -0,0 +1,147 @@
+"""Admission Control Module for Magnatronic Multi-Agent System"""
+
+from typing import Dict, Any, Callable, Optional, Tuple, Iterable
+import asyncio
+import math
+
+class AdmissionController:
+    """Tracks gateway load and sheds requests before the system is overwhelmed"""
+
+    def __init__(self, queue_depth: Callable[[], int], max_in_flight: int = 200,
+                 reserved_in_flight: int = 20, max_queue_depth: int = 800,
+                 max_loop_lag: float = 0.5, probe_interval: float = 0.1,
+                 queue_poll_interval: float = 1.0,
+                 reserved_paths: Iterable[str] = ("/api/health", "/api/system/metrics", "/metrics")):
+        """Initialize the admission controller.
+
+        Args:
+            queue_depth (Callable[[], int]): Returns the current number of queued tasks; may block,
+                as it is polled in a worker thread and requests are admitted on its last reading
+            max_in_flight (int): Concurrent requests admitted before answering 429
+            reserved_in_flight (int): Extra concurrency kept aside for reserved paths
+            max_queue_depth (int): Queue depth at which new work is refused with 503
+            max_loop_lag (float): Event loop lag in seconds at which new work is refused with 503
+            probe_interval (float): Seconds between event loop lag probes
+            queue_poll_interval (float): Seconds between queue depth readings
+            reserved_paths (Iterable[str]): Health and metrics paths that bypass load shedding
+        """
+        self.queue_depth = queue_depth
+        self.max_in_flight = max_in_flight
+        self.reserved_in_flight = reserved_in_flight
+        self.max_queue_depth = max_queue_depth
+        self.max_loop_lag = max_loop_lag
+        self.probe_interval = probe_interval
+        self.queue_poll_interval = queue_poll_interval
+        self.reserved_paths = frozenset(reserved_paths)
+        self.in_flight = 0
+        self.reserved_active = 0
+        self.loop_lag = 0.0
+        self.last_queue_depth = 0
+        self.stats = {'admitted': 0, 'rejected_429': 0, 'rejected_503': 0, 'queue_poll_errors': 0}
+        self._probe_task: Optional[asyncio.Task] = None
+        self._queue_poll_task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        """Start probing event loop lag and polling queue depth in the background."""
+        if self._probe_task is None:
+            self._probe_task = asyncio.create_task(self._probe_loop_lag())
+        if self._queue_poll_task is None:
+            self._queue_poll_task = asyncio.create_task(self._poll_queue_depth())
+
+    async def stop(self) -> None:
+        """Stop the background probes."""
+        for task in (self._probe_task, self._queue_poll_task):
+            if task is not None:
+                task.cancel()
+        self._probe_task = self._queue_poll_task = None
+
+    async def _probe_loop_lag(self) -> None:
+        """Measure how late the event loop wakes a sleeping coroutine."""
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.probe_interval)
+            lag = max(0.0, loop.time() - started - self.probe_interval)
+            # Smooth so a single slow tick does not flip admission on and off
+            self.loop_lag = 0.5 * self.loop_lag + 0.5 * lag
+
+    async def _poll_queue_depth(self) -> None:
+        """Read the queue depth off the event loop, keeping the last reading if it fails."""
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                self.last_queue_depth = await loop.run_in_executor(None, self.queue_depth)
+            except Exception:
+                self.stats['queue_poll_errors'] += 1
+            await asyncio.sleep(self.queue_poll_interval)
+
+    def admit(self, path: str) -> Optional[Tuple[int, int, str]]:
+        """Decide whether a request may proceed, taking an in-flight slot if so.
+
+        Args:
+            path (str): Request path
+
+        Returns:
+            Optional[Tuple[int, int, str]]: None if admitted, otherwise the status code,
+                Retry-After seconds and reason for the rejection
+        """
+        if path in self.reserved_paths:
+            # Reserved paths skip load checks but are still bounded by their own pool
+            if self.reserved_active >= self.reserved_in_flight:
+                return self._reject(503, 1, "Reserved capacity exhausted")
+            self.reserved_active += 1
+            return None
+
+        if self.in_flight >= self.max_in_flight:
+            return self._reject(429, 1, "Too many concurrent requests")
+
+        queue_depth = self.last_queue_depth
+        if queue_depth >= self.max_queue_depth:
+            return self._reject(503, 5, f"Task queue depth {queue_depth} over limit")
+
+        if self.loop_lag >= self.max_loop_lag:
+            retry_after = max(1, math.ceil(self.loop_lag * 2))
+            return self._reject(503, retry_after, f"Event loop lag {self.loop_lag:.3f}s over limit")
+
+        self.in_flight += 1
+        self.stats['admitted'] += 1
+        return None
+
+    def release(self, path: str) -> None:
+        """Return the in-flight slot taken by an admitted request.
+
+        Args:
+            path (str): Request path
+        """
+        if path in self.reserved_paths:
+            self.reserved_active = max(0, self.reserved_active - 1)
+        else:
+            self.in_flight = max(0, self.in_flight - 1)
+
+    def _reject(self, status_code: int, retry_after: int, reason: str) -> Tuple[int, int, str]:
+        """Record and describe a rejected request.
+
+        Args:
+            status_code (int): HTTP status to answer with (429 or 503)
+            retry_after (int): Seconds the client should wait before retrying
+            reason (str): Human-readable rejection reason
+
+        Returns:
+            Tuple[int, int, str]: Status code, Retry-After seconds and reason
+        """
+        self.stats[f'rejected_{status_code}'] += 1
+        return status_code, retry_after, reason
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get current admission state and counters.
+
+        Returns:
+            Dict[str, Any]: Load signals and admitted/rejected counts
+        """
+        return {
+            'in_flight': self.in_flight,
+            'reserved_in_flight': self.reserved_active,
+            'queue_depth': self.last_queue_depth,
+            'loop_lag': self.loop_lag,
+            **self.stats
+        }
@@ -1,8 +1,11 @@
 """Base Agent Module for Magnatronic Multi-Agent System"""
 
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, AsyncIterator
 from uuid import uuid4
+import time
+from .quantiles import LatencySketchStore
+from .tracing import tracer
 
 class BaseAgent(ABC):
     """Base class for all Magnatronic agents"""
@@ -17,6 +20,9 @@ class BaseAgent(ABC):
         self.agent_id = agent_id or str(uuid4())
         self.name = name
         self.state: Dict[str, Any] = {}
+        # Replaced with a Redis-backed store where latencies are merged across workers.
+        # Latencies are keyed by name, since every worker has its own instance and agent ID.
+        self.latency_sketches = LatencySketchStore()
 
     @abstractmethod
     async def process_task(self, task: Dict[str, Any]) -> Dict[str, Any]:
@@ -30,6 +36,64 @@ class BaseAgent(ABC):
         """
         pass
 
+    async def stream_task(self, task: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        """Process a task, yielding partial results as they are produced.
+
+        Agents with long-running tasks override this to emit ``partial`` events
+        before the final ``result`` event. The default emits only the result.
+
+        Args:
+            task (Dict[str, Any]): Task data containing instructions and parameters.
+
+        Yields:
+            Dict[str, Any]: Events with a ``type`` of ``partial`` or ``result`` and their ``data``.
+        """
+        yield {"type": "result", "data": await self.process_task(task)}
+
+    async def execute_task(self, task: Dict[str, Any]) -> Dict[str, Any]:
+        """Process a task in a trace span, recording its latency per agent name and task type.
+
+        Args:
+            task (Dict[str, Any]): Task data containing instructions and parameters.
+
+        Returns:
+            Dict[str, Any]: Result of the task processing.
+        """
+        start = time.perf_counter()
+        try:
+            with tracer.start_span(f"{self.name}.process_task", attributes=self._span_attributes(task)):
+                return await self.process_task(task)
+        finally:
+            self.latency_sketches.record(self.name, task.get("type"), time.perf_counter() - start)
+
+    async def execute_stream(self, task: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        """Stream a task's events in a trace span, recording its latency per agent name and task type.
+
+        Args:
+            task (Dict[str, Any]): Task data containing instructions and parameters.
+
+        Yields:
+            Dict[str, Any]: Events from stream_task.
+        """
+        start = time.perf_counter()
+        try:
+            with tracer.start_span(f"{self.name}.stream_task", attributes=self._span_attributes(task)):
+                async for event in self.stream_task(task):
+                    yield event
+        finally:
+            self.latency_sketches.record(self.name, task.get("type"), time.perf_counter() - start)
+
+    def _span_attributes(self, task: Dict[str, Any]) -> Dict[str, Any]:
+        """Get the trace span attributes of a task run by this agent.
+
+        Args:
+            task (Dict[str, Any]): Task data
+
+        Returns:
+            Dict[str, Any]: Agent ID and task type
+        """
+        return {"agent_id": self.agent_id, "task_type": task.get("type")}
+
     @abstractmethod
     async def handle_message(self, message: Dict[str, Any]) -> None:
         """Handle incoming messages from other agents.
@@ -39,6 +103,31 @@ class BaseAgent(ABC):
         """
         pass
 
+    async def receive_message(self, envelope: Dict[str, Any]) -> None:
+        """Handle a message from the broker in a trace span continuing its sender's trace.
+
+        Args:
+            envelope (Dict[str, Any]): Message as sent by MessageBroker.send_message.
+        """
+        attributes = {"agent_id": self.agent_id, "sender": envelope.get("sender"), "message_type": envelope.get("type")}
+        with tracer.start_span(f"{self.name}.handle_message", parent=tracer.extract(envelope), attributes=attributes):
+            await self.handle_message({"sender": envelope.get("sender"), **envelope.get("content", {})})
+
+    async def receive_messages(self, broker, count: Optional[int] = None) -> int:
+        """Handle the messages waiting for this agent, which senders address by name.
+
+        Args:
+            broker (MessageBroker): Broker holding the agent's messages.
+            count (int, optional): Most messages to handle. Defaults to all waiting.
+
+        Returns:
+            int: Number of messages handled.
+        """
+        messages = await broker.get_messages(self.name, count)
+        for envelope in messages:
+            await self.receive_message(envelope)
+        return len(messages)
+
     def get_state(self) -> Dict[str, Any]:
         """Get the current state of the agent.
 
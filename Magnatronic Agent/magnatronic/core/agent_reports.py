@@ -0,0 +1,143 @@
+"""Agent Metrics Reporting Module for Magnatronic Multi-Agent System
+
+Worker processes run the agents, while the gateway's MonitoringSystem keeps
+their metrics history, heartbeats and exported gauges. Each worker process
+publishes its agents' metrics over Redis pub/sub, and every gateway process
+records them as they arrive.
+"""
+
+from typing import Dict, Iterable, Optional
+from json import dumps, loads
+import asyncio
+import os
+import threading
+import time
+import psutil
+from redis import Redis, RedisError
+import redis.asyncio as aioredis
+from .monitoring import MonitoringSystem
+from .system_sampler import ProcessSampler
+
+# Channel worker processes publish agent metrics on
+AGENT_METRICS_CHANNEL = 'agent:metrics'
+
+class AgentMetricsReporter:
+    """Publishes the metrics of a worker process's agents every interval.
+
+    Task outcomes are counted in memory and published from a background
+    thread, so recording one costs no Redis round trip. Agents are reported
+    by name, like their latency sketches, so the gateway keeps the latest
+    values reported by any worker process. Reports double as heartbeats:
+    idle agents keep reporting, and the agents of a killed worker go
+    inactive once every process running them has stopped.
+    """
+
+    def __init__(self, redis_url: str, agent_names: Iterable[str], interval: float = 10.0):
+        """Initialize the reporter.
+
+        Args:
+            redis_url (str): Redis connection URL
+            agent_names (Iterable[str]): Names of the agents this process runs
+            interval (float): Seconds between reports
+        """
+        self.redis_url = redis_url
+        self.agent_names = list(agent_names)
+        self.interval = interval
+        self.publish_errors = 0
+        self._lock = threading.Lock()
+        self._finished: Dict[str, int] = {}
+        self._succeeded: Dict[str, int] = {}
+        self._durations: Dict[str, float] = {}
+        # Last known values per agent, reported again while it is idle
+        self._response_times: Dict[str, float] = {}
+        self._completion_rates: Dict[str, float] = {}
+        self._reporter_pid: Optional[int] = None  # Process the reporter thread runs in
+
+    def record(self, agent_name: str, duration: float, success: bool = True) -> None:
+        """Count a finished task.
+
+        Args:
+            agent_name (str): Name of the agent that ran the task
+            duration (float): Seconds the task took
+            success (bool): Whether the task finished without error
+        """
+        with self._lock:
+            self._finished[agent_name] = self._finished.get(agent_name, 0) + 1
+            self._succeeded[agent_name] = self._succeeded.get(agent_name, 0) + success
+            self._durations[agent_name] = self._durations.get(agent_name, 0.0) + duration
+        self.start()
+
+    def start(self) -> None:
+        """Start reporting from this process, once per process."""
+        if self._reporter_pid == os.getpid():
+            return
+        # Started on first use, and again in a forked worker, which does not inherit threads
+        self._reporter_pid = os.getpid()
+        threading.Thread(target=self._run, name='agent-reporter', daemon=True).start()
+
+    def _run(self) -> None:
+        """Publish a report every interval."""
+        redis = Redis.from_url(self.redis_url, decode_responses=True)
+        sampler = ProcessSampler()
+        pid = os.getpid()
+        started = time.monotonic()
+        sampler.sample([pid])  # cpu_percent needs a first reading to measure from
+        while True:
+            time.sleep(self.interval)
+            snapshot = sampler.sample([pid]).get(pid)
+            try:
+                redis.publish(AGENT_METRICS_CHANNEL, dumps(self._report(snapshot, time.monotonic() - started)))
+            except Exception:
+                self.publish_errors += 1  # The next report carries current values again
+
+    def _report(self, snapshot, uptime: float) -> Dict[str, Dict[str, float]]:
+        """Build the metrics of every agent since the last report and reset the counts.
+
+        Args:
+            snapshot (ProcessSnapshot, optional): Resource usage of this process
+            uptime (float): Seconds the reporter has been running in this process
+
+        Returns:
+            Dict[str, Dict[str, float]]: Agent names mapped to their metrics
+        """
+        with self._lock:
+            finished, self._finished = self._finished, {}
+            succeeded, self._succeeded = self._succeeded, {}
+            durations, self._durations = self._durations, {}
+
+        cpu_usage = memory_usage = 0.0
+        if snapshot is not None:
+            cpu_usage = snapshot.cpu_percent or 0.0
+            memory_usage = 100.0 * snapshot.memory_rss / psutil.virtual_memory().total
+        report = {}
+        for name in set(self.agent_names) | set(finished):
+            count = finished.get(name, 0)
+            if count:
+                self._response_times[name] = durations[name] / count
+                self._completion_rates[name] = 100.0 * succeeded[name] / count
+            report[name] = {
+                'cpu_usage': cpu_usage,  # Process-wide: agents of a worker process share it
+                'memory_usage': memory_usage,
+                'task_completion_rate': self._completion_rates.get(name, 100.0),  # Percent succeeded
+                'response_time': self._response_times.get(name, 0.0),
+                'uptime': uptime
+            }
+        return report
+
+async def consume_agent_reports(monitoring: MonitoringSystem, redis_url: str) -> None:
+    """Record agent metrics published by worker processes, until cancelled.
+
+    Args:
+        monitoring (MonitoringSystem): Monitoring system to record the metrics in
+        redis_url (str): Redis connection URL
+    """
+    redis = aioredis.Redis.from_url(redis_url, decode_responses=True)
+    while True:
+        try:
+            pubsub = redis.pubsub(ignore_subscribe_messages=True)
+            await pubsub.subscribe(AGENT_METRICS_CHANNEL)
+            async for message in pubsub.listen():
+                await monitoring.update_agent_metrics_batch(loads(message['data']))
+        except RedisError:
+            # Reports sent while disconnected are lost; the next ones carry current values
+            await asyncio.sleep(1.0)
@@ -0,0 +1,172 @@
+"""Alert Store Module for Magnatronic Multi-Agent System"""
+
+import uuid
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+from .indexed_heap import IndexedHeap
+
+class AlertStore:
+    """Active alerts indexed by type and severity, expired through a min-heap.
+
+    Alerts are kept in per-type and per-severity indexes with running
+    counts, so counting alerts of a type, a severity or both is O(1) and
+    listing them touches only the matching alerts. Alerts with an expiry
+    time sit in a min-heap keyed by it, so expiring costs O(log n) per
+    expired alert instead of a scan over every active one.
+    """
+
+    def __init__(self, default_ttl: Optional[float] = None):
+        """Initialize an empty store.
+
+        Args:
+            default_ttl (float, optional): Seconds after its timestamp an alert without
+                expires_at is kept; such alerts never expire if None
+        """
+        self.default_ttl = default_ttl
+        self._alerts: Dict[str, Dict[str, Any]] = {}
+        self._by_type: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._by_severity: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._counts: Dict[Tuple[str, str], int] = {}
+        self._expiry = IndexedHeap()
+
+    def __len__(self) -> int:
+        return len(self._alerts)
+
+    def __contains__(self, alert_id: str) -> bool:
+        return alert_id in self._alerts
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return iter(list(self._alerts.values()))
+
+    def add(self, alert: Dict[str, Any]) -> str:
+        """Add an alert, or replace the one with the same ID.
+
+        Args:
+            alert (Dict[str, Any]): Alert with optional 'id', 'type', 'severity',
+                'timestamp' and 'expires_at' keys; an 'id' is assigned if missing
+
+        Returns:
+            str: ID of the alert
+        """
+        alert_id = alert.setdefault('id', str(uuid.uuid4()))
+        self.remove(alert_id)
+        if 'expires_at' not in alert and self.default_ttl is not None and 'timestamp' in alert:
+            alert['expires_at'] = alert['timestamp'] + self.default_ttl
+
+        alert_type, severity = self._keys(alert)
+        self._alerts[alert_id] = alert
+        self._by_type.setdefault(alert_type, {})[alert_id] = alert
+        self._by_severity.setdefault(severity, {})[alert_id] = alert
+        self._counts[(alert_type, severity)] = self._counts.get((alert_type, severity), 0) + 1
+        if alert.get('expires_at') is not None:
+            self._expiry.push(alert_id, alert['expires_at'])
+        return alert_id
+
+    def remove(self, alert_id: str) -> Optional[Dict[str, Any]]:
+        """Remove an alert if present.
+
+        Args:
+            alert_id (str): ID of the alert
+
+        Returns:
+            Optional[Dict[str, Any]]: The removed alert, or None if absent
+        """
+        alert = self._alerts.pop(alert_id, None)
+        if alert is None:
+            return None
+        alert_type, severity = self._keys(alert)
+        self._discard(self._by_type, alert_type, alert_id)
+        self._discard(self._by_severity, severity, alert_id)
+        remaining = self._counts[(alert_type, severity)] - 1
+        if remaining:
+            self._counts[(alert_type, severity)] = remaining
+        else:
+            del self._counts[(alert_type, severity)]
+        self._expiry.remove(alert_id)
+        return alert
+
+    def expire(self, now: float) -> List[Dict[str, Any]]:
+        """Remove every alert whose expiry time has passed.
+
+        Args:
+            now (float): Current epoch seconds
+
+        Returns:
+            List[Dict[str, Any]]: Expired alerts, soonest expiry first
+        """
+        expired = []
+        while True:
+            head = self._expiry.peek()
+            if head is None or head[1] > now:
+                return expired
+            expired.append(self.remove(head[0]))
+
+    def count(self, alert_type: Optional[str] = None, severity: Optional[str] = None) -> int:
+        """Count active alerts, optionally of one type and/or severity.
+
+        Args:
+            alert_type (str, optional): Only count alerts of this type
+            severity (str, optional): Only count alerts of this severity
+
+        Returns:
+            int: Number of matching alerts
+        """
+        if alert_type is not None and severity is not None:
+            return self._counts.get((alert_type, severity), 0)
+        if alert_type is not None:
+            return len(self._by_type.get(alert_type, ()))
+        if severity is not None:
+            return len(self._by_severity.get(severity, ()))
+        return len(self._alerts)
+
+    def find(self, alert_type: Optional[str] = None, severity: Optional[str] = None) -> List[Dict[str, Any]]:
+        """List active alerts, optionally of one type and/or severity.
+
+        Args:
+            alert_type (str, optional): Only list alerts of this type
+            severity (str, optional): Only list alerts of this severity
+
+        Returns:
+            List[Dict[str, Any]]: Matching alerts in insertion order
+        """
+        if alert_type is None and severity is None:
+            return list(self._alerts.values())
+        if alert_type is None:
+            return list(self._by_severity.get(severity, {}).values())
+        alerts = self._by_type.get(alert_type, {}).values()
+        if severity is None:
+            return list(alerts)
+        return [alert for alert in alerts if self._keys(alert)[1] == severity]
+
+    def counts_by_type(self) -> Dict[str, int]:
+        """Count active alerts per type.
+
+        Returns:
+            Dict[str, int]: Number of alerts of each type
+        """
+        return {alert_type: len(alerts) for alert_type, alerts in self._by_type.items()}
+
+    @staticmethod
+    def _keys(alert: Dict[str, Any]) -> Tuple[str, str]:
+        """Get the type and severity an alert is indexed under.
+
+        Args:
+            alert (Dict[str, Any]): Alert data
+
+        Returns:
+            Tuple[str, str]: Type ('general' if unset) and severity ('info' if unset)
+        """
+        return alert.get('type') or 'general', alert.get('severity') or 'info'
+
+    @staticmethod
+    def _discard(index: Dict[str, Dict[str, Dict[str, Any]]], key: str, alert_id: str) -> None:
+        """Remove an alert from one index, dropping the key once it is empty.
+
+        Args:
+            index (Dict[str, Dict[str, Dict[str, Any]]]): Index to update
+            key (str): Type or severity the alert is indexed under
+            alert_id (str): ID of the alert
+        """
+        alerts = index[key]
+        del alerts[alert_id]
+        if not alerts:
+            del index[key]
@@ -1,7 +1,9 @@
 from fastapi import FastAPI, WebSocket
+from fastapi.responses import Response
 from fastapi.middleware.cors import CORSMiddleware
 from typing import List, Dict
 from .websocket import manager
+from .metrics_exporter import render_metrics
 from datetime import datetime
 
 app = FastAPI(title="Magnatronic Agent API")
@@ -49,6 +51,11 @@ mock_agents = [
 async def root():
     return {"message": "Magnatronic Agent API is running"}
 
+@app.get("/metrics")
+async def prometheus_metrics():
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
 @app.get("/api/agents", response_model=List[Dict])
 async def get_agents():
     return mock_agents
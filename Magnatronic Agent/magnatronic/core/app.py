@@ -1,17 +1,35 @@
-from fastapi import FastAPI, WebSocket, HTTPException, BackgroundTasks, Request
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, BackgroundTasks, Request, Header
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, FileResponse, HTMLResponse
+from fastapi.responses import JSONResponse, FileResponse, HTMLResponse, StreamingResponse, Response, PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from pydantic import BaseModel
 from typing import Dict, List, Optional, Any
 import asyncio
+import hmac
 import json
 import logging
 from datetime import datetime
-from collections import deque
 from dataclasses import dataclass, asdict
 import os
+import time
+from redis import Redis
+from magnatronic.core import celeryconfig
+from magnatronic.core.admission import AdmissionController
+from magnatronic.core.agent_reports import consume_agent_reports
+from magnatronic.core.communication import MessageBroker
+from magnatronic.core.monitoring import MonitoringSystem, METRIC_FIELDS
+from magnatronic.core.metrics_store import MetricsStore
+from magnatronic.core.profiler import ProfilerBusy, profile_workers
+from magnatronic.core.fair_queue import TenantQuotaExceeded
+from magnatronic.core.rate_limiter import RateLimitExceeded
+from magnatronic.core.task_queue import TaskPriority, TaskQueue
+from magnatronic.core.quantiles import LatencySketchStore, ALL_TASK_TYPES
+from magnatronic.core.websocket import manager as status_feed
+from magnatronic.core.tracing import RedisSpanExporter, build_waterfall, tracer
+from magnatronic.core.metrics_exporter import (
+    HTTP_LATENCY, HTTP_REQUESTS, QUEUE_DEPTH, export_monitoring, mark_process_dead, render_metrics
+)
 
 # Enhanced data models
 class AgentMetrics(BaseModel):
@@ -33,10 +51,49 @@ class Agent(BaseModel):
 
 # Enhanced in-memory storage with performance tracking
 active_agents: Dict[str, Agent] = {}
-task_queue: deque = deque(maxlen=1000)  # Limit queue size
 websocket_connections: Dict[str, WebSocket] = {}
 performance_history: Dict[str, List[Dict]] = {}
 MAX_HISTORY_ENTRIES = 100  # Limit history entries per agent
+MAX_BACKLOG = 800  # Tasks waiting in the broker before new work is refused
+
+# Load shedding: new work is refused while workers are behind on the task
+# backlog, while health and metrics endpoints keep a reserved slice of capacity
+backlog_queue = TaskQueue()
+admission = AdmissionController(
+    queue_depth=backlog_queue.get_backlog,
+    max_in_flight=200,
+    reserved_in_flight=20,
+    max_queue_depth=MAX_BACKLOG,
+    max_loop_lag=0.5
+)
+
+# Source of partial results published by workers running streamed tasks
+message_broker = MessageBroker()
+
+# Reaches the profile listener in every worker process
+profile_redis = Redis.from_url("redis://localhost:6379", decode_responses=True)
+MAX_PROFILE_SECONDS = 120.0
+
+# Task latency distributions recorded by every worker
+latency_sketches = LatencySketchStore("redis://localhost:6379")
+
+# Agent metrics reported by the workers are recorded here and exported on /metrics as they arrive.
+# Its durable store is claimed on startup, so importing the app creates no files
+monitoring = MonitoringSystem()
+METRICS_DIR = os.getenv("MAGNATRONIC_METRICS_DIR", os.path.join(celeryconfig.data_dir, "metrics"))
+export_monitoring(monitoring)
+# Agents that stop reporting are pushed to /ws/agents clients as soon as they are detected
+status_feed.watch_monitoring(monitoring)
+heartbeat_watcher: Optional[asyncio.Task] = None
+report_consumer: Optional[asyncio.Task] = None
+
+# Request spans go to the Redis that workers export theirs to, so a trace is viewable end to end
+tracer.configure(
+    service="gateway",
+    sample_rate=float(os.getenv("MAGNATRONIC_TRACE_SAMPLE_RATE", "0.1")),
+    exporter=RedisSpanExporter("redis://localhost:6379")
+)
+metrics_writer: Optional[asyncio.Task] = None
 
 # Initialize templates
 templates = Jinja2Templates(directory="magnatronic/templates")
@@ -95,9 +152,104 @@ async def http_exception_handler(request, exc):
     )
     return JSONResponse(
         status_code=exc.status_code,
-        content=error.dict()
+        content=error.dict(),
+        headers=getattr(exc, "headers", None)
     )
 
+@app.on_event("startup")
+async def start_admission_control():
+    global heartbeat_watcher, report_consumer, metrics_writer
+    await admission.start()
+    heartbeat_watcher = asyncio.create_task(monitoring.watch_heartbeats())
+    report_consumer = asyncio.create_task(consume_agent_reports(monitoring, "redis://localhost:6379"))
+    monitoring.store = MetricsStore.claim(os.path.abspath(METRICS_DIR), METRIC_FIELDS)
+    metrics_writer = asyncio.create_task(monitoring.store.run_flusher())
+
+@app.on_event("shutdown")
+async def stop_admission_control():
+    await admission.stop()
+    if heartbeat_watcher is not None:
+        heartbeat_watcher.cancel()
+    if report_consumer is not None:
+        report_consumer.cancel()
+    if metrics_writer is not None:
+        metrics_writer.cancel()
+    if monitoring.store is not None:
+        monitoring.store.close()  # Frees the slot for the next process to claim
+        monitoring.store = None
+    tracer.flush()
+    mark_process_dead()
+
+@app.middleware("http")
+async def admission_control(request: Request, call_next):
+    path = request.url.path
+    rejection = admission.admit(path)
+    if rejection is not None:
+        status_code, retry_after, reason = rejection
+        error = MatrixError(
+            error=reason,
+            timestamp=datetime.now().isoformat(),
+            code=status_code,
+            details={"path": path}
+        )
+        return JSONResponse(
+            status_code=status_code,
+            content=error.dict(),
+            headers={"Retry-After": str(retry_after)}
+        )
+    try:
+        response = await call_next(request)
+    except BaseException:
+        admission.release(path)
+        raise
+    # Streamed responses keep their slot until the body has been sent
+    response.body_iterator = release_after_body(response.body_iterator, path)
+    return response
+
+async def release_after_body(body, path: str):
+    """Pass a response body through, returning its admission slot once it is sent or abandoned.
+
+    Args:
+        body: The response's body iterator
+        path (str): Request path the slot was taken for
+
+    Yields:
+        bytes: Body chunks
+    """
+    try:
+        async for chunk in body:
+            yield chunk
+    finally:
+        admission.release(path)
+
+# Registered after admission control so it also times and counts shed requests
+@app.middleware("http")
+async def record_http_metrics(request: Request, call_next):
+    start = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        # Label by route template, not raw path, to keep label cardinality bounded
+        route = getattr(request.scope.get("route"), "path", "unmatched")
+        HTTP_LATENCY.labels(method=request.method, route=route).observe(time.perf_counter() - start)
+        HTTP_REQUESTS.labels(method=request.method, route=route, status=str(status_code)).inc()
+
+# Registered last so the request span covers admission control and the other middleware
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    parent = tracer.extract(request.headers)
+    with tracer.start_span(f"{request.method} {request.url.path}", parent=parent) as span:
+        response = await call_next(request)
+        if span is not None:
+            route = getattr(request.scope.get("route"), "path", "unmatched")
+            span.name = f"{request.method} {route}"
+            span.attributes.update(route=route, status=response.status_code)
+        # Lets the client look up this request's waterfall
+        tracer.inject(response.headers)
+        return response
 
 
 # Favicon endpoint handler
@@ -105,6 +257,13 @@ async def http_exception_handler(request, exc):
 async def favicon():
     return FileResponse('public/favicon.ico')
 
+# Prometheus scrape endpoint
+@app.get("/metrics")
+async def prometheus_metrics():
+    QUEUE_DEPTH.set(admission.last_queue_depth)
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
 # Health check endpoint with styled response
 @app.get("/api/system/metrics")
 async def get_system_metrics():
@@ -115,16 +274,15 @@ async def get_system_metrics():
             "busy": len([a for a in active_agents.values() if a.status == "busy"])
         },
         "tasks": {
-            "total": len(task_queue),
-            "pending": len([t for t in task_queue if t.status == "pending"]),
-            "in_progress": len([t for t in task_queue if t.status == "in_progress"]),
-            "completed": len([t for t in task_queue if t.status == "completed"])
+            "pending": admission.last_queue_depth
         },
         "performance": {
             "avg_response_time": sum(a.metrics.response_time for a in active_agents.values()) / len(active_agents) if active_agents else 0,
             "avg_cpu_usage": sum(a.metrics.cpu_usage for a in active_agents.values()) / len(active_agents) if active_agents else 0,
             "avg_memory_usage": sum(a.metrics.memory_usage for a in active_agents.values()) / len(active_agents) if active_agents else 0
         },
+        "admission": admission.get_stats(),
+        "fair_queue": backlog_queue.get_fairness_metrics(),
         "timestamp": datetime.now().isoformat()
     }
 
@@ -139,20 +297,102 @@ async def get_agent_performance(agent_id: str):
     return {
         "agent": agent.dict(),
         "current_metrics": agent.metrics.dict(),
-        "performance_history": history,
-        "task_stats": {
-            "completed": len([t for t in task_queue if t.status == "completed" and t.assigned_to == agent_id]),
-            "in_progress": len([t for t in task_queue if t.status == "in_progress" and t.assigned_to == agent_id]),
-            "total_assigned": len([t for t in task_queue if t.assigned_to == agent_id])
-        }
+        "performance_history": history
+    }
+
+# Latency is recorded per agent name, e.g. research_agent, merged across every worker's instance
+@app.get("/api/agents/{agent_id}/latency")
+async def get_agent_latency(agent_id: str, task_type: Optional[str] = None):
+    task_types = [task_type] if task_type else latency_sketches.get_task_types(agent_id)
+    overall = latency_sketches.get_sketch(agent_id, task_type or ALL_TASK_TYPES)
+    if overall is None:
+        raise HTTPException(status_code=404, detail="No latency recorded for agent")
+
+    by_task_type = {}
+    for name in task_types:
+        sketch = latency_sketches.get_sketch(agent_id, name)
+        if sketch is not None:
+            by_task_type[name] = sketch.summary()
+    return {
+        "agent_id": agent_id,
+        "latency": overall.summary(),
+        "task_types": by_task_type,
+        "timestamp": datetime.now().isoformat()
+    }
+
+# Per-request waterfall of spans recorded by the gateway, task queue, broker and agents
+@app.get("/api/traces/{trace_id}")
+async def get_trace(trace_id: str):
+    spans = await asyncio.get_running_loop().run_in_executor(None, tracer.get_trace, trace_id)
+    if not spans:
+        raise HTTPException(status_code=404, detail=f"Trace {trace_id} not found or not sampled")
+    return build_waterfall(spans)
+
+# Task submission. Tasks are released to the workers fairly between tenants, named by
+# X-Tenant; streamed tasks publish their events to /api/tasks/{task_id}/stream.
+class TaskRequest(BaseModel):
+    agent_type: str
+    type: str
+    params: Dict[str, Any] = {}  # Merged into the task data the agent receives
+    priority: str = "MEDIUM"
+    stream: bool = False
+    affinity_key: Optional[str] = None  # Entity the task concerns, keeping its tasks on one worker replica
+
+@app.post("/api/tasks", status_code=202)
+async def submit_task(request: TaskRequest, x_tenant: Optional[str] = Header(None)):
+    try:
+        priority = TaskPriority[request.priority.upper()]
+    except KeyError:
+        raise HTTPException(status_code=400, detail=f"Unknown priority: {request.priority}")
+    task_data = {**request.params, "agent_type": request.agent_type, "type": request.type}
+    try:
+        task_id = await backlog_queue.submit_task(
+            task_data, priority, stream=request.stream, affinity_key=request.affinity_key, tenant=x_tenant
+        )
+    except TenantQuotaExceeded as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
+    except RateLimitExceeded as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(max(1, round(e.retry_after)))})
+    return {
+        "task_id": task_id,
+        "stream": f"/api/tasks/{task_id}/stream" if request.stream else None,
+        "timestamp": datetime.now().isoformat()
     }
 
+# Streamed task output. Each task's events are consumed by a single reader.
+@app.get("/api/tasks/{task_id}/stream")
+async def stream_task_output(task_id: str):
+    async def ndjson_events():
+        async for event in message_broker.stream_task_events(task_id):
+            yield json.dumps(event) + "\n"
+
+    return StreamingResponse(ndjson_events(), media_type="application/x-ndjson")
+
+@app.websocket("/ws/tasks/{task_id}")
+async def stream_task_output_ws(websocket: WebSocket, task_id: str):
+    await websocket.accept()
+    try:
+        async for event in message_broker.stream_task_events(task_id):
+            await websocket.send_text(json.dumps(event))
+    except WebSocketDisconnect:
+        return
+    await websocket.close()
+
+@app.websocket("/ws/agents")
+async def agent_status_feed(websocket: WebSocket):
+    await status_feed.connect(websocket)
+    try:
+        while True:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        status_feed.disconnect(websocket)
+
 @app.get("/api/health")
 async def health_check():
     return {
         "status": "operational",
         "active_agents": len(active_agents),
-        "pending_tasks": len([t for t in task_queue if t.status == "pending"]),
+        "pending_tasks": admission.last_queue_depth,
         "system_load": {
             "cpu": sum(a.metrics.cpu_usage for a in active_agents.values()) / len(active_agents) if active_agents else 0,
             "memory": sum(a.metrics.memory_usage for a in active_agents.values()) / len(active_agents) if active_agents else 0
@@ -173,6 +413,53 @@ async def get_nlp_metrics():
         "status": "success"
     }
 
+# On-demand profiling of the gateway or the workers, returning flamegraph collapsed stacks.
+# Disabled unless MAGNATRONIC_ADMIN_TOKEN is set and sent as X-Admin-Token.
+class ProfileRequest(BaseModel):
+    target: str = "worker"  # "gateway" for this process, "worker" for every worker process, merged
+    agent_type: Optional[str] = None  # Worker only: keep stacks passing through this agent type's code
+    duration: float = 10.0
+    interval: float = 0.01
+
+@app.post("/api/admin/profile", response_class=PlainTextResponse)
+async def profile_process(request: ProfileRequest, x_admin_token: Optional[str] = Header(None)):
+    admin_token = os.getenv("MAGNATRONIC_ADMIN_TOKEN")
+    if not admin_token or not hmac.compare_digest(x_admin_token or "", admin_token):
+        raise HTTPException(status_code=403, detail="Admin token required")
+    if not 0 < request.duration <= MAX_PROFILE_SECONDS or not 0.001 <= request.interval <= 1.0:
+        raise HTTPException(
+            status_code=400,
+            detail=f"duration must be in (0, {MAX_PROFILE_SECONDS:g}] and interval in [0.001, 1] seconds"
+        )
+
+    if request.target == "gateway":
+        if request.agent_type is not None:
+            raise HTTPException(status_code=400, detail="Agents run in workers; profile target 'worker'")
+        try:
+            result = await monitoring.profile(request.duration, request.interval)
+        except ProfilerBusy as e:
+            raise HTTPException(status_code=409, detail=str(e))
+        return PlainTextResponse(result.collapsed(), headers={"X-Profile-Samples": str(result.samples)})
+    if request.target != "worker":
+        raise HTTPException(status_code=400, detail=f"Unknown profile target: {request.target}")
+
+    # Every worker process profiles itself at once, so agent code running anywhere in the pool is seen
+    listeners, result, replies = await asyncio.get_running_loop().run_in_executor(
+        None, profile_workers, profile_redis, request.duration, request.interval, request.agent_type
+    )
+    if not listeners:
+        raise HTTPException(status_code=503, detail="No worker is listening for profile requests")
+    profiled = [reply for reply in replies if "stacks" in reply]
+    if not profiled:
+        if replies:
+            raise HTTPException(status_code=409, detail=replies[0]["error"])
+        raise HTTPException(status_code=504, detail="No worker replied with a profile")
+    return PlainTextResponse(result.collapsed(), headers={
+        "X-Profile-Samples": str(result.samples),
+        "X-Profile-Pids": ",".join(str(reply["pid"]) for reply in profiled),
+        "X-Profile-Missing": str(listeners - len(profiled))
+    })
+
 # NLP Processing endpoint
 class NLPRequest(BaseModel):
     action: str
@@ -184,16 +471,17 @@ class NLPRequest(BaseModel):
 async def process_nlp(request: NLPRequest):
     try:
         # Mock processing based on action
-        if request.action == "translate":
-            result = f"Translated text to {request.targetLanguage}"
-        elif request.action == "analyze":
-            result = "Analysis results for the text"
-        elif request.action == "summarize":
-            result = "Summary of the text"
-        elif request.action == "enhanced_checks":  # Placeholder for enhanced checks functionality
-            result = "Enhanced checks not yet implemented"
-        else:
-            raise HTTPException(status_code=400, detail=f"Unsupported action: {request.action}")
+        with tracer.start_span("nlp.process", attributes={"action": request.action}):
+            if request.action == "translate":
+                result = f"Translated text to {request.targetLanguage}"
+            elif request.action == "analyze":
+                result = "Analysis results for the text"
+            elif request.action == "summarize":
+                result = "Summary of the text"
+            elif request.action == "enhanced_checks":  # Placeholder for enhanced checks functionality
+                result = "Enhanced checks not yet implemented"
+            else:
+                raise HTTPException(status_code=400, detail=f"Unsupported action: {request.action}")
         
         return {
             "result": result,
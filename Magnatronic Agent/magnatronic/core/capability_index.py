@@ -0,0 +1,192 @@
+"""Capability Index Module for Magnatronic Multi-Agent System"""
+
+import sys
+import random
+from typing import Dict, List, Optional, Iterable, Iterator, FrozenSet
+
+def _popcount(bits: int) -> int:
+    """Count the set bits of a non-negative integer (int.bit_count needs Python 3.10)."""
+    return bin(bits).count('1')
+
+class CapabilityIndex:
+    """Inverted index from capability to the agents providing it.
+
+    Each agent is given a bit position, and each capability maps to an integer
+    bitset of the agents that have it, so finding agents with several
+    capabilities is a bitwise AND instead of a scan over every agent.
+    """
+
+    def __init__(self):
+        """Initialize an empty capability index."""
+        self._slots: Dict[str, int] = {}
+        self._agents: List[Optional[str]] = []
+        self._free_slots: List[int] = []
+        self._capability_bits: Dict[str, int] = {}
+        self._agent_capabilities: Dict[str, FrozenSet[str]] = {}
+        self._all_bits = 0
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def __contains__(self, agent_id: str) -> bool:
+        return agent_id in self._slots
+
+    def update(self, agent_id: str, capabilities: Iterable[str]) -> None:
+        """Add an agent or replace its capabilities.
+
+        Args:
+            agent_id (str): ID of the agent
+            capabilities (Iterable[str]): Capabilities the agent provides
+        """
+        interned = frozenset(sys.intern(cap) for cap in capabilities)
+        if self._agent_capabilities.get(agent_id) == interned:
+            return
+
+        if agent_id in self._slots:
+            self._clear_capabilities(agent_id)
+        else:
+            self._assign_slot(agent_id)
+
+        bit = 1 << self._slots[agent_id]
+        for cap in interned:
+            self._capability_bits[cap] = self._capability_bits.get(cap, 0) | bit
+        self._agent_capabilities[agent_id] = interned
+
+    def remove(self, agent_id: str) -> None:
+        """Remove an agent from the index.
+
+        Args:
+            agent_id (str): ID of the agent
+        """
+        if agent_id not in self._slots:
+            return
+
+        self._clear_capabilities(agent_id)
+        slot = self._slots.pop(agent_id)
+        self._agents[slot] = None
+        self._free_slots.append(slot)
+        self._all_bits &= ~(1 << slot)
+        del self._agent_capabilities[agent_id]
+
+    def get_capabilities(self, agent_id: str) -> FrozenSet[str]:
+        """Get the indexed capabilities of an agent.
+
+        Args:
+            agent_id (str): ID of the agent
+
+        Returns:
+            FrozenSet[str]: Capabilities of the agent, empty if unknown
+        """
+        return self._agent_capabilities.get(agent_id, frozenset())
+
+    def lookup_bits(self, required_capabilities: Iterable[str],
+                    exclude_agents: Optional[Iterable[str]] = None) -> int:
+        """Get the bitset of agents that have every required capability.
+
+        Args:
+            required_capabilities (Iterable[str]): Capabilities an agent must have
+            exclude_agents (Iterable[str], optional): Agents to leave out
+
+        Returns:
+            int: Bitset of matching agent slots
+        """
+        bits = self._all_bits
+        # Intersect rarest capabilities first so the bitset shrinks quickly
+        required = sorted(
+            (self._capability_bits.get(cap, 0) for cap in set(required_capabilities)),
+            key=_popcount
+        )
+        for cap_bits in required:
+            bits &= cap_bits
+            if not bits:
+                return 0
+
+        for agent_id in exclude_agents or ():
+            slot = self._slots.get(agent_id)
+            if slot is not None:
+                bits &= ~(1 << slot)
+        return bits
+
+    def lookup(self, required_capabilities: Iterable[str],
+               exclude_agents: Optional[Iterable[str]] = None) -> List[str]:
+        """Get the agents that have every required capability.
+
+        Args:
+            required_capabilities (Iterable[str]): Capabilities an agent must have
+            exclude_agents (Iterable[str], optional): Agents to leave out
+
+        Returns:
+            List[str]: IDs of matching agents
+        """
+        return list(self.agents_in(self.lookup_bits(required_capabilities, exclude_agents)))
+
+    def agents_in(self, bits: int) -> Iterator[str]:
+        """Iterate over the agents whose slots are set in a bitset.
+
+        Args:
+            bits (int): Bitset of agent slots
+
+        Yields:
+            str: Agent IDs in slot order
+        """
+        while bits:
+            lowest = bits & -bits
+            yield self._agents[lowest.bit_length() - 1]
+            bits ^= lowest
+
+    def sample(self, bits: int, count: int, rng: random.Random) -> List[str]:
+        """Pick up to count distinct agents at random from a bitset.
+
+        Random slots are probed first, which is cheap when most agents match;
+        sparse bitsets fall back to listing their members.
+
+        Args:
+            bits (int): Bitset of agent slots to sample from
+            count (int): Number of agents to pick
+            rng (random.Random): Random number generator
+
+        Returns:
+            List[str]: Sampled agent IDs
+        """
+        if not bits:
+            return []
+
+        picked: Dict[int, str] = {}
+        for _ in range(4 * count):
+            slot = rng.randrange(len(self._agents))
+            if bits >> slot & 1:
+                picked[slot] = self._agents[slot]
+                if len(picked) == count:
+                    return list(picked.values())
+
+        members = list(self.agents_in(bits))
+        return rng.sample(members, min(count, len(members)))
+
+    def _assign_slot(self, agent_id: str) -> None:
+        """Give an agent a bit position, reusing freed positions first.
+
+        Args:
+            agent_id (str): ID of the agent
+        """
+        if self._free_slots:
+            slot = self._free_slots.pop()
+            self._agents[slot] = agent_id
+        else:
+            slot = len(self._agents)
+            self._agents.append(agent_id)
+        self._slots[agent_id] = slot
+        self._all_bits |= 1 << slot
+
+    def _clear_capabilities(self, agent_id: str) -> None:
+        """Unset an agent's bit in every capability it had.
+
+        Args:
+            agent_id (str): ID of the agent
+        """
+        mask = ~(1 << self._slots[agent_id])
+        for cap in self._agent_capabilities.get(agent_id, ()):
+            remaining = self._capability_bits[cap] & mask
+            if remaining:
+                self._capability_bits[cap] = remaining
+            else:
+                del self._capability_bits[cap]
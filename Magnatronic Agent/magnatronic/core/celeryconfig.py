@@ -1,5 +1,7 @@
 """Celery Configuration for Magnatronic Multi-Agent System"""
 
+import os
+
 # Broker settings
 broker_url = 'redis://localhost:6379/0'
 result_backend = 'redis://localhost:6379/0'
@@ -33,6 +35,50 @@ task_routes = {
     'agent.*': {'queue': 'agent_tasks'}
 }
 
+# Per-agent-type dispatch limits, shared across workers through Redis
+# rate: tokens per second, burst: bucket size, max_in_flight: concurrent tasks,
+# max_queue_delay: longest deferral in seconds before a task is rejected
+# Keys must be agent types registered in tasks.agents
+agent_limits = {
+    'research': {'rate': 5.0, 'burst': 10, 'max_in_flight': 8},
+    'creative': {'rate': 5.0, 'burst': 10, 'max_in_flight': 8},
+    'knowledge': {'rate': 2.0, 'burst': 5, 'max_in_flight': 4, 'max_queue_delay': 30.0}
+}
+
+# Seconds a task holds its in-flight slot before the lease lapses, freeing
+# slots of killed workers; keep it above the longest task run time
+slot_lease = 900
+# Times a task finding its agent type at the in-flight cap is requeued before it fails
+slot_max_retries = 100
+
+# Weighted fair queuing between submitters. Tasks are held per tenant in the
+# submitting process and released by deficit round robin while the broker
+# queue is shorter than fair_queue_release_depth
+fair_queue_release_depth = 20
+tenant_quota = 100  # Tasks a tenant may have held at once
+tenants = {}  # Tenants mapped to {'weight': share, 'quota': held tasks}; others weigh 1.0
+
+# Worker replicas addressable by affinity key. A worker started with
+# MAGNATRONIC_WORKER_REPLICA=<name> also consumes agent_tasks.<name>, and tasks
+# with an affinity key go to their key's replica on a consistent-hash ring over
+# these names; list only replicas that run, comma-separated
+affinity_replicas = [name for name in os.getenv('MAGNATRONIC_AFFINITY_REPLICAS', '').split(',') if name]
+affinity_balance = 1.25  # Replica backlog over the average before keyed tasks spill over
+
+# Seconds between agent metrics reports from each worker process to the gateway,
+# which also serve as heartbeats (MonitoringSystem.heartbeat_timeout is 300)
+agent_report_interval = 10.0
+
+# Fraction of traces started by a worker that are recorded; tasks submitted
+# within a trace follow the submitter's sampling decision
+trace_sample_rate = 0.1
+
+# Directory for durable state such as the gateway's metrics history; relative
+# values of MAGNATRONIC_DATA_DIR are taken from the working directory at import
+data_dir = os.path.abspath(os.getenv(
+    'MAGNATRONIC_DATA_DIR', os.path.join(os.path.dirname(__file__), '..', '..', 'data')
+))
+
 # Worker settings
 worker_prefetch_multiplier = 1
 worker_max_tasks_per_child = 1000
@@ -1,8 +1,11 @@
 """Message Passing Interface for Magnatronic Multi-Agent System"""
 
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, AsyncIterator
 from redis import Redis
+from redis.asyncio import Redis as AsyncRedis
 from json import dumps, loads
+from .metrics_exporter import BROKER_MESSAGES
+from .tracing import tracer
 
 class MessageBroker:
     """Handles inter-agent communication using Redis as message broker"""
@@ -13,7 +16,9 @@ class MessageBroker:
         Args:
             redis_url (str): Redis connection URL. Defaults to "redis://localhost:6379".
         """
+        self.redis_url = redis_url
         self.redis = Redis.from_url(redis_url, decode_responses=True)
+        self._async_redis: Optional[AsyncRedis] = None  # Created on first use, in the loop that uses it
 
     async def send_message(self, sender_id: str, recipient_id: str, message: Dict[str, Any]) -> bool:
         """Send a message from one agent to another.
@@ -26,23 +31,27 @@ class MessageBroker:
         Returns:
             bool: True if message was sent successfully
         """
-        message_data = {
-            "sender": sender_id,
-            "content": message,
-            "timestamp": self.redis.time()[0],
-            "type": message.get("type", "general"),
-            "priority": message.get("priority", "normal")
-        }
-        
-        # Send performance metrics to monitoring agent
-        if recipient_id == "monitoring_agent":
-            if message.get("type") == "performance_update":
-                self.redis.hset(
-                    f"agent_metrics:{sender_id}",
-                    mapping=message.get("metrics", {})
-                )
-        
-        return bool(self.redis.rpush(f"messages:{recipient_id}", dumps(message_data)))
+        with tracer.start_span('broker.send_message', attributes={'recipient': recipient_id}):
+            message_data = {
+                "sender": sender_id,
+                "content": message,
+                "timestamp": self.redis.time()[0],
+                "type": message.get("type", "general"),
+                "priority": message.get("priority", "normal")
+            }
+            # The recipient can continue the sender's trace from the envelope
+            tracer.inject(message_data)
+
+            # Send performance metrics to monitoring agent
+            if recipient_id == "monitoring_agent":
+                if message.get("type") == "performance_update":
+                    self.redis.hset(
+                        f"agent_metrics:{sender_id}",
+                        mapping=message.get("metrics", {})
+                    )
+
+            BROKER_MESSAGES.labels(kind='message').inc()
+            return bool(self.redis.rpush(f"messages:{recipient_id}", dumps(message_data)))
 
     async def get_messages(self, agent_id: str, count: Optional[int] = None) -> List[Dict[str, Any]]:
         """Retrieve messages for a specific agent.
@@ -74,4 +83,44 @@ class MessageBroker:
         Args:
             agent_id (str): ID of the agent whose messages should be cleared
         """
-        self.redis.delete(f"messages:{agent_id}")
\ No newline at end of file
+        self.redis.delete(f"messages:{agent_id}")
+
+    def publish_task_event(self, task_id: str, event: Dict[str, Any], ttl: int = 3600) -> None:
+        """Publish a streamed task event for clients to consume.
+
+        Events are kept in a list rather than pub/sub so a client that connects
+        after the first partial result still receives everything.
+
+        Args:
+            task_id (str): ID of the task producing the event
+            event (Dict[str, Any]): Partial, result or error event
+            ttl (int): Seconds before unread events expire
+        """
+        stream_key = f"task_stream:{task_id}"
+        self.redis.rpush(stream_key, dumps(event))
+        self.redis.expire(stream_key, ttl)
+        BROKER_MESSAGES.labels(kind='task_event').inc()
+
+    async def stream_task_events(self, task_id: str, timeout: int = 300) -> AsyncIterator[Dict[str, Any]]:
+        """Yield streamed task events until the final result or an error arrives.
+
+        Args:
+            task_id (str): ID of the task to follow
+            timeout (int): Seconds to wait for the next event before giving up
+
+        Yields:
+            Dict[str, Any]: Task events in the order they were published
+        """
+        stream_key = f"task_stream:{task_id}"
+        if self._async_redis is None:
+            self._async_redis = AsyncRedis.from_url(self.redis_url, decode_responses=True)
+        while True:
+            # Awaited on the event loop, so waiting streams hold no threads
+            item = await self._async_redis.blpop(stream_key, timeout)
+            if item is None:
+                yield {"type": "error", "error": "Timed out waiting for task output"}
+                return
+            event = loads(item[1])
+            yield event
+            if event.get("type") in ("result", "error"):
+                return
@@ -0,0 +1,257 @@
+"""Weighted Fair Queuing Module for Magnatronic Multi-Agent System"""
+
+from typing import Dict, Any, Awaitable, Callable, Optional, Tuple
+from collections import deque
+import math
+from dataclasses import dataclass, field
+from .load_balancer import LoadBalancer
+
+DEFAULT_TENANT = 'default'
+
+# Hands a task on and returns where it went, or None if there is no room for it now
+Placement = Callable[[Dict[str, Any]], Awaitable[Optional[str]]]
+
+@dataclass
+class TenantQueue:
+    """Data class for storing one tenant's pending tasks and accounting"""
+    tenant: str
+    weight: float
+    quota: int  # Maximum tasks queued at once
+    tasks: deque = field(default_factory=deque)
+    deficit: float = 0.0
+    served: int = 0
+    served_cost: float = 0.0
+    rejected: int = 0
+
+class TenantQuotaExceeded(Exception):
+    """Raised when a tenant already has its full quota of tasks queued"""
+
+    def __init__(self, tenant: str, quota: int):
+        """Initialize the exception.
+
+        Args:
+            tenant (str): Tenant whose quota was exceeded
+            quota (int): The tenant's queued task quota
+        """
+        super().__init__(f"Tenant {tenant} has {quota} tasks queued already")
+        self.tenant = tenant
+        self.quota = quota
+
+class FairQueueDispatcher:
+    """Dispatches held tasks across tenants by deficit round robin.
+
+    Tasks wait in per-tenant queues until the placement callable finds room
+    for them: TaskQueue places them on the Celery broker, and for_load_balancer
+    places them on the agent LoadBalancer.find_best_agent picks.
+    """
+
+    def __init__(self, place: Placement, quantum: float = 1.0,
+                 default_weight: float = 1.0, default_quota: int = 100,
+                 tenants: Optional[Dict[str, Dict[str, Any]]] = None):
+        """Initialize the dispatcher.
+
+        Args:
+            place (Placement): Hands a task on, returning its destination, or None if
+                there is no room for it now
+            quantum (float): Task cost credited per round to a tenant of weight 1.0
+            default_weight (float): Weight of tenants without explicit settings
+            default_quota (int): Queued task quota of tenants without explicit settings
+            tenants (Dict[str, Dict[str, Any]], optional): Tenants mapped to their weight and quota
+
+        Raises:
+            ValueError: If the quantum or a weight is not positive
+        """
+        if not quantum > 0 or not default_weight > 0:
+            raise ValueError("quantum and default_weight must be positive")
+        self.place = place
+        self.quantum = quantum
+        self.default_weight = default_weight
+        self.default_quota = default_quota
+        self.queues: Dict[str, TenantQueue] = {}
+        self._active: deque = deque()  # Tenants with queued tasks, in round-robin order
+        self._visiting: Optional[str] = None
+        self.credit_pending = False  # Last pass stopped with tenants only short of credit
+        for tenant, settings in (tenants or {}).items():
+            self.set_tenant(tenant, **settings)
+
+    def __len__(self) -> int:
+        return sum(len(self.queues[tenant].tasks) for tenant in self._active)
+
+    @classmethod
+    def for_load_balancer(cls, load_balancer: LoadBalancer, **kwargs) -> 'FairQueueDispatcher':
+        """Create a dispatcher assigning each task to the agent the load balancer picks.
+
+        Args:
+            load_balancer (LoadBalancer): Picks the agent for each dispatched task
+            **kwargs: Other FairQueueDispatcher arguments
+
+        Returns:
+            FairQueueDispatcher: The dispatcher
+        """
+        async def place(task: Dict[str, Any]) -> Optional[str]:
+            agent_id = await load_balancer.find_best_agent(
+                task.get('required_capabilities', []),
+                task_type=task.get('type'),
+                affinity_key=task.get('affinity_key')
+            )
+            if agent_id is not None:
+                await load_balancer.assign_task(agent_id)
+            return agent_id
+
+        return cls(place, **kwargs)
+
+    def set_tenant(self, tenant: str, weight: Optional[float] = None, quota: Optional[int] = None) -> None:
+        """Configure a tenant's share and quota.
+
+        Args:
+            tenant (str): Tenant or source identifier
+            weight (float, optional): Relative share of dispatch capacity
+            quota (int, optional): Maximum tasks queued at once
+
+        Raises:
+            ValueError: If the weight is not positive
+        """
+        if weight is not None and not weight > 0:
+            raise ValueError(f"Weight of tenant {tenant} must be positive")
+        queue = self._queue(tenant)
+        if weight is not None:
+            queue.weight = weight
+        if quota is not None:
+            queue.quota = quota
+
+    def enqueue(self, task: Dict[str, Any]) -> None:
+        """Queue a task under the tenant it is tagged with.
+
+        Args:
+            task (Dict[str, Any]): Task data; 'tenant' selects the queue and the optional
+                'cost' (default 1.0) is charged against the tenant's share
+
+        Raises:
+            ValueError: If the task's cost is not a positive finite number
+            TenantQuotaExceeded: If the tenant already has its quota of tasks queued
+        """
+        cost = task.get('cost', 1.0)
+        if not (isinstance(cost, (int, float)) and math.isfinite(cost) and cost > 0):
+            raise ValueError(f"Task cost must be a positive finite number, got {cost!r}")
+        queue = self._queue(task.get('tenant', DEFAULT_TENANT))
+        self.check_quota(queue.tenant)
+        if not queue.tasks:
+            self._active.append(queue.tenant)
+        queue.tasks.append(task)
+
+    def check_quota(self, tenant: str) -> None:
+        """Check that a tenant may queue another task, before anything is spent on it.
+
+        Args:
+            tenant (str): Tenant or source identifier
+
+        Raises:
+            TenantQuotaExceeded: If the tenant already has its quota of tasks queued
+        """
+        queue = self._queue(tenant)
+        if len(queue.tasks) >= queue.quota:
+            queue.rejected += 1
+            raise TenantQuotaExceeded(queue.tenant, queue.quota)
+
+    async def dispatch_next(self) -> Optional[Tuple[Dict[str, Any], str]]:
+        """Pick the next task by deficit round robin and place it.
+
+        A tenant whose head task finds no room keeps its place at the head
+        of the round but not the round's credit, so it is served first once
+        there is room without banking a burst, and tenants behind it are
+        still served meanwhile. A tenant short of credit for its head task
+        keeps the credit for its next visit. Each call visits every tenant
+        at most once without dispatching, so it always returns promptly.
+
+        Returns:
+            Optional[Tuple[Dict[str, Any], str]]: The task and its destination, or None if
+                nothing was dispatched in this pass; credit_pending then tells whether
+                calling again right away can make progress
+        """
+        blocked = 0
+        short = 0
+        while self._active and blocked + short < len(self._active):
+            # Tenants blocked in this pass stay in front of the one visited
+            queue = self.queues[self._active[blocked]]
+            credit = 0.0
+            visiting = self._visiting
+            if visiting != queue.tenant:
+                credit = self.quantum * queue.weight
+                queue.deficit += credit
+                self._visiting = queue.tenant
+
+            task = queue.tasks[0]
+            cost = task.get('cost', 1.0)
+            if cost > queue.deficit:
+                short += 1
+                self._end_turn(blocked)
+                continue
+
+            destination = await self.place(task)
+            if destination is None:
+                # No credit is banked for a visit that could not dispatch
+                queue.deficit -= credit
+                self._visiting = visiting
+                blocked += 1
+                continue
+
+            queue.tasks.popleft()
+            queue.deficit -= cost
+            queue.served += 1
+            queue.served_cost += cost
+            if not queue.tasks:
+                # Idle tenants do not bank credit for later bursts
+                queue.deficit = 0.0
+                del self._active[blocked]
+                self._visiting = None
+            self.credit_pending = False
+            return task, destination
+        self.credit_pending = short > 0
+        return None
+
+    def get_fairness_metrics(self) -> Dict[str, Any]:
+        """Get per-tenant accounting and Jain's fairness index of weighted service.
+
+        Returns:
+            Dict[str, Any]: Tenant statistics and a fairness index in (0, 1], 1 being perfectly fair
+        """
+        shares = [queue.served_cost / queue.weight for queue in self.queues.values() if queue.served_cost > 0]
+        squares = sum(share * share for share in shares)
+        return {
+            'tenants': {
+                tenant: {
+                    'weight': queue.weight,
+                    'queued': len(queue.tasks),
+                    'served': queue.served,
+                    'served_cost': queue.served_cost,
+                    'rejected': queue.rejected
+                }
+                for tenant, queue in self.queues.items()
+            },
+            'fairness_index': sum(shares) ** 2 / (len(shares) * squares) if squares else 1.0
+        }
+
+    def _queue(self, tenant: str) -> TenantQueue:
+        """Get or create a tenant's queue.
+
+        Args:
+            tenant (str): Tenant or source identifier
+
+        Returns:
+            TenantQueue: The tenant's queue
+        """
+        queue = self.queues.get(tenant)
+        if queue is None:
+            queue = self.queues[tenant] = TenantQueue(tenant, self.default_weight, self.default_quota)
+        return queue
+
+    def _end_turn(self, index: int) -> None:
+        """Move a tenant to the back of the round.
+
+        Args:
+            index (int): Position of the tenant in the round
+        """
+        tenant = self._active[index]
+        del self._active[index]
+        self._active.append(tenant)
+        self._visiting = None
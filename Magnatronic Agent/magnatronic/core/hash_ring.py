@@ -0,0 +1,91 @@
+"""Consistent Hashing Module for Magnatronic Multi-Agent System"""
+
+import bisect
+import hashlib
+from typing import Dict, List, Iterator
+
+def stable_hash(value: str) -> int:
+    """Hash a string identically in every process (unlike the built-in hash).
+
+    Args:
+        value (str): Value to hash
+
+    Returns:
+        int: 64-bit hash
+    """
+    return int.from_bytes(hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest(), 'big')
+
+class ConsistentHashRing:
+    """Hash ring mapping keys to nodes, moving few keys when nodes join or leave"""
+
+    def __init__(self, virtual_nodes: int = 100):
+        """Initialize an empty ring.
+
+        Args:
+            virtual_nodes (int): Points placed on the ring per node, smoothing the key split
+        """
+        self.virtual_nodes = virtual_nodes
+        self._points: List[int] = []
+        self._owners: List[str] = []
+        self._nodes: Dict[str, List[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def __contains__(self, node: str) -> bool:
+        return node in self._nodes
+
+    def add(self, node: str) -> None:
+        """Place a node on the ring.
+
+        Args:
+            node (str): Node to add
+        """
+        if node in self._nodes:
+            return
+        points = [stable_hash(f"{node}#{i}") for i in range(self.virtual_nodes)]
+        for point in points:
+            index = bisect.bisect_left(self._points, point)
+            self._points.insert(index, point)
+            self._owners.insert(index, node)
+        self._nodes[node] = points
+
+    def remove(self, node: str) -> None:
+        """Take a node off the ring.
+
+        Args:
+            node (str): Node to remove
+        """
+        points = self._nodes.pop(node, None)
+        if points is None:
+            return
+        for point in points:
+            index = bisect.bisect_left(self._points, point)
+            # Distinct nodes may collide on a point; find this node's entry
+            while self._owners[index] != node:
+                index += 1
+            del self._points[index]
+            del self._owners[index]
+
+    def iter_nodes(self, key: str) -> Iterator[str]:
+        """Iterate over distinct nodes in ring order, starting at the key's owner.
+
+        The first node is the key's home; later ones are where it spills over to.
+
+        Args:
+            key (str): Key to place
+
+        Yields:
+            str: Nodes in preference order for the key
+        """
+        if not self._points:
+            return
+        start = bisect.bisect(self._points, stable_hash(key)) % len(self._points)
+        seen = set()
+        for offset in range(len(self._points)):
+            node = self._owners[(start + offset) % len(self._points)]
+            if node not in seen:
+                seen.add(node)
+                yield node
+                if len(seen) == len(self._nodes):
+                    return
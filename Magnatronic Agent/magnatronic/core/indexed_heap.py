@@ -0,0 +1,137 @@
+"""Indexed Priority Queue Module for Magnatronic Multi-Agent System"""
+
+import heapq
+from typing import Dict, List, Optional, Tuple, Iterator
+
+class IndexedHeap:
+    """Binary min-heap of keyed priorities with O(log n) update and removal by key"""
+
+    def __init__(self):
+        """Initialize an empty heap."""
+        self._heap: List[Tuple[float, str]] = []
+        self._positions: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._positions
+
+    def priority(self, key: str) -> Optional[float]:
+        """Get the current priority of a key.
+
+        Args:
+            key (str): Key to look up
+
+        Returns:
+            Optional[float]: Priority of the key, or None if absent
+        """
+        position = self._positions.get(key)
+        return self._heap[position][0] if position is not None else None
+
+    def push(self, key: str, priority: float) -> None:
+        """Insert a key, or change its priority if already present.
+
+        Args:
+            key (str): Key to insert or update
+            priority (float): New priority (lower comes first)
+        """
+        position = self._positions.get(key)
+        if position is None:
+            self._heap.append((priority, key))
+            self._positions[key] = len(self._heap) - 1
+            self._sift_up(len(self._heap) - 1)
+            return
+
+        old_priority = self._heap[position][0]
+        self._heap[position] = (priority, key)
+        if priority < old_priority:
+            self._sift_up(position)
+        elif priority > old_priority:
+            self._sift_down(position)
+
+    def remove(self, key: str) -> None:
+        """Remove a key if present.
+
+        Args:
+            key (str): Key to remove
+        """
+        position = self._positions.pop(key, None)
+        if position is None:
+            return
+
+        last = self._heap.pop()
+        if position < len(self._heap):
+            self._heap[position] = last
+            self._positions[last[1]] = position
+            self._sift_up(position)
+            self._sift_down(self._positions[last[1]])
+
+    def peek(self) -> Optional[Tuple[str, float]]:
+        """Get the key with the lowest priority without removing it.
+
+        Returns:
+            Optional[Tuple[str, float]]: Key and priority, or None if empty
+        """
+        if not self._heap:
+            return None
+        priority, key = self._heap[0]
+        return key, priority
+
+    def iter_smallest(self) -> Iterator[Tuple[str, float]]:
+        """Iterate over keys in ascending priority without modifying the heap.
+
+        Each step costs O(log k) for the k entries yielded so far, so stopping
+        after a few entries stays cheap regardless of the heap size.
+
+        Yields:
+            Tuple[str, float]: Keys and their priorities, lowest first
+        """
+        if not self._heap:
+            return
+        frontier = [(self._heap[0], 0)]
+        while frontier:
+            (priority, key), position = heapq.heappop(frontier)
+            yield key, priority
+            for child in (2 * position + 1, 2 * position + 2):
+                if child < len(self._heap):
+                    heapq.heappush(frontier, (self._heap[child], child))
+
+    def _sift_up(self, position: int) -> None:
+        """Move an entry towards the root until the heap property holds.
+
+        Args:
+            position (int): Index of the entry
+        """
+        entry = self._heap[position]
+        while position > 0:
+            parent = (position - 1) // 2
+            if self._heap[parent] <= entry:
+                break
+            self._heap[position] = self._heap[parent]
+            self._positions[self._heap[position][1]] = position
+            position = parent
+        self._heap[position] = entry
+        self._positions[entry[1]] = position
+
+    def _sift_down(self, position: int) -> None:
+        """Move an entry towards the leaves until the heap property holds.
+
+        Args:
+            position (int): Index of the entry
+        """
+        size = len(self._heap)
+        entry = self._heap[position]
+        while True:
+            child = 2 * position + 1
+            if child >= size:
+                break
+            if child + 1 < size and self._heap[child + 1] < self._heap[child]:
+                child += 1
+            if entry <= self._heap[child]:
+                break
+            self._heap[position] = self._heap[child]
+            self._positions[self._heap[position][1]] = position
+            position = child
+        self._heap[position] = entry
+        self._positions[entry[1]] = position
@@ -0,0 +1,155 @@
+"""Latency Tracking Module for Magnatronic Multi-Agent System"""
+
+from typing import Dict, Iterable, Optional, Set, Tuple
+from dataclasses import dataclass
+
+@dataclass
+class EwmaStats:
+    """Data class for storing exponentially weighted latency and error rate"""
+    latency: float
+    error_rate: float = 0.0
+    samples: int = 0
+    latency_samples: int = 0  # Observations with a known latency; until the first, latency is the default
+
+    def update(self, latency: Optional[float], success: bool, alpha: float) -> None:
+        """Fold one observation into the moving averages.
+
+        Args:
+            latency (Optional[float]): Observed duration in seconds, or None if unknown
+            success (bool): Whether the task succeeded
+            alpha (float): Weight of the new observation
+        """
+        if latency is not None:
+            self.latency = latency if self.latency_samples == 0 else alpha * latency + (1 - alpha) * self.latency
+            self.latency_samples += 1
+        self.error_rate = alpha * (0.0 if success else 1.0) + (1 - alpha) * self.error_rate
+        self.samples += 1
+
+class LatencyTracker:
+    """Keeps EWMA latency and error rate per agent and per agent and task type"""
+
+    def __init__(self, alpha: float = 0.2, default_latency: float = 1.0, max_error_rate: float = 0.95):
+        """Initialize the latency tracker.
+
+        Args:
+            alpha (float): Weight of each new observation in the moving averages
+            default_latency (float): Latency assumed for agents with no observations
+            max_error_rate (float): Cap on the error rate used for predictions
+        """
+        self.alpha = alpha
+        self.default_latency = default_latency
+        self.max_error_rate = max_error_rate
+        self._agent_stats: Dict[str, EwmaStats] = {}
+        self._task_stats: Dict[Tuple[str, str], EwmaStats] = {}
+        self._seeded: Set[str] = set()  # Agents whose history was already looked at
+
+    def has_samples(self, agent_id: str) -> bool:
+        """Check whether any observation was recorded for an agent.
+
+        Args:
+            agent_id (str): ID of the agent
+
+        Returns:
+            bool: True if the agent has latency statistics
+        """
+        return agent_id in self._agent_stats
+
+    def needs_seed(self, agent_id: str) -> bool:
+        """Check whether an agent has neither been seeded nor observed yet.
+
+        Args:
+            agent_id (str): ID of the agent
+
+        Returns:
+            bool: True if seed should be called with the agent's history
+        """
+        return agent_id not in self._seeded and agent_id not in self._agent_stats
+
+    def seed(self, agent_id: str, response_times: Iterable[float]) -> None:
+        """Initialize an agent's latency from historical response times.
+
+        Only the first call for an agent counts, even if the history held no
+        positive response times.
+
+        Args:
+            agent_id (str): ID of the agent
+            response_times (Iterable[float]): Past response times in seconds, oldest first
+        """
+        if agent_id in self._seeded:
+            return
+        self._seeded.add(agent_id)
+        for response_time in response_times:
+            if response_time > 0:
+                self._stats(self._agent_stats, agent_id).update(response_time, True, self.alpha)
+
+    def record(self, agent_id: str, duration: Optional[float], success: bool = True,
+               task_type: Optional[str] = None) -> None:
+        """Record the outcome of a task.
+
+        Args:
+            agent_id (str): ID of the agent that ran the task
+            duration (Optional[float]): Task duration in seconds, or None if unknown
+            success (bool): Whether the task succeeded
+            task_type (str, optional): Type of the task
+        """
+        self._stats(self._agent_stats, agent_id).update(duration, success, self.alpha)
+        if task_type is not None:
+            self._stats(self._task_stats, (agent_id, task_type)).update(duration, success, self.alpha)
+
+    def get_stats(self, agent_id: str, task_type: Optional[str] = None) -> EwmaStats:
+        """Get the most specific statistics available for an agent.
+
+        Args:
+            agent_id (str): ID of the agent
+            task_type (str, optional): Type of the task
+
+        Returns:
+            EwmaStats: Task-type statistics if known, else the agent's, else defaults
+        """
+        if task_type is not None and (agent_id, task_type) in self._task_stats:
+            return self._task_stats[(agent_id, task_type)]
+        return self._agent_stats.get(agent_id) or EwmaStats(latency=self.default_latency)
+
+    def predicted_completion(self, agent_id: str, in_flight: int, task_type: Optional[str] = None) -> float:
+        """Predict how long a new task would take to complete on an agent.
+
+        The task waits behind the agent's in-flight work, and failed attempts
+        have to be retried, so expected time grows with both.
+
+        Args:
+            agent_id (str): ID of the agent
+            in_flight (int): Tasks already assigned to the agent
+            task_type (str, optional): Type of the task
+
+        Returns:
+            float: Predicted completion time in seconds
+        """
+        stats = self.get_stats(agent_id, task_type)
+        error_rate = min(stats.error_rate, self.max_error_rate)
+        return stats.latency * (in_flight + 1) / (1 - error_rate)
+
+    def remove(self, agent_id: str) -> None:
+        """Forget all statistics of an agent.
+
+        Args:
+            agent_id (str): ID of the agent
+        """
+        self._agent_stats.pop(agent_id, None)
+        self._seeded.discard(agent_id)
+        for key in [key for key in self._task_stats if key[0] == agent_id]:
+            del self._task_stats[key]
+
+    def _stats(self, table: Dict, key) -> EwmaStats:
+        """Get or create the statistics entry for a key.
+
+        Args:
+            table (Dict): Statistics table to look in
+            key: Agent ID or (agent ID, task type)
+
+        Returns:
+            EwmaStats: Statistics entry
+        """
+        stats = table.get(key)
+        if stats is None:
+            stats = table[key] = EwmaStats(latency=self.default_latency)
+        return stats
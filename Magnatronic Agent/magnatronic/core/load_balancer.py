@@ -1,9 +1,17 @@
 """Load Balancer Module for Magnatronic Multi-Agent System"""
 
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple, FrozenSet
 from datetime import datetime
 from dataclasses import dataclass
+import os
+import math
+import random
 from .monitoring import MonitoringSystem
+from .capability_index import CapabilityIndex
+from .indexed_heap import IndexedHeap
+from .latency_tracker import LatencyTracker
+from .hash_ring import ConsistentHashRing
+from .shared_state import SharedLoadState
 
 @dataclass
 class AgentLoad:
@@ -18,15 +26,51 @@ class AgentLoad:
 class LoadBalancer:
     """Handles task distribution and load balancing between agents"""
 
-    def __init__(self, monitoring_system: MonitoringSystem):
+    POLICIES = ('least_loaded', 'power_of_d', 'latency_aware')
+
+    def __init__(self, monitoring_system: MonitoringSystem, selection_policy: Optional[str] = None,
+                 choices: Optional[int] = None, seed: Optional[int] = None,
+                 shared_state: Optional[SharedLoadState] = None):
         """Initialize the load balancer.
 
         Args:
             monitoring_system (MonitoringSystem): Reference to the monitoring system
+            selection_policy (str, optional): 'least_loaded' picks the global minimum,
+                'power_of_d' picks the least loaded of d random candidates and
+                'latency_aware' picks the lowest predicted completion time. Defaults to
+                the MAGNATRONIC_LB_POLICY environment variable, or 'least_loaded'.
+            choices (int, optional): Candidates sampled by 'power_of_d'. Defaults to the
+                MAGNATRONIC_LB_CHOICES environment variable, or 2.
+            seed (int, optional): Seed for the random candidate sampling
+            shared_state (SharedLoadState, optional): Cluster-wide load state shared by all
+                gateway replicas. Without it, load is tracked for this process only.
         """
+        self.selection_policy = selection_policy or os.getenv('MAGNATRONIC_LB_POLICY', 'least_loaded')
+        if self.selection_policy not in self.POLICIES:
+            raise ValueError(f"Unknown selection policy: {self.selection_policy}")
+        self.choices = choices or int(os.getenv('MAGNATRONIC_LB_CHOICES', '2'))
+        self._random = random.Random(seed)
         self.monitoring = monitoring_system
+        self.shared_state = shared_state
         self.agent_loads: Dict[str, AgentLoad] = {}
+        self.capability_index = CapabilityIndex()
         self.load_threshold = 0.8  # 80% load threshold
+        self.latency = LatencyTracker()
+        self.latency_shortlist = 8  # Per-group candidates re-ranked by task type latency
+        self.latency_max_skips = 32  # Over-threshold agents passed per group before giving up on it
+        # Agents with identical capabilities share a heap ordered by the policy's score
+        self._group_heaps: Dict[FrozenSet[str], IndexedHeap] = {}
+        self._agent_groups: Dict[str, FrozenSet[str]] = {}
+        self._matching_groups: Dict[FrozenSet[str], List[FrozenSet[str]]] = {}
+        # Replicas of a capability group also share a hash ring for affinity routing
+        self._group_rings: Dict[FrozenSet[str], ConsistentHashRing] = {}
+        self._group_in_flight: Dict[FrozenSet[str], int] = {}
+        self.affinity_balance = 1.25  # Agents may take 25% more than the group average before spilling over
+        # Capabilities of agents taken out of rotation for missing heartbeats
+        self._inactive_capabilities: Dict[str, List[str]] = {}
+        # Metric changes are pushed as they are recorded instead of pulled per agent
+        self.monitoring.subscribe(self.apply_metric_updates)
+        self.monitoring.subscribe_status(self.apply_status_change)
 
     async def update_agent_load(self, agent_id: str, capabilities: List[str]) -> None:
         """Update load information for an agent.
@@ -35,17 +79,147 @@ class LoadBalancer:
             agent_id (str): ID of the agent
             capabilities (List[str]): List of agent capabilities
         """
-        metrics = await self.monitoring.get_agent_metrics(agent_id)
-        if metrics:
-            current = metrics['current']
-            self.agent_loads[agent_id] = AgentLoad(
+        await self.refresh_agent_loads({agent_id: capabilities})
+
+    async def refresh_agent_loads(self, agent_capabilities: Dict[str, List[str]]) -> None:
+        """Update load information for many agents in one pass.
+
+        In-flight task counts are kept, since the monitoring system does not know them.
+
+        Args:
+            agent_capabilities (Dict[str, List[str]]): Agent IDs mapped to their capabilities
+        """
+        for agent_id, capabilities in agent_capabilities.items():
+            current = self.monitoring.agent_metrics.get(agent_id)
+            if current is None:
+                continue
+
+            self._upsert_load(agent_id, current.cpu_usage, current.memory_usage, capabilities)
+            if self.shared_state is not None:
+                self.shared_state.publish_load(agent_id, current.cpu_usage, current.memory_usage, capabilities)
+
+    def _upsert_load(self, agent_id: str, cpu_usage: float, memory_usage: float,
+                     capabilities: List[str]) -> None:
+        """Create or update an agent's load entry and its index positions.
+
+        Args:
+            agent_id (str): ID of the agent
+            cpu_usage (float): Current CPU usage
+            memory_usage (float): Current memory usage
+            capabilities (List[str]): Capabilities of the agent
+        """
+        load = self.agent_loads.get(agent_id)
+        if load is None:
+            load = self.agent_loads[agent_id] = AgentLoad(
                 agent_id=agent_id,
-                cpu_usage=current['cpu_usage'],
-                memory_usage=current['memory_usage'],
-                task_count=0,  # Reset on update
-                last_task_timestamp=datetime.now(),
+                cpu_usage=cpu_usage,
+                memory_usage=memory_usage,
+                task_count=0,
+                last_task_timestamp=None,
                 capabilities=capabilities
             )
+        else:
+            load.cpu_usage = cpu_usage
+            load.memory_usage = memory_usage
+            load.capabilities = capabilities
+
+        self.capability_index.update(agent_id, capabilities)
+        history = self.monitoring.metrics_history.get(agent_id)
+        if history is not None and self.latency.needs_seed(agent_id):
+            self.latency.seed(agent_id, history.column('response_time').tolist())
+        self._place_in_group(agent_id)
+
+    def sync_shared_state(self) -> None:
+        """Bring local load in line with the cluster-wide shared state.
+
+        Does nothing while the shared state's local snapshot is fresh, so
+        calling it before every dispatch costs no network round trip.
+        Agents another replica removed are dropped here too.
+        """
+        if self.shared_state is None or self.shared_state.is_fresh():
+            return
+
+        loads = self.shared_state.get_loads()
+        for agent_id in [agent_id for agent_id in self.agent_loads if agent_id not in loads]:
+            self._forget_agent(agent_id)
+        for agent_id, shared in loads.items():
+            load = self.agent_loads.get(agent_id)
+            if (load is None or load.cpu_usage != shared['cpu_usage']
+                    or load.memory_usage != shared['memory_usage']
+                    or sorted(load.capabilities) != shared['capabilities']):
+                # Agents registered by other replicas are learned here
+                self._upsert_load(agent_id, shared['cpu_usage'], shared['memory_usage'], shared['capabilities'])
+            self.sync_task_counts({agent_id: shared['task_count']})
+
+    def apply_metric_updates(self, deltas: Dict[str, Dict[str, float]]) -> None:
+        """Apply metric changes pushed by the monitoring system.
+
+        Only agents already known to the balancer are updated; new agents are
+        added through update_agent_load, which also supplies their capabilities.
+
+        Args:
+            deltas (Dict[str, Dict[str, float]]): Agent IDs mapped to their changed fields
+        """
+        for agent_id, delta in deltas.items():
+            load = self.agent_loads.get(agent_id)
+            if load is None:
+                continue
+            if 'cpu_usage' in delta:
+                load.cpu_usage = delta['cpu_usage']
+            if 'memory_usage' in delta:
+                load.memory_usage = delta['memory_usage']
+            self._refresh_score(agent_id)
+            if self.shared_state is not None:
+                self.shared_state.publish_load(agent_id, load.cpu_usage, load.memory_usage, load.capabilities)
+
+    def apply_status_change(self, agent_id: str, status: str) -> None:
+        """Take an agent out of rotation when it goes inactive, and back in when it returns.
+
+        Args:
+            agent_id (str): ID of the agent
+            status (str): 'active' or 'inactive'
+        """
+        if status == 'inactive':
+            load = self.agent_loads.get(agent_id)
+            if load is not None:
+                self._inactive_capabilities[agent_id] = load.capabilities
+                self.remove_agent(agent_id)
+            return
+
+        capabilities = self._inactive_capabilities.pop(agent_id, None)
+        current = self.monitoring.agent_metrics.get(agent_id)
+        if capabilities is not None and current is not None:
+            self._upsert_load(agent_id, current.cpu_usage, current.memory_usage, capabilities)
+            if self.shared_state is not None:
+                self.shared_state.publish_load(agent_id, current.cpu_usage, current.memory_usage, capabilities)
+
+    def remove_agent(self, agent_id: str) -> None:
+        """Stop routing tasks to an agent and forget its load.
+
+        Args:
+            agent_id (str): ID of the agent
+        """
+        if self._forget_agent(agent_id) and self.shared_state is not None:
+            self.shared_state.remove(agent_id)
+
+    def _forget_agent(self, agent_id: str) -> bool:
+        """Drop an agent's load and index entries in this process only.
+
+        Args:
+            agent_id (str): ID of the agent
+
+        Returns:
+            bool: True if the agent was known
+        """
+        load = self.agent_loads.pop(agent_id, None)
+        if load is None:
+            return False
+        group = self._agent_groups.pop(agent_id, None)
+        if group is not None:
+            self._leave_group(agent_id, group, load.task_count)
+        self.capability_index.remove(agent_id)
+        self.latency.remove(agent_id)
+        return True
 
     def get_agent_load(self, agent_id: str) -> Optional[AgentLoad]:
         """Get current load information for an agent.
@@ -58,42 +232,130 @@ class LoadBalancer:
         """
         return self.agent_loads.get(agent_id)
 
-    async def find_best_agent(self, required_capabilities: List[str], exclude_agents: List[str] = None) -> Optional[str]:
+    async def find_best_agent(self, required_capabilities: List[str], exclude_agents: List[str] = None,
+                              task_type: Optional[str] = None, affinity_key: Optional[str] = None) -> Optional[str]:
         """Find the most suitable agent for a task based on load and capabilities.
 
         Args:
             required_capabilities (List[str]): Capabilities required for the task
             exclude_agents (List[str], optional): Agents to exclude from consideration
+            task_type (str, optional): Type of the task, used by the 'latency_aware' policy
+            affinity_key (str, optional): Entity the task concerns (patient, user, portfolio...).
+                Tasks with the same key go to the same agent replica while it has capacity.
+                TaskQueue routes keyed tasks to worker replicas on its own ring of replica queues.
 
         Returns:
             Optional[str]: ID of the best suited agent, if any
         """
-        exclude_agents = exclude_agents or []
-        candidates: List[Tuple[str, float]] = []
+        self.sync_shared_state()
 
-        for agent_id, load in self.agent_loads.items():
-            if agent_id in exclude_agents:
-                continue
+        if affinity_key is not None:
+            agent_id = self._affinity_agent(required_capabilities, exclude_agents, affinity_key)
+            if agent_id is not None:
+                return agent_id
 
-            # Check if agent has all required capabilities
-            if not all(cap in load.capabilities for cap in required_capabilities):
-                continue
+        if self.selection_policy == 'power_of_d':
+            agent_id = self._sample_best_agent(required_capabilities, exclude_agents)
+            if agent_id is not None:
+                return agent_id
 
-            # Calculate load score (lower is better)
-            load_score = (
-                load.cpu_usage * 0.4 +  # 40% weight to CPU usage
-                load.memory_usage * 0.3 +  # 30% weight to memory usage
-                (load.task_count / 10) * 0.3  # 30% weight to task count (normalized)
-            )
+        exclude = set(exclude_agents or ())
+        latency_aware = self.selection_policy == 'latency_aware'
+        per_group = self.latency_shortlist if latency_aware and task_type else 1
+        shortlist: List[str] = []
+        cut_short = False
 
-            if load_score < self.load_threshold:
-                candidates.append((agent_id, load_score))
+        # Best eligible agents of each capable group, read off its heap
+        for group in self._groups_with(required_capabilities):
+            taken = skipped = 0
+            for agent_id, _ in self._group_heaps[group].iter_smallest():
+                if self._load_score(self.agent_loads[agent_id]) >= self.load_threshold:
+                    if not latency_aware:
+                        break  # Heap is ordered by load score, the rest are over too
+                    skipped += 1
+                    if skipped == self.latency_max_skips:
+                        # Over-threshold agents can sit anywhere in a latency-ordered heap
+                        cut_short = True
+                        break
+                    continue
+                if agent_id in exclude:
+                    continue
+                shortlist.append(agent_id)
+                taken += 1
+                if taken == per_group:
+                    break
 
-        if not candidates:
+        if not shortlist:
+            # Settle for the least loaded of a few sampled agents rather than scan every group
+            return self._sample_best_agent(required_capabilities, exclude_agents) if cut_short else None
+        return min(shortlist, key=lambda agent_id: self._priority(agent_id, task_type))
+
+    def _affinity_agent(self, required_capabilities: List[str], exclude_agents: Optional[List[str]],
+                        affinity_key: str) -> Optional[str]:
+        """Pick the agent owning an affinity key on the consistent-hash ring, with bounded load.
+
+        The key's home agent is used unless it holds more than affinity_balance
+        times its group's average in-flight count, in which case the task spills
+        over to the next agent on the ring. Keys keep their home when other
+        agents join or leave, so per-entity state stays where it is cached.
+
+        Args:
+            required_capabilities (List[str]): Capabilities required for the task
+            exclude_agents (List[str], optional): Agents to exclude from consideration
+            affinity_key (str): Entity the task concerns
+
+        Returns:
+            Optional[str]: ID of the chosen agent, or None if no agent on the ring can take it
+        """
+        groups = self._groups_with(required_capabilities)
+        if not groups:
             return None
 
-        # Return agent with lowest load score
-        return min(candidates, key=lambda x: x[1])[0]
+        # The most specific group is chosen deterministically so every replica agrees
+        group = min(groups, key=lambda g: (len(g), sorted(g)))
+        ring = self._group_rings[group]
+        capacity = math.ceil(self.affinity_balance * (self._group_in_flight[group] + 1) / len(ring))
+        exclude = set(exclude_agents or ())
+        for agent_id in ring.iter_nodes(affinity_key):
+            load = self.agent_loads[agent_id]
+            if agent_id in exclude or self._load_score(load) >= self.load_threshold:
+                continue
+            if load.task_count < capacity:
+                return agent_id
+        return None
+
+    def _sample_best_agent(self, required_capabilities: List[str],
+                           exclude_agents: Optional[List[str]]) -> Optional[str]:
+        """Pick the least loaded of a few randomly sampled capable agents.
+
+        Sampling keeps replicas working from slightly stale load information
+        from all herding onto the same global minimum.
+
+        Args:
+            required_capabilities (List[str]): Capabilities required for the task
+            exclude_agents (List[str], optional): Agents to exclude from consideration
+
+        Returns:
+            Optional[str]: ID of the chosen agent, or None if no sampled agent is under the load threshold
+        """
+        bits = self.capability_index.lookup_bits(required_capabilities, exclude_agents)
+        best: Optional[Tuple[str, float]] = None
+        for agent_id in self.capability_index.sample(bits, self.choices, self._random):
+            load_score = self._load_score(self.agent_loads[agent_id])
+            if load_score < self.load_threshold and (best is None or load_score < best[1]):
+                best = (agent_id, load_score)
+        return best[0] if best else None
+
+    def get_capable_agents(self, required_capabilities: List[str]) -> List[str]:
+        """Get all agents that have every required capability, regardless of load.
+
+        Args:
+            required_capabilities (List[str]): Capabilities required for the task
+
+        Returns:
+            List[str]: IDs of capable agents
+        """
+        return self.capability_index.lookup(required_capabilities)
 
     async def assign_task(self, agent_id: str) -> bool:
         """Record task assignment to an agent.
@@ -106,27 +368,50 @@ class LoadBalancer:
         """
         if agent_id in self.agent_loads:
             load = self.agent_loads[agent_id]
-            load.task_count += 1
+            shared_count = self.shared_state.assign(agent_id) if self.shared_state is not None else None
+            self._set_task_count(agent_id, load.task_count + 1 if shared_count is None else shared_count)
             load.last_task_timestamp = datetime.now()
+            self._refresh_score(agent_id)
             return True
         return False
 
-    async def complete_task(self, agent_id: str) -> bool:
+    async def complete_task(self, agent_id: str, duration: Optional[float] = None,
+                            success: bool = True, task_type: Optional[str] = None) -> bool:
         """Record task completion for an agent.
 
         Args:
             agent_id (str): ID of the agent
+            duration (float, optional): Task duration in seconds
+            success (bool): Whether the task succeeded
+            task_type (str, optional): Type of the completed task
 
         Returns:
             bool: True if completion was recorded successfully
         """
         if agent_id in self.agent_loads:
             load = self.agent_loads[agent_id]
-            if load.task_count > 0:
-                load.task_count -= 1
+            shared_count = self.shared_state.complete(agent_id) if self.shared_state is not None else None
+            if shared_count is not None:
+                self._set_task_count(agent_id, shared_count)
+            elif load.task_count > 0:
+                self._set_task_count(agent_id, load.task_count - 1)
+            self.latency.record(agent_id, duration, success, task_type)
+            self._refresh_score(agent_id)
             return True
         return False
 
+    def sync_task_counts(self, task_counts: Dict[str, int]) -> None:
+        """Overwrite in-flight task counts with an authoritative snapshot.
+
+        Args:
+            task_counts (Dict[str, int]): Agent IDs mapped to their in-flight task counts
+        """
+        for agent_id, task_count in task_counts.items():
+            load = self.agent_loads.get(agent_id)
+            if load is not None and load.task_count != task_count:
+                self._set_task_count(agent_id, task_count)
+                self._refresh_score(agent_id)
+
     def get_system_load_distribution(self) -> Dict[str, float]:
         """Get current load distribution across all agents.
 
@@ -134,7 +419,121 @@ class LoadBalancer:
             Dict[str, float]: Agent IDs mapped to their load percentages
         """
         return {
-            agent_id: (load.cpu_usage * 0.4 + load.memory_usage * 0.3 + 
-                      (load.task_count / 10) * 0.3)
+            agent_id: self._load_score(load)
             for agent_id, load in self.agent_loads.items()
-        }
\ No newline at end of file
+        }
+
+    @staticmethod
+    def _load_score(load: AgentLoad) -> float:
+        """Calculate the load score of an agent (lower is better).
+
+        Args:
+            load (AgentLoad): Load information of the agent
+
+        Returns:
+            float: Weighted load score
+        """
+        return (
+            load.cpu_usage * 0.4 +  # 40% weight to CPU usage
+            load.memory_usage * 0.3 +  # 30% weight to memory usage
+            (load.task_count / 10) * 0.3  # 30% weight to task count (normalized)
+        )
+
+    def _place_in_group(self, agent_id: str) -> None:
+        """Move an agent into the heap of its capability group and refresh its score.
+
+        Args:
+            agent_id (str): ID of the agent
+        """
+        group = self.capability_index.get_capabilities(agent_id)
+        previous = self._agent_groups.get(agent_id)
+        task_count = self.agent_loads[agent_id].task_count
+        if previous == group:
+            self._refresh_score(agent_id)
+            return
+
+        if previous is not None:
+            self._leave_group(agent_id, previous, task_count)
+
+        if group not in self._group_heaps:
+            self._group_heaps[group] = IndexedHeap()
+            self._group_rings[group] = ConsistentHashRing()
+            self._group_in_flight[group] = 0
+            self._matching_groups.clear()
+        self._group_rings[group].add(agent_id)
+        self._group_in_flight[group] += task_count
+        self._agent_groups[agent_id] = group
+        self._refresh_score(agent_id)
+
+    def _leave_group(self, agent_id: str, group: FrozenSet[str], task_count: int) -> None:
+        """Take an agent out of a capability group, dropping the group once empty.
+
+        Args:
+            agent_id (str): ID of the agent
+            group (FrozenSet[str]): Group the agent is in
+            task_count (int): The agent's in-flight tasks, counted in the group total
+        """
+        self._group_heaps[group].remove(agent_id)
+        self._group_rings[group].remove(agent_id)
+        self._group_in_flight[group] -= task_count
+        if not self._group_heaps[group]:
+            del self._group_heaps[group]
+            del self._group_rings[group]
+            del self._group_in_flight[group]
+            self._matching_groups.clear()
+
+    def _set_task_count(self, agent_id: str, task_count: int) -> None:
+        """Change an agent's in-flight count, keeping its group total in step.
+
+        Args:
+            agent_id (str): ID of the agent
+            task_count (int): New in-flight task count
+        """
+        load = self.agent_loads[agent_id]
+        group = self._agent_groups.get(agent_id)
+        if group is not None:
+            self._group_in_flight[group] += task_count - load.task_count
+        load.task_count = task_count
+
+    def _refresh_score(self, agent_id: str) -> None:
+        """Re-position an agent in its group heap after its load changed.
+
+        Args:
+            agent_id (str): ID of the agent
+        """
+        group = self._agent_groups.get(agent_id)
+        if group is not None:
+            self._group_heaps[group].push(agent_id, self._priority(agent_id))
+
+    def _priority(self, agent_id: str, task_type: Optional[str] = None) -> float:
+        """Get the score an agent is ranked by under the selection policy (lower is better).
+
+        Args:
+            agent_id (str): ID of the agent
+            task_type (str, optional): Type of the task being placed
+
+        Returns:
+            float: Predicted completion time for 'latency_aware', otherwise the load score
+        """
+        load = self.agent_loads[agent_id]
+        if self.selection_policy == 'latency_aware':
+            return self.latency.predicted_completion(agent_id, load.task_count, task_type)
+        return self._load_score(load)
+
+    def _groups_with(self, required_capabilities: List[str]) -> List[FrozenSet[str]]:
+        """Get the capability groups that cover every required capability.
+
+        Results are cached per requirement set until a group is added or removed.
+
+        Args:
+            required_capabilities (List[str]): Capabilities required for the task
+
+        Returns:
+            List[FrozenSet[str]]: Matching capability groups
+        """
+        required = frozenset(required_capabilities)
+        groups = self._matching_groups.get(required)
+        if groups is None:
+            groups = [group for group in self._group_heaps if required <= group]
+            self._matching_groups[required] = groups
+        return groups
@@ -0,0 +1,544 @@
+"""Metrics Ring Buffer Module for Magnatronic Multi-Agent System"""
+
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+from datetime import datetime
+import numpy as np
+
+def to_epoch_us(timestamp: datetime) -> int:
+    """Convert a datetime to integer microseconds since the epoch.
+
+    Args:
+        timestamp (datetime): Time to convert
+
+    Returns:
+        int: Microseconds since the epoch
+    """
+    return int(round(timestamp.timestamp() * 1_000_000))
+
+def from_epoch_us(timestamp: int) -> datetime:
+    """Convert integer microseconds since the epoch to a datetime.
+
+    Args:
+        timestamp (int): Microseconds since the epoch
+
+    Returns:
+        datetime: Local time
+    """
+    return datetime.fromtimestamp(int(timestamp) / 1_000_000)
+
+def downsample(timestamps: np.ndarray, columns: Dict[str, np.ndarray],
+               max_points: int) -> Tuple[np.ndarray, Dict[str, np.ndarray], np.ndarray]:
+    """Average consecutive samples into at most max_points points.
+
+    Args:
+        timestamps (np.ndarray): Sample timestamps, oldest first
+        columns (Dict[str, np.ndarray]): Metric columns aligned with timestamps
+        max_points (int): Most points to return
+
+    Returns:
+        Tuple[np.ndarray, Dict[str, np.ndarray], np.ndarray]: Timestamp of each point's first
+            sample, mean of each metric (NaN where no sample had it) and samples per point
+    """
+    if timestamps.size <= max_points:
+        return timestamps, columns, np.ones(timestamps.size, dtype=np.int64)
+    starts = np.linspace(0, timestamps.size, max_points, endpoint=False).astype(np.int64)
+    sizes = np.diff(np.append(starts, timestamps.size))
+    means = {}
+    for field, values in columns.items():
+        present = ~np.isnan(values)
+        counts = np.add.reduceat(present.astype(np.int64), starts)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means[field] = np.add.reduceat(np.where(present, values, 0.0), starts) / counts
+    return timestamps[starts], means, sizes
+
+def summarize(values: np.ndarray, percentiles: Sequence[float] = (50, 95, 99)) -> Dict[str, Any]:
+    """Summarize metric values.
+
+    Args:
+        values (np.ndarray): Values, NaN where a sample lacked the metric
+        percentiles (Sequence[float]): Percentiles to compute, from 0 to 100
+
+    Returns:
+        Dict[str, Any]: count, mean, min, max and p<N> for each percentile;
+            statistics are None when there are no values
+    """
+    values = values[~np.isnan(values)]
+    summary: Dict[str, Any] = {'count': int(values.size)}
+    if values.size:
+        summary.update(mean=float(values.mean()), min=float(values.min()), max=float(values.max()))
+        for percentile, value in zip(percentiles, np.percentile(values, percentiles)):
+            summary[f'p{percentile:g}'] = float(value)
+    else:
+        summary.update(mean=None, min=None, max=None)
+        summary.update({f'p{percentile:g}': None for percentile in percentiles})
+    return summary
+
+def bucketize(timestamps: np.ndarray, values: np.ndarray, resolution: int) -> Dict[str, np.ndarray]:
+    """Aggregate one metric's samples into fixed-width buckets, as MetricsRollup does.
+
+    Args:
+        timestamps (np.ndarray): Sample timestamps in epoch microseconds, oldest first
+        values (np.ndarray): Metric values aligned with timestamps, NaN where missing
+        resolution (int): Bucket width in microseconds
+
+    Returns:
+        Dict[str, np.ndarray]: Start timestamps and min, max, avg and count of the
+            buckets holding at least one value, oldest first
+    """
+    present = ~np.isnan(values)
+    timestamps, values = timestamps[present], values[present]
+    starts, first = np.unique(timestamps - timestamps % resolution, return_index=True)
+    if not starts.size:
+        empty = np.zeros(0)
+        return {'timestamp': starts, 'min': empty, 'max': empty, 'avg': empty,
+                'count': np.zeros(0, dtype=np.int64)}
+    count = np.diff(np.append(first, values.size))
+    return {
+        'timestamp': starts,
+        'min': np.minimum.reduceat(values, first),
+        'max': np.maximum.reduceat(values, first),
+        'avg': np.add.reduceat(values, first) / count,
+        'count': count
+    }
+
+class MetricsRingBuffer:
+    """Fixed-capacity columnar history of one agent's metric samples.
+
+    Each metric is a preallocated float64 column and timestamps an int64
+    column of epoch microseconds, overwritten in place once the buffer is
+    full. A metric missing from a sample is stored as NaN and ignored by
+    aggregations. Metrics first seen after creation get a new column.
+    """
+
+    def __init__(self, capacity: int, fields: Sequence[str] = ()):
+        """Initialize an empty buffer.
+
+        Args:
+            capacity (int): Maximum number of samples kept
+            fields (Sequence[str]): Metrics to preallocate columns for
+        """
+        self.capacity = capacity
+        self._timestamps = np.zeros(capacity, dtype=np.int64)
+        self._columns: Dict[str, np.ndarray] = {}
+        self._head = 0  # Index the next sample is written to
+        self._size = 0
+        for field in fields:
+            self._add_column(field)
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def fields(self) -> List[str]:
+        """Names of the metrics stored."""
+        return list(self._columns)
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the column arrays."""
+        return self._timestamps.nbytes + sum(column.nbytes for column in self._columns.values())
+
+    def append(self, timestamp: int, metrics: Dict[str, Any]) -> None:
+        """Record a sample, overwriting the oldest once full.
+
+        Args:
+            timestamp (int): Sample time in epoch microseconds
+            metrics (Dict[str, Any]): Metric values; non-numeric values are not stored
+        """
+        index = self._head
+        self._timestamps[index] = timestamp
+        for field, column in self._columns.items():
+            column[index] = np.nan
+        for field, value in metrics.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                column = self._columns.get(field)
+                if column is None:
+                    column = self._add_column(field)
+                column[index] = value
+        self._head = (index + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+
+    def timestamps(self, start: Optional[int] = None, end: Optional[int] = None) -> np.ndarray:
+        """Get sample timestamps in a time window, oldest first.
+
+        Args:
+            start (int, optional): Inclusive window start in epoch microseconds
+            end (int, optional): Exclusive window end in epoch microseconds
+
+        Returns:
+            np.ndarray: int64 epoch microsecond timestamps
+        """
+        return self._slice(self._timestamps, self._window(start, end))
+
+    def column(self, field: str, start: Optional[int] = None, end: Optional[int] = None) -> np.ndarray:
+        """Get one metric's values in a time window, oldest first.
+
+        Args:
+            field (str): Metric name
+            start (int, optional): Inclusive window start in epoch microseconds
+            end (int, optional): Exclusive window end in epoch microseconds
+
+        Returns:
+            np.ndarray: float64 values, NaN where a sample lacked the metric
+        """
+        window = self._window(start, end)
+        column = self._columns.get(field)
+        if column is None:
+            return np.full(window.stop - window.start, np.nan)
+        return self._slice(column, window)
+
+    def aggregate(self, field: str, start: Optional[int] = None, end: Optional[int] = None,
+                  percentiles: Sequence[float] = (50, 95, 99)) -> Dict[str, Any]:
+        """Summarize one metric over a time window.
+
+        Args:
+            field (str): Metric name
+            start (int, optional): Inclusive window start in epoch microseconds
+            end (int, optional): Exclusive window end in epoch microseconds
+            percentiles (Sequence[float]): Percentiles to compute, from 0 to 100
+
+        Returns:
+            Dict[str, Any]: count, mean, min, max and p<N> for each percentile;
+                statistics are None when the window holds no values
+        """
+        return summarize(self.column(field, start, end), percentiles)
+
+    def to_records(self, start: Optional[int] = None, end: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Expand samples into the dictionary form used by the metrics API.
+
+        Args:
+            start (int, optional): Inclusive window start in epoch microseconds
+            end (int, optional): Exclusive window end in epoch microseconds
+
+        Returns:
+            List[Dict[str, Any]]: Samples as {'timestamp': ISO string, 'metrics': values}, oldest first
+        """
+        window = self._window(start, end)
+        timestamps = self._slice(self._timestamps, window)
+        columns = {field: self._slice(column, window) for field, column in self._columns.items()}
+        return [
+            {
+                'timestamp': from_epoch_us(timestamp).isoformat(),
+                'metrics': {
+                    field: float(values[i]) for field, values in columns.items()
+                    if not np.isnan(values[i])
+                }
+            }
+            for i, timestamp in enumerate(timestamps)
+        ]
+
+    def select(self, start: Optional[int] = None, end: Optional[int] = None,
+               fields: Optional[Sequence[str]] = None, skip: int = 0,
+               limit: Optional[int] = None) -> Tuple[np.ndarray, Dict[str, np.ndarray], bool]:
+        """Read a page of samples in a time window, copying only the rows and columns asked for.
+
+        Args:
+            start (int, optional): Inclusive window start in epoch microseconds
+            end (int, optional): Exclusive window end in epoch microseconds
+            fields (Sequence[str], optional): Metrics to read; all if None
+            skip (int): Samples at the start of the window to leave out
+            limit (int, optional): Most samples to read
+
+        Returns:
+            Tuple[np.ndarray, Dict[str, np.ndarray], bool]: Timestamps, metric columns
+                and whether the window holds more samples after this page
+        """
+        window = self._window(start, end)
+        low = min(window.start + skip, window.stop)
+        high = window.stop if limit is None else min(low + limit, window.stop)
+        page = slice(low, high)
+        columns = {}
+        for field in (self._columns if fields is None else fields):
+            column = self._columns.get(field)
+            columns[field] = np.full(high - low, np.nan) if column is None else self._slice(column, page)
+        return self._slice(self._timestamps, page), columns, high < window.stop
+
+    def covers(self, start: Optional[int]) -> bool:
+        """Check whether no sample at or after a time has been overwritten yet.
+
+        Args:
+            start (int, optional): Epoch microseconds, or None for all time
+
+        Returns:
+            bool: True if every sample recorded since start is still held
+        """
+        if self._size < self.capacity:
+            return True
+        return start is not None and int(self._timestamps[self._head]) <= start
+
+    def count(self, start: Optional[int] = None, end: Optional[int] = None) -> int:
+        """Count samples in a time window.
+
+        Args:
+            start (int, optional): Inclusive window start in epoch microseconds
+            end (int, optional): Exclusive window end in epoch microseconds
+
+        Returns:
+            int: Number of samples
+        """
+        window = self._window(start, end)
+        return window.stop - window.start
+
+    def _add_column(self, field: str) -> np.ndarray:
+        """Allocate a NaN-filled column for a metric.
+
+        Args:
+            field (str): Metric name
+
+        Returns:
+            np.ndarray: The new column
+        """
+        column = self._columns[field] = np.full(self.capacity, np.nan)
+        return column
+
+    def _slice(self, array: np.ndarray, window: slice) -> np.ndarray:
+        """Get a chronological index range of a column, oldest sample first.
+
+        Args:
+            array (np.ndarray): Column or timestamp array
+            window (slice): Index range in chronological order
+
+        Returns:
+            np.ndarray: View of the range, or a copy of only the range if it wraps around
+        """
+        if self._size < self.capacity:
+            return array[window.start:window.stop]
+        low, high = self._head + window.start, self._head + window.stop
+        if high <= self.capacity:
+            return array[low:high]
+        if low >= self.capacity:
+            return array[low - self.capacity:high - self.capacity]
+        return np.concatenate((array[low:], array[:high - self.capacity]))
+
+    def _search(self, timestamp: int) -> int:
+        """Find the chronological index of the first sample at or after a time.
+
+        Args:
+            timestamp (int): Epoch microseconds
+
+        Returns:
+            int: Index in chronological order
+        """
+        if self._size < self.capacity:
+            return int(np.searchsorted(self._timestamps[:self._size], timestamp, side='left'))
+        # Once wrapped, the buffer holds two sorted runs: [head:] then [:head]
+        older = self._timestamps[self._head:]
+        index = int(np.searchsorted(older, timestamp, side='left'))
+        if index < older.size:
+            return index
+        return older.size + int(np.searchsorted(self._timestamps[:self._head], timestamp, side='left'))
+
+    def _window(self, start: Optional[int], end: Optional[int]) -> slice:
+        """Find the chronological index range of samples in a time window.
+
+        Args:
+            start (int, optional): Inclusive window start in epoch microseconds
+            end (int, optional): Exclusive window end in epoch microseconds
+
+        Returns:
+            slice: Index range into the chronological arrays
+        """
+        low = 0 if start is None else self._search(start)
+        high = self._size if end is None else self._search(end)
+        return slice(low, max(low, high))
+
+class MetricsRollup:
+    """Fixed-capacity columnar history of per-bucket metric aggregates at one resolution.
+
+    Samples are folded into the bucket covering their timestamp as they
+    arrive, keeping min, max, sum and count per metric, so no raw samples
+    need to be retained. The newest bucket is partial until time moves on.
+    Samples older than the newest bucket are folded into it. Columns start
+    small and double as buckets are opened, so a rarely-reporting agent
+    does not hold a full retention window of empty buckets.
+    """
+
+    INITIAL_BUCKETS = 16  # Buckets allocated before the first growth
+
+    def __init__(self, resolution: int, capacity: int, fields: Sequence[str] = ()):
+        """Initialize an empty rollup.
+
+        Args:
+            resolution (int): Bucket width in microseconds
+            capacity (int): Maximum number of buckets kept
+            fields (Sequence[str]): Metrics to preallocate columns for
+        """
+        self.resolution = resolution
+        self.capacity = capacity
+        self._allocated = min(capacity, self.INITIAL_BUCKETS)
+        self._starts = np.zeros(self._allocated, dtype=np.int64)
+        self._min: Dict[str, np.ndarray] = {}
+        self._max: Dict[str, np.ndarray] = {}
+        self._sum: Dict[str, np.ndarray] = {}
+        self._count: Dict[str, np.ndarray] = {}
+        self._head = 0  # Index of the newest bucket
+        self._size = 0
+        for field in fields:
+            self._add_column(field)
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the column arrays."""
+        return self._starts.nbytes + sum(
+            column.nbytes for columns in (self._min, self._max, self._sum, self._count)
+            for column in columns.values()
+        )
+
+    def append(self, timestamp: int, metrics: Dict[str, Any]) -> None:
+        """Fold a sample into its bucket.
+
+        Args:
+            timestamp (int): Sample time in epoch microseconds
+            metrics (Dict[str, Any]): Metric values; non-numeric values are ignored
+        """
+        bucket = timestamp - timestamp % self.resolution
+        if self._size == 0 or bucket > self._starts[self._head]:
+            self._open_bucket(bucket)
+        index = self._head
+        for field, value in metrics.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                if field not in self._sum:
+                    self._add_column(field)
+                if self._count[field][index]:
+                    self._min[field][index] = min(self._min[field][index], value)
+                    self._max[field][index] = max(self._max[field][index], value)
+                else:
+                    self._min[field][index] = self._max[field][index] = value
+                self._sum[field][index] += value
+                self._count[field][index] += 1
+
+    def buckets(self, field: str, start: Optional[int] = None,
+                end: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """Get one metric's buckets overlapping a time window, oldest first.
+
+        Args:
+            field (str): Metric name
+            start (int, optional): Inclusive window start in epoch microseconds
+            end (int, optional): Exclusive window end in epoch microseconds
+
+        Returns:
+            Dict[str, np.ndarray]: Bucket start timestamps and min, max, avg and count
+                per bucket; statistics are NaN for buckets without the metric
+        """
+        window = self._window(start, end)
+        timestamps = self._ordered(self._starts)[window]
+        if field not in self._sum:
+            empty = np.full(timestamps.size, np.nan)
+            return {'timestamp': timestamps, 'min': empty, 'max': empty, 'avg': empty,
+                    'count': np.zeros(timestamps.size, dtype=np.int64)}
+        count = self._ordered(self._count[field])[window]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            avg = self._ordered(self._sum[field])[window] / count
+        return {
+            'timestamp': timestamps,
+            'min': self._ordered(self._min[field])[window],
+            'max': self._ordered(self._max[field])[window],
+            'avg': avg,
+            'count': count
+        }
+
+    def covers(self, start: Optional[int]) -> bool:
+        """Check whether no bucket at or after a time has been overwritten yet.
+
+        Args:
+            start (int, optional): Epoch microseconds, or None for all time
+
+        Returns:
+            bool: True if every bucket since start is still held
+        """
+        if self._size < self.capacity:
+            return True
+        oldest = int(self._starts[(self._head + 1) % self.capacity])
+        return start is not None and oldest <= start - start % self.resolution
+
+    def count(self, start: Optional[int] = None, end: Optional[int] = None) -> int:
+        """Count buckets overlapping a time window.
+
+        Args:
+            start (int, optional): Inclusive window start in epoch microseconds
+            end (int, optional): Exclusive window end in epoch microseconds
+
+        Returns:
+            int: Number of buckets
+        """
+        window = self._window(start, end)
+        return window.stop - window.start
+
+    def _open_bucket(self, bucket: int) -> None:
+        """Start a new empty bucket, overwriting the oldest once full.
+
+        Args:
+            bucket (int): Bucket start in epoch microseconds
+        """
+        if self._size == self._allocated < self.capacity:
+            self._grow()
+        if self._size:
+            self._head = (self._head + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+        index = self._head
+        self._starts[index] = bucket
+        for field in self._sum:
+            self._min[field][index] = np.nan
+            self._max[field][index] = np.nan
+            self._sum[field][index] = 0.0
+            self._count[field][index] = 0
+
+    def _grow(self) -> None:
+        """Double the allocated buckets, up to capacity.
+
+        Only called before the buffer first wraps, so buckets are still in
+        chronological order and the columns can simply be extended.
+        """
+        extra = min(self.capacity, 2 * self._allocated) - self._allocated
+        self._allocated += extra
+        self._starts = np.concatenate((self._starts, np.zeros(extra, dtype=np.int64)))
+        for field in self._sum:
+            self._min[field] = np.concatenate((self._min[field], np.full(extra, np.nan)))
+            self._max[field] = np.concatenate((self._max[field], np.full(extra, np.nan)))
+            self._sum[field] = np.concatenate((self._sum[field], np.zeros(extra)))
+            self._count[field] = np.concatenate((self._count[field], np.zeros(extra, dtype=np.int64)))
+
+    def _add_column(self, field: str) -> None:
+        """Allocate empty aggregate columns for a metric.
+
+        Args:
+            field (str): Metric name
+        """
+        self._min[field] = np.full(self._allocated, np.nan)
+        self._max[field] = np.full(self._allocated, np.nan)
+        self._sum[field] = np.zeros(self._allocated)
+        self._count[field] = np.zeros(self._allocated, dtype=np.int64)
+
+    def _ordered(self, array: np.ndarray) -> np.ndarray:
+        """Get the filled part of a column, oldest bucket first.
+
+        Args:
+            array (np.ndarray): Aggregate or bucket start array
+
+        Returns:
+            np.ndarray: Chronological view (or copy, once the buffer has wrapped)
+        """
+        if self._size < self.capacity:
+            return array[:self._size]
+        oldest = (self._head + 1) % self.capacity
+        return np.concatenate((array[oldest:], array[:oldest]))
+
+    def _window(self, start: Optional[int], end: Optional[int]) -> slice:
+        """Find the chronological index range of buckets overlapping a time window.
+
+        Args:
+            start (int, optional): Inclusive window start in epoch microseconds
+            end (int, optional): Exclusive window end in epoch microseconds
+
+        Returns:
+            slice: Index range into the chronological arrays
+        """
+        if start is None and end is None:
+            return slice(0, self._size)
+        starts = self._ordered(self._starts)
+        low = 0 if start is None else int(np.searchsorted(starts, start - start % self.resolution, side='left'))
+        high = self._size if end is None else int(np.searchsorted(starts, end, side='left'))
+        return slice(low, max(low, high))
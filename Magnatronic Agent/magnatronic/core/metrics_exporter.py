@@ -0,0 +1,81 @@
+"""Prometheus Metrics Module for Magnatronic Multi-Agent System
+
+Collectors are registered once at import and updated where the events
+happen (metric ingest, task submission, broker publishes, HTTP requests),
+so a scrape only serializes current values. When PROMETHEUS_MULTIPROC_DIR
+is set before this module is first imported, every worker process writes
+its values to that directory and a scrape of any worker aggregates them.
+"""
+
+from typing import Dict, Tuple
+import os
+from prometheus_client import (
+    CollectorRegistry, Counter, Gauge, Histogram, CONTENT_TYPE_LATEST, REGISTRY,
+    generate_latest, multiprocess
+)
+from .monitoring import MonitoringSystem
+
+MULTIPROCESS = bool(os.environ.get('PROMETHEUS_MULTIPROC_DIR'))
+
+# Agent gauges keep the latest value reported by any live worker
+AGENT_GAUGES: Dict[str, Gauge] = {
+    'cpu_usage': Gauge('magnatronic_agent_cpu_usage_percent', 'Agent CPU usage',
+                       ['agent_id'], multiprocess_mode='liveall'),
+    'memory_usage': Gauge('magnatronic_agent_memory_usage', 'Agent memory usage',
+                          ['agent_id'], multiprocess_mode='liveall'),
+    'task_completion_rate': Gauge('magnatronic_agent_task_completion_rate', 'Agent task completion rate',
+                                  ['agent_id'], multiprocess_mode='liveall'),
+    'response_time': Gauge('magnatronic_agent_response_time_seconds', 'Agent response time',
+                           ['agent_id'], multiprocess_mode='liveall'),
+    'uptime': Gauge('magnatronic_agent_uptime_seconds', 'Agent uptime',
+                    ['agent_id'], multiprocess_mode='liveall')
+}
+
+# Every gateway process sees the same broker backlog, so processes are not summed
+QUEUE_DEPTH = Gauge('magnatronic_task_queue_depth', 'Tasks waiting for a worker, held or in the broker',
+                    multiprocess_mode='livemax')
+TASKS_SUBMITTED = Counter('magnatronic_tasks_submitted', 'Tasks submitted to the task queue',
+                          ['agent_type', 'priority'])
+TASKS_RATE_LIMITED = Counter('magnatronic_tasks_rate_limited', 'Tasks refused by the agent rate limiter',
+                             ['agent_type'])
+BROKER_MESSAGES = Counter('magnatronic_broker_messages', 'Messages published through the message broker',
+                          ['kind'])
+HTTP_REQUESTS = Counter('magnatronic_http_requests', 'HTTP requests handled',
+                        ['method', 'route', 'status'])
+HTTP_LATENCY = Histogram('magnatronic_http_request_duration_seconds', 'HTTP request latency',
+                         ['method', 'route'])
+
+def export_monitoring(monitoring: MonitoringSystem) -> None:
+    """Keep the agent gauges up to date with a monitoring system's pushed changes.
+
+    Only changed fields are written, so the cost is paid on ingest and not
+    per scrape.
+
+    Args:
+        monitoring (MonitoringSystem): Monitoring system to export
+    """
+    def update_gauges(deltas: Dict[str, Dict[str, float]]) -> None:
+        for agent_id, fields in deltas.items():
+            for field, value in fields.items():
+                gauge = AGENT_GAUGES.get(field)
+                if gauge is not None:
+                    gauge.labels(agent_id=agent_id).set(value)
+
+    monitoring.subscribe(update_gauges)
+
+def render_metrics() -> Tuple[bytes, str]:
+    """Serialize all metrics in the Prometheus text format.
+
+    Returns:
+        Tuple[bytes, str]: Response body and content type
+    """
+    registry = REGISTRY
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+def mark_process_dead() -> None:
+    """Drop this worker's live gauge values when it shuts down in multi-process mode."""
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(os.getpid())
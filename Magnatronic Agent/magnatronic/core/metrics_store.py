@@ -0,0 +1,403 @@
+"""Durable Metrics Store Module for Magnatronic Multi-Agent System"""
+
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+import asyncio
+import fcntl
+import json
+import os
+import threading
+import time
+import numpy as np
+
+SEGMENT_PREFIX = 'segment-'
+SEGMENT_SUFFIX = '.dat'
+
+class MetricsStoreLocked(Exception):
+    """Raised when a store directory is already open for writing in another process"""
+
+class MetricsStore:
+    """Append-only on-disk store of agent metric samples.
+
+    Samples are fixed-width records (timestamp, agent index, one float64 per
+    metric) appended to segment files named after their first timestamp and
+    a sequence number. Appends are buffered in memory and written behind in
+    batches. Reads memory-map only the segments overlapping the requested
+    range, so long histories are queried without loading them into RAM.
+    Compaction merges small segments and drops those past the retention
+    period.
+
+    A directory has a single writer: opening it takes an exclusive lock, so
+    processes sharing a root each claim their own directory with claim().
+    """
+
+    def __init__(self, directory: str, fields: Sequence[str], segment_records: int = 1 << 16,
+                 retention: float = 30 * 86400, flush_interval: float = 1.0,
+                 compact_interval: float = 3600.0):
+        """Open or create a store.
+
+        Args:
+            directory (str): Directory holding the segments and metadata
+            fields (Sequence[str]): Metrics stored per sample
+            segment_records (int): Records per segment before a new one is started
+            retention (float): Seconds of history kept by compaction
+            flush_interval (float): Seconds between write-behind flushes
+            compact_interval (float): Seconds between compactions run by run_flusher
+
+        Raises:
+            MetricsStoreLocked: If another process has the directory open
+            ValueError: If the directory holds a store with different fields
+        """
+        self.directory = directory
+        self.fields = list(fields)
+        self.segment_records = segment_records
+        self.retention = retention
+        self.flush_interval = flush_interval
+        self.compact_interval = compact_interval
+        self.dtype = np.dtype([('timestamp', '<i8'), ('agent', '<u4')] + [(field, '<f8') for field in self.fields])
+        os.makedirs(directory, exist_ok=True)
+        # Agent indexes and segment names are only consistent with a single writer
+        self._lock_file = open(os.path.join(directory, 'lock'), 'a')
+        try:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            self._lock_file.close()
+            raise MetricsStoreLocked(f"Metrics store at {directory} is open in another process")
+
+        self._agents: Dict[str, int] = {}
+        self._meta_dirty = False
+        try:
+            self._load_meta()
+        except ValueError:
+            self._lock_file.close()  # Closing the file releases the lock
+            raise
+        self._pending: List[Tuple] = []
+        self._pending_lock = threading.Lock()
+        self._file_lock = threading.RLock()  # Serializes flushes, reads and compaction
+        self._next_sequence = 0
+        self._segments: List[Tuple[int, str]] = self._scan_segments()  # (first timestamp, path)
+        self._active_count = self._repair_active_segment()
+
+    @classmethod
+    def claim(cls, root: str, fields: Sequence[str], **kwargs) -> 'MetricsStore':
+        """Open the first store under a root directory that no other process has open.
+
+        Each process writing under the root, e.g. each server worker, gets a
+        slot directory of its own, and a restarted process takes over a free
+        slot along with the history already in it.
+
+        Args:
+            root (str): Directory holding the slot directories
+            fields (Sequence[str]): Metrics stored per sample
+            **kwargs: Other MetricsStore arguments
+
+        Returns:
+            MetricsStore: The claimed store
+        """
+        slot = 0
+        while True:
+            try:
+                return cls(os.path.join(root, f"slot-{slot}"), fields, **kwargs)
+            except MetricsStoreLocked:
+                slot += 1
+
+    def __contains__(self, agent_id: str) -> bool:
+        return agent_id in self._agents
+
+    def append(self, agent_id: str, timestamp: int, metrics: Dict[str, Any]) -> None:
+        """Buffer a sample for the next flush.
+
+        Args:
+            agent_id (str): ID of the agent
+            timestamp (int): Sample time in epoch microseconds
+            metrics (Dict[str, Any]): Metric values; missing metrics are stored as NaN
+        """
+        index = self._agents.get(agent_id)
+        if index is None:
+            index = self._agents[agent_id] = len(self._agents)
+            self._meta_dirty = True
+        record = (timestamp, index) + tuple(float(metrics.get(field, np.nan)) for field in self.fields)
+        with self._pending_lock:
+            self._pending.append(record)
+
+    def flush(self) -> int:
+        """Write buffered samples to disk.
+
+        Returns:
+            int: Number of samples written
+        """
+        with self._pending_lock:
+            pending, self._pending = self._pending, []
+        if not pending:
+            return 0
+        records = np.array(pending, dtype=self.dtype)
+        with self._file_lock:
+            if self._meta_dirty:
+                self._save_meta()  # Before any record that refers to a new agent
+            written = 0
+            while written < len(records):
+                if not self._segments or self._active_count >= self.segment_records:
+                    self._start_segment(int(records['timestamp'][written]))
+                batch = records[written:written + self.segment_records - self._active_count]
+                with open(self._segments[-1][1], 'ab') as segment:
+                    segment.write(batch.tobytes())
+                    segment.flush()
+                    os.fsync(segment.fileno())
+                self._active_count += len(batch)
+                written += len(batch)
+        return written
+
+    async def run_flusher(self) -> None:
+        """Flush buffered samples every flush_interval and compact every compact_interval,
+        off the event loop, until cancelled."""
+        loop = asyncio.get_running_loop()
+        last_compaction = time.monotonic()
+        try:
+            while True:
+                await asyncio.sleep(self.flush_interval)
+                await loop.run_in_executor(None, self.flush)
+                if time.monotonic() - last_compaction >= self.compact_interval:
+                    await loop.run_in_executor(None, self.compact)
+                    last_compaction = time.monotonic()
+        finally:
+            await loop.run_in_executor(None, self.flush)
+
+    def select(self, agent_id: str, start: Optional[int] = None, end: Optional[int] = None,
+               fields: Optional[Sequence[str]] = None, skip: int = 0,
+               limit: Optional[int] = None) -> Tuple[np.ndarray, Dict[str, np.ndarray], bool]:
+        """Read a page of an agent's stored samples in a time window.
+
+        Buffered samples are written out first so they are included. Only
+        segments overlapping the window are mapped, and only matching rows
+        of the requested fields are copied out.
+
+        Args:
+            agent_id (str): ID of the agent
+            start (int, optional): Inclusive window start in epoch microseconds
+            end (int, optional): Exclusive window end in epoch microseconds
+            fields (Sequence[str], optional): Metrics to read; all stored metrics if None
+            skip (int): Matching samples at the start of the window to leave out
+            limit (int, optional): Most samples to read
+
+        Returns:
+            Tuple[np.ndarray, Dict[str, np.ndarray], bool]: Timestamps, metric columns
+                and whether the window holds more samples after this page
+        """
+        self.flush()
+        fields = self.fields if fields is None else list(fields)
+        index = self._agents.get(agent_id)
+        timestamps: List[np.ndarray] = []
+        columns: Dict[str, List[np.ndarray]] = {field: [] for field in fields}
+        has_more = False
+        if index is not None:
+            # Held so compaction cannot replace segments mid-read
+            with self._file_lock:
+                has_more = self._read_rows(index, start, end, fields, skip, limit, timestamps, columns)
+        return (
+            np.concatenate(timestamps) if timestamps else np.zeros(0, dtype=np.int64),
+            {field: np.concatenate(parts) if parts else np.zeros(0) for field, parts in columns.items()},
+            has_more
+        )
+
+    def _read_rows(self, index: int, start: Optional[int], end: Optional[int], fields: List[str],
+                   skip: int, limit: Optional[int], timestamps: List[np.ndarray],
+                   columns: Dict[str, List[np.ndarray]]) -> bool:
+        """Collect a page of one agent's records from the segments overlapping a window.
+
+        Args:
+            index (int): Stored index of the agent
+            start (int, optional): Inclusive window start in epoch microseconds
+            end (int, optional): Exclusive window end in epoch microseconds
+            fields (List[str]): Metrics to read
+            skip (int): Matching records at the start of the window to leave out
+            limit (int, optional): Most records to read
+            timestamps (List[np.ndarray]): Receives timestamp arrays
+            columns (Dict[str, List[np.ndarray]]): Receives metric arrays per field
+
+        Returns:
+            bool: Whether the window holds more records after this page
+        """
+        taken, has_more = 0, False
+        for records in self._iter_segments(start, end):
+            mask = records['agent'] == index
+            if start is not None:
+                mask &= records['timestamp'] >= start
+            if end is not None:
+                mask &= records['timestamp'] < end
+            rows = np.flatnonzero(mask)
+            if skip:
+                skipped = min(skip, rows.size)
+                rows, skip = rows[skipped:], skip - skipped
+            if limit is not None and taken + rows.size > limit:
+                rows, has_more = rows[:limit - taken], True
+            if not rows.size:
+                if has_more:
+                    break
+                continue
+            taken += rows.size
+            timestamps.append(np.array(records['timestamp'][rows]))
+            for field in fields:
+                if field in self.dtype.names:
+                    columns[field].append(np.array(records[field][rows]))
+                else:
+                    columns[field].append(np.full(rows.size, np.nan))
+            if has_more:
+                break
+        return has_more
+
+    def compact(self, now: Optional[float] = None) -> None:
+        """Drop segments past retention and merge runs of small segments.
+
+        Args:
+            now (float, optional): Current epoch seconds. Defaults to the current time.
+        """
+        self.flush()
+        cutoff = int(((time.time() if now is None else now) - self.retention) * 1_000_000)
+        with self._file_lock:
+            closed, active = self._segments[:-1], self._segments[-1:]
+            kept = []
+            for position, (first, path) in enumerate(closed):
+                following = (closed + active)[position + 1][0]
+                if following < cutoff:
+                    os.remove(path)  # No record is later than the next segment's start
+                else:
+                    kept.append((first, path))
+
+            merged: List[Tuple[int, str]] = []
+            run: List[Tuple[int, str]] = []
+            run_records = 0
+            for first, path in kept:
+                records = os.path.getsize(path) // self.dtype.itemsize
+                if run and run_records + records > self.segment_records:
+                    merged.append(self._merge(run))
+                    run, run_records = [], 0
+                run.append((first, path))
+                run_records += records
+            if run:
+                merged.append(self._merge(run))
+            self._segments = merged + active
+
+    def close(self) -> None:
+        """Write out any buffered samples and release the directory."""
+        self.flush()
+        if not self._lock_file.closed:
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+            self._lock_file.close()
+
+    def _iter_segments(self, start: Optional[int], end: Optional[int]):
+        """Memory-map the segments that may hold records in a time window.
+
+        Args:
+            start (int, optional): Inclusive window start in epoch microseconds
+            end (int, optional): Exclusive window end in epoch microseconds
+
+        Yields:
+            np.memmap: Records of one segment
+        """
+        segments = list(self._segments)
+        for position, (first, path) in enumerate(segments):
+            following = segments[position + 1][0] if position + 1 < len(segments) else None
+            if end is not None and first >= end:
+                break
+            if start is not None and following is not None and following < start:
+                continue
+            count = os.path.getsize(path) // self.dtype.itemsize
+            if count:
+                yield np.memmap(path, dtype=self.dtype, mode='r', shape=(count,))
+
+    def _merge(self, run: List[Tuple[int, str]]) -> Tuple[int, str]:
+        """Rewrite consecutive segments as one.
+
+        Args:
+            run (List[Tuple[int, str]]): Segments to merge, oldest first
+
+        Returns:
+            Tuple[int, str]: The merged segment, which keeps the first one's name
+        """
+        first, path = run[0]
+        if len(run) == 1:
+            return first, path
+        temporary = path + '.compact'
+        with open(temporary, 'wb') as merged:
+            for _, source in run:
+                with open(source, 'rb') as segment:
+                    merged.write(segment.read())
+            merged.flush()
+            os.fsync(merged.fileno())
+        os.replace(temporary, path)
+        for _, source in run[1:]:
+            os.remove(source)
+        return first, path
+
+    def _start_segment(self, first_timestamp: int) -> None:
+        """Start a new active segment.
+
+        Args:
+            first_timestamp (int): Timestamp of the segment's first record
+        """
+        # Samples sharing a timestamp can span segments, so a sequence number keeps names unique
+        path = os.path.join(self.directory,
+                            f"{SEGMENT_PREFIX}{first_timestamp:020d}-{self._next_sequence:010d}{SEGMENT_SUFFIX}")
+        self._next_sequence += 1
+        open(path, 'ab').close()
+        self._segments.append((first_timestamp, path))
+        self._active_count = 0
+
+    def _scan_segments(self) -> List[Tuple[int, str]]:
+        """Find existing segments, oldest first.
+
+        Returns:
+            List[Tuple[int, str]]: First timestamp and path of each segment
+        """
+        segments = []
+        for name in os.listdir(self.directory):
+            if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX):
+                first, sequence = name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)].split('-')
+                segments.append((int(first), int(sequence), os.path.join(self.directory, name)))
+            elif name.endswith('.compact'):
+                os.remove(os.path.join(self.directory, name))  # Interrupted compaction
+        segments.sort()
+        self._next_sequence = segments[-1][1] + 1 if segments else 0
+        return [(first, path) for first, _, path in segments]
+
+    def _repair_active_segment(self) -> int:
+        """Drop a partially written record left at the end of the last segment.
+
+        Returns:
+            int: Records in the last segment
+        """
+        if not self._segments:
+            return 0
+        path = self._segments[-1][1]
+        size = os.path.getsize(path)
+        if size % self.dtype.itemsize:
+            with open(path, 'r+b') as segment:
+                segment.truncate(size - size % self.dtype.itemsize)
+        return size // self.dtype.itemsize
+
+    def _load_meta(self) -> None:
+        """Load the stored fields and agent indices.
+
+        Raises:
+            ValueError: If the store was created with different fields
+        """
+        path = os.path.join(self.directory, 'meta.json')
+        if not os.path.exists(path):
+            self._meta_dirty = True
+            return
+        with open(path) as meta_file:
+            meta = json.load(meta_file)
+        if meta['fields'] != self.fields:
+            raise ValueError(f"Metrics store at {self.directory} holds fields {meta['fields']}")
+        self._agents = meta['agents']
+
+    def _save_meta(self) -> None:
+        """Atomically write the stored fields and agent indices."""
+        path = os.path.join(self.directory, 'meta.json')
+        agents = dict(self._agents)
+        with open(path + '.tmp', 'w') as meta_file:
+            json.dump({'fields': self.fields, 'agents': agents}, meta_file)
+            meta_file.flush()
+            os.fsync(meta_file.fileno())
+        os.replace(path + '.tmp', path)
+        # Agents registered while writing still need saving
+        self._meta_dirty = len(self._agents) != len(agents)
@@ -1,11 +1,17 @@
 """Monitoring System for Magnatronic Multi-Agent System"""
 
-from typing import Dict, Any, List, Optional
-from datetime import datetime
-import psutil
+from typing import Dict, Any, Iterable, List, Optional, Callable, Sequence, Set, Tuple
+from datetime import datetime, timedelta
 import asyncio
+import time
 from dataclasses import dataclass
-from collections import deque
+import numpy as np
+from .metrics_store import MetricsStore
+from .profiler import ProfileResult, SamplingProfiler
+from .metrics_buffer import (MetricsRingBuffer, MetricsRollup, bucketize, downsample, summarize,
+                             to_epoch_us, from_epoch_us)
+from .system_sampler import SystemSampler, get_system_sampler
+from .timing_wheel import TimingWheel
 
 @dataclass
 class AgentMetrics:
@@ -17,19 +23,93 @@ class AgentMetrics:
     uptime: float
     last_heartbeat: datetime
 
+# Receives a batch of changed metric fields keyed by agent ID
+MetricsSubscriber = Callable[[Dict[str, Dict[str, float]]], None]
+
+# Receives an agent ID and its new status ('active' or 'inactive')
+StatusSubscriber = Callable[[str, str], None]
+
+METRIC_FIELDS = ('cpu_usage', 'memory_usage', 'task_completion_rate', 'response_time', 'uptime')
+
+# Downsampled history tiers, finest first: name -> (bucket seconds, buckets kept)
+ROLLUP_TIERS = {
+    '1m': (60, 1500),   # 25 hours, so the last full day is always covered
+    '1h': (3600, 720)   # 30 days
+}
+
 class MonitoringSystem:
     """Handles system-wide monitoring and metrics collection"""
 
-    def __init__(self, history_size: int = 1000):
+    def __init__(self, history_size: int = 1000, sampler: Optional[SystemSampler] = None,
+                 rollup_tiers: Optional[Dict[str, Tuple[int, int]]] = None,
+                 heartbeat_timeout: float = 300.0, store: Optional[MetricsStore] = None):
         """Initialize the monitoring system.
 
         Args:
             history_size (int): Maximum number of historical metrics to store
+            sampler (SystemSampler, optional): Source of host metrics. Defaults to the
+                process-wide background sampler, started on first use.
+            rollup_tiers (Dict[str, Tuple[int, int]], optional): Downsampled history tiers,
+                finest first, mapped to bucket seconds and buckets kept. Defaults to ROLLUP_TIERS.
+            heartbeat_timeout (float): Seconds without metrics after which an agent is inactive
+            store (MetricsStore, optional): Durable store every sample is written behind to,
+                serving history older than what is kept in memory
         """
-        self.metrics_history: Dict[str, deque] = {}
+        self.sampler = sampler
+        self.store = store
+        self.metrics_history: Dict[str, MetricsRingBuffer] = {}
+        self.rollup_tiers = ROLLUP_TIERS if rollup_tiers is None else rollup_tiers
+        self.metrics_rollups: Dict[str, Dict[str, MetricsRollup]] = {}
+        self._memory_since: Dict[str, int] = {}  # First sample held in memory per agent, epoch microseconds
         self.history_size = history_size
         self.system_metrics: Dict[str, Any] = {}
         self.agent_metrics: Dict[str, AgentMetrics] = {}
+        self._subscribers: List[MetricsSubscriber] = []
+        self.heartbeat_timeout = heartbeat_timeout
+        # Heartbeat expiries, so inactive agents are found without scanning every agent
+        self._heartbeats = TimingWheel(tick=1.0, slots=512, start=time.monotonic())
+        self._inactive_agents: Set[str] = set()
+        self._status_subscribers: List[StatusSubscriber] = []
+
+    def subscribe(self, callback: MetricsSubscriber) -> None:
+        """Register a callback that is pushed metric changes as they are recorded.
+
+        Args:
+            callback (MetricsSubscriber): Called with agent IDs mapped to their changed fields
+        """
+        self._subscribers.append(callback)
+
+    def subscribe_status(self, callback: StatusSubscriber) -> None:
+        """Register a callback that is told when an agent becomes inactive or active again.
+
+        Args:
+            callback (StatusSubscriber): Called with the agent ID and its new status
+        """
+        self._status_subscribers.append(callback)
+
+    def _set_status(self, agent_id: str, status: str) -> None:
+        """Record an agent's liveness change and notify status subscribers.
+
+        Args:
+            agent_id (str): ID of the agent
+            status (str): 'active' or 'inactive'
+        """
+        if status == 'inactive':
+            self._inactive_agents.add(agent_id)
+        else:
+            self._inactive_agents.discard(agent_id)
+        for callback in self._status_subscribers:
+            callback(agent_id, status)
+
+    def _publish(self, deltas: Dict[str, Dict[str, float]]) -> None:
+        """Push metric changes to every subscriber.
+
+        Args:
+            deltas (Dict[str, Dict[str, float]]): Agent IDs mapped to their changed fields
+        """
+        if deltas:
+            for callback in self._subscribers:
+                callback(deltas)
 
     async def update_agent_metrics(self, agent_id: str, metrics: Dict[str, float]) -> None:
         """Update metrics for a specific agent.
@@ -38,8 +118,38 @@ class MonitoringSystem:
             agent_id (str): ID of the agent
             metrics (Dict[str, float]): New metrics data
         """
+        delta = self._record_agent_metrics(agent_id, metrics)
+        self._publish({agent_id: delta} if delta else {})
+
+    async def update_agent_metrics_batch(self, updates: Dict[str, Dict[str, float]]) -> None:
+        """Update metrics for many agents, notifying subscribers once.
+
+        Args:
+            updates (Dict[str, Dict[str, float]]): Agent IDs mapped to their new metrics data
+        """
+        deltas = {}
+        for agent_id, metrics in updates.items():
+            delta = self._record_agent_metrics(agent_id, metrics)
+            if delta:
+                deltas[agent_id] = delta
+        self._publish(deltas)
+
+    def _record_agent_metrics(self, agent_id: str, metrics: Dict[str, float]) -> Dict[str, float]:
+        """Store a metrics sample for an agent.
+
+        Args:
+            agent_id (str): ID of the agent
+            metrics (Dict[str, float]): New metrics data
+
+        Returns:
+            Dict[str, float]: Fields whose values changed (all fields for a new agent)
+        """
         if agent_id not in self.metrics_history:
-            self.metrics_history[agent_id] = deque(maxlen=self.history_size)
+            self.metrics_history[agent_id] = MetricsRingBuffer(self.history_size, METRIC_FIELDS)
+            self.metrics_rollups[agent_id] = {
+                tier: MetricsRollup(seconds * 1_000_000, capacity, METRIC_FIELDS)
+                for tier, (seconds, capacity) in self.rollup_tiers.items()
+            }
 
         current_time = datetime.now()
         agent_metrics = AgentMetrics(
@@ -51,37 +161,279 @@ class MonitoringSystem:
             last_heartbeat=current_time
         )
 
+        previous = self.agent_metrics.get(agent_id)
+        delta = {
+            field: getattr(agent_metrics, field) for field in METRIC_FIELDS
+            if previous is None or getattr(previous, field) != getattr(agent_metrics, field)
+        }
+
         self.agent_metrics[agent_id] = agent_metrics
-        self.metrics_history[agent_id].append({
-            'timestamp': current_time.isoformat(),
-            'metrics': metrics
-        })
+        self._heartbeats.schedule(agent_id, time.monotonic() + self.heartbeat_timeout)
+        if agent_id in self._inactive_agents:
+            self._set_status(agent_id, 'active')
+        timestamp = to_epoch_us(current_time)
+        self._memory_since.setdefault(agent_id, timestamp)
+        self.metrics_history[agent_id].append(timestamp, metrics)
+        if self.store is not None:
+            self.store.append(agent_id, timestamp, metrics)
+        for rollup in self.metrics_rollups[agent_id].values():
+            rollup.append(timestamp, metrics)
+        return delta
+
+    def _in_memory(self, agent_id: str, tier, start: Optional[int]) -> bool:
+        """Check whether an in-memory tier holds all of an agent's samples since a time.
+
+        Memory only holds samples recorded since this process started, so
+        with a durable store, earlier and overwritten ranges are read from it.
+
+        Args:
+            agent_id (str): ID of the agent
+            tier: The agent's MetricsRingBuffer or one of its MetricsRollup tiers
+            start (int, optional): Epoch microseconds, or None for all time
 
-    async def get_agent_metrics(self, agent_id: str) -> Optional[Dict[str, Any]]:
+        Returns:
+            bool: True if the range can be served from the tier
+        """
+        if self.store is None or agent_id not in self.store:
+            return True
+        return start is not None and start >= self._memory_since[agent_id] and tier.covers(start)
+
+    async def get_agent_metrics(self, agent_id: str, include_history: bool = True) -> Optional[Dict[str, Any]]:
         """Get current metrics for a specific agent.
 
         Args:
             agent_id (str): ID of the agent
+            include_history (bool): Also expand the full retained history. Use
+                query_agent_metrics to read part of it instead.
 
         Returns:
             Optional[Dict[str, Any]]: Agent metrics if available
         """
         if agent_id in self.agent_metrics:
             metrics = self.agent_metrics[agent_id]
-            return {
-                'current': metrics.__dict__,
-                'history': list(self.metrics_history[agent_id])
-            }
+            result = {'current': metrics.__dict__}
+            if include_history:
+                result['history'] = self.metrics_history[agent_id].to_records()
+            return result
         return None
 
+    async def query_agent_metrics(self, agent_id: str, start: Optional[datetime] = None,
+                                  end: Optional[datetime] = None, fields: Optional[Sequence[str]] = None,
+                                  max_points: Optional[int] = None, limit: Optional[int] = None,
+                                  cursor: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Read part of an agent's raw metrics history.
+
+        Only the requested samples and fields are copied out of the history.
+        With a limit, results are paged and next_cursor continues where the
+        page ended; each page is downsampled separately when max_points is set.
+        Ranges older than the in-memory history are read from the durable store.
+
+        Args:
+            agent_id (str): ID of the agent
+            start (datetime, optional): Inclusive range start; oldest retained sample if None
+            end (datetime, optional): Exclusive range end; newest sample if None
+            fields (Sequence[str], optional): Metrics to return; all if None
+            max_points (int, optional): Average consecutive samples into at most this many points
+            limit (int, optional): Most samples to read for this page
+            cursor (str, optional): next_cursor of the previous page
+
+        Returns:
+            Optional[Dict[str, Any]]: Points with timestamp, metrics and the number of samples
+                they cover, oldest first, plus next_cursor (None on the last page); None for an
+                unknown agent
+
+        Raises:
+            ValueError: If the cursor is malformed or limit or max_points is below 1
+        """
+        history = self.metrics_history.get(agent_id)
+        stored = self.store is not None and agent_id in self.store
+        if history is None and not stored:
+            return None
+        if (limit is not None and limit < 1) or (max_points is not None and max_points < 1):
+            raise ValueError("limit and max_points must be at least 1")
+
+        start_us = None if start is None else to_epoch_us(start)
+        end_us = None if end is None else to_epoch_us(end)
+        skip = 0
+        if cursor is not None:
+            try:
+                cursor_time, cursor_skip = (int(part) for part in cursor.split(':'))
+            except ValueError:
+                raise ValueError(f"Invalid cursor: {cursor}")
+            if start_us is None or cursor_time >= start_us:
+                # Resume at the cursor's timestamp, past the samples at it already returned
+                start_us, skip = cursor_time, cursor_skip
+
+        if history is None or not self._in_memory(agent_id, history, start_us):
+            timestamps, columns, has_more = await asyncio.get_running_loop().run_in_executor(
+                None, self.store.select, agent_id, start_us, end_us, fields, skip, limit
+            )
+        else:
+            timestamps, columns, has_more = history.select(start_us, end_us, fields, skip, limit)
+        next_cursor = None
+        if has_more:
+            last = int(timestamps[-1])
+            repeated = int(np.count_nonzero(timestamps == last))
+            if last == start_us:
+                repeated += skip
+            next_cursor = f"{last}:{repeated}"
+
+        counts = np.ones(timestamps.size, dtype=np.int64)
+        if max_points is not None:
+            timestamps, columns, counts = downsample(timestamps, columns, max_points)
+        values = {field: column.tolist() for field, column in columns.items()}
+        points = [
+            {
+                'timestamp': from_epoch_us(timestamp).isoformat(),
+                'metrics': {
+                    field: column[i] for field, column in values.items()
+                    if column[i] == column[i]  # NaN where the sample lacked the metric
+                },
+                'count': count
+            }
+            for i, (timestamp, count) in enumerate(zip(timestamps.tolist(), counts.tolist()))
+        ]
+        return {'agent_id': agent_id, 'points': points, 'next_cursor': next_cursor}
+
+    async def get_metric_summary(self, agent_id: str, field: str, window_seconds: Optional[float] = None,
+                                 percentiles: Sequence[float] = (50, 95, 99)) -> Optional[Dict[str, Any]]:
+        """Summarize one of an agent's metrics over a recent window.
+
+        Windows older than the in-memory history are read from the durable store.
+
+        Args:
+            agent_id (str): ID of the agent
+            field (str): Metric name, e.g. 'response_time'
+            window_seconds (float, optional): Look-back window; the whole history if None
+            percentiles (Sequence[float]): Percentiles to compute, from 0 to 100
+
+        Returns:
+            Optional[Dict[str, Any]]: count, mean, min, max and percentiles, or None for an unknown agent
+        """
+        history = self.metrics_history.get(agent_id)
+        if history is None and not (self.store is not None and agent_id in self.store):
+            return None
+        start = None
+        if window_seconds is not None:
+            start = to_epoch_us(datetime.now() - timedelta(seconds=window_seconds))
+        if history is not None and self._in_memory(agent_id, history, start):
+            return history.aggregate(field, start=start, percentiles=percentiles)
+        _, columns, _ = await asyncio.get_running_loop().run_in_executor(
+            None, self.store.select, agent_id, start, None, [field]
+        )
+        return summarize(columns[field], percentiles)
+
+    async def get_metric_history(self, agent_id: str, field: str, start: Optional[datetime] = None,
+                                 end: Optional[datetime] = None, max_points: int = 1500) -> Optional[Dict[str, Any]]:
+        """Get one of an agent's metrics over a time range at a suitable resolution.
+
+        Uses the finest tier (raw samples, then each rollup) that still holds
+        the whole range and returns no more than max_points points for it,
+        falling back to the coarsest tier. Ranges older than the in-memory
+        history are read from the durable store and bucketed at the same
+        resolutions.
+
+        Args:
+            agent_id (str): ID of the agent
+            field (str): Metric name, e.g. 'response_time'
+            start (datetime, optional): Inclusive range start; all retained history if None
+            end (datetime, optional): Exclusive range end; now if None
+            max_points (int): Most points wanted
+
+        Returns:
+            Optional[Dict[str, Any]]: The chosen resolution and points with timestamp, min,
+                max, avg and count, oldest first, or None for an unknown agent
+        """
+        history = self.metrics_history.get(agent_id)
+        if history is None and not (self.store is not None and agent_id in self.store):
+            return None
+        start_us = None if start is None else to_epoch_us(start)
+        end_us = None if end is None else to_epoch_us(end)
+
+        if history is None or not self._in_memory(agent_id, history, start_us):
+            return await self._stored_metric_history(agent_id, field, start_us, end_us, max_points)
+
+        tiers = [('raw', history)] + list(self.metrics_rollups[agent_id].items())
+        resolution, source = tiers[-1]
+        for name, tier in tiers:
+            if tier.covers(start_us) and tier.count(start_us, end_us) <= max_points:
+                resolution, source = name, tier
+                break
+
+        if source is history:
+            timestamps = history.timestamps(start_us, end_us)
+            values = history.column(field, start_us, end_us)
+            present = ~np.isnan(values)
+            timestamps, values = timestamps[present].tolist(), values[present].tolist()
+            points = [
+                {'timestamp': from_epoch_us(timestamp).isoformat(), 'min': value,
+                 'max': value, 'avg': value, 'count': 1}
+                for timestamp, value in zip(timestamps, values)
+            ]
+        else:
+            buckets = source.buckets(field, start_us, end_us)
+            present = buckets['count'] > 0
+            points = [
+                {'timestamp': from_epoch_us(timestamp).isoformat(), 'min': low,
+                 'max': high, 'avg': avg, 'count': count}
+                for timestamp, low, high, avg, count in zip(
+                    *(buckets[key][present].tolist() for key in ('timestamp', 'min', 'max', 'avg', 'count'))
+                )
+            ]
+        return {'agent_id': agent_id, 'field': field, 'resolution': resolution, 'points': points}
+
+    async def _stored_metric_history(self, agent_id: str, field: str, start: Optional[int],
+                                     end: Optional[int], max_points: int) -> Dict[str, Any]:
+        """Get one of an agent's metrics over a time range from the durable store.
+
+        Args:
+            agent_id (str): ID of the agent
+            field (str): Metric name
+            start (int, optional): Inclusive range start in epoch microseconds
+            end (int, optional): Exclusive range end in epoch microseconds
+            max_points (int): Most points wanted
+
+        Returns:
+            Dict[str, Any]: The finest resolution with at most max_points points (the
+                coarsest rollup tier otherwise) and its points, as get_metric_history
+        """
+        timestamps, columns, _ = await asyncio.get_running_loop().run_in_executor(
+            None, self.store.select, agent_id, start, end, [field]
+        )
+        values = columns[field]
+        present = ~np.isnan(values)
+        if np.count_nonzero(present) <= max_points or not self.rollup_tiers:
+            points = [
+                {'timestamp': from_epoch_us(timestamp).isoformat(), 'min': value,
+                 'max': value, 'avg': value, 'count': 1}
+                for timestamp, value in zip(timestamps[present].tolist(), values[present].tolist())
+            ]
+            return {'agent_id': agent_id, 'field': field, 'resolution': 'raw', 'points': points}
+
+        for resolution, (seconds, _) in self.rollup_tiers.items():
+            buckets = bucketize(timestamps, values, seconds * 1_000_000)
+            if buckets['timestamp'].size <= max_points:
+                break
+        points = [
+            {'timestamp': from_epoch_us(timestamp).isoformat(), 'min': low,
+             'max': high, 'avg': avg, 'count': count}
+            for timestamp, low, high, avg, count in zip(
+                *(buckets[key].tolist() for key in ('timestamp', 'min', 'max', 'avg', 'count'))
+            )
+        ]
+        return {'agent_id': agent_id, 'field': field, 'resolution': resolution, 'points': points}
+
     async def update_system_metrics(self) -> None:
-        """Update system-wide performance metrics."""
+        """Update system-wide performance metrics from the latest background sample."""
+        if self.sampler is None:
+            self.sampler = get_system_sampler()
+        snapshot = self.sampler.latest
         self.system_metrics = {
-            'cpu_percent': psutil.cpu_percent(interval=1),
-            'memory_percent': psutil.virtual_memory().percent,
-            'disk_usage': psutil.disk_usage('/').percent,
-            'network_io': dict(psutil.net_io_counters()._asdict()),
-            'timestamp': datetime.now().isoformat()
+            'cpu_percent': snapshot.cpu_percent,
+            'memory_percent': snapshot.memory_percent,
+            'disk_usage': snapshot.disk_percent,
+            'network_io': snapshot.network_io,
+            'timestamp': datetime.fromtimestamp(snapshot.timestamp).isoformat()
         }
 
     async def get_system_metrics(self) -> Dict[str, Any]:
@@ -92,6 +444,44 @@ class MonitoringSystem:
         """
         return self.system_metrics
 
+    async def profile(self, duration: float, interval: float = 0.01,
+                      modules: Optional[Iterable[str]] = None) -> ProfileResult:
+        """Sample the stacks of this process's threads for a while.
+
+        Runs in a worker thread, so the event loop keeps serving requests and
+        shows up in the profile as it does.
+
+        Args:
+            duration (float): Seconds to sample for
+            interval (float): Seconds between samples
+            modules (Iterable[str], optional): Only keep stacks passing through these modules
+
+        Returns:
+            ProfileResult: Sampled stacks
+
+        Raises:
+            ProfilerBusy: If another profile is running in this process
+        """
+        profiler = SamplingProfiler(interval, modules)
+        return await asyncio.get_running_loop().run_in_executor(None, profiler.run, duration)
+
+    def check_heartbeats(self) -> List[str]:
+        """Mark agents whose heartbeat deadline has passed as inactive.
+
+        Returns:
+            List[str]: Agents that became inactive since the last check
+        """
+        expired = self._heartbeats.advance(time.monotonic())
+        for agent_id in expired:
+            self._set_status(agent_id, 'inactive')
+        return expired
+
+    async def watch_heartbeats(self) -> None:
+        """Continuously detect agents that stop reporting metrics."""
+        while True:
+            self.check_heartbeats()
+            await asyncio.sleep(self._heartbeats.tick)
+
     async def start_monitoring(self) -> None:
         """Start continuous system monitoring."""
         while True:
@@ -108,10 +498,8 @@ class MonitoringSystem:
             str: Agent status (active, inactive, or unknown)
         """
         if agent_id in self.agent_metrics:
-            metrics = self.agent_metrics[agent_id]
-            time_since_heartbeat = (datetime.now() - metrics.last_heartbeat).total_seconds()
-            
-            if time_since_heartbeat > 300:  # 5 minutes threshold
+            self.check_heartbeats()
+            if agent_id in self._inactive_agents:
                 return 'inactive'
             return 'active'
         return 'unknown'
@@ -122,9 +510,8 @@ class MonitoringSystem:
         Returns:
             Dict[str, Any]: System health information
         """
-        active_agents = sum(1 for status in 
-            [self.get_agent_status(agent_id) for agent_id in self.agent_metrics]
-            if status == 'active')
+        self.check_heartbeats()
+        active_agents = len(self.agent_metrics) - len(self._inactive_agents)
 
         return {
             'status': 'healthy' if active_agents > 0 else 'degraded',
@@ -0,0 +1,235 @@
+"""Sampling Profiler Module for Magnatronic Multi-Agent System"""
+
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+from dataclasses import dataclass, field
+from json import dumps, loads
+import math
+import os
+import sys
+import threading
+import time
+import uuid
+from redis import Redis
+
+# Channel every worker process's ProfileListener subscribes to
+PROFILE_CHANNEL = 'profile:requests'
+
+# One profile at a time per process, so concurrent requests cannot stack up sampling threads
+_profile_lock = threading.Lock()
+
+class ProfilerBusy(Exception):
+    """Raised when a profile is requested while another is running in the process"""
+
+@dataclass
+class ProfileResult:
+    """Data class for storing sampled stacks in flamegraph collapsed form"""
+    duration: float  # Seconds spent sampling
+    interval: float  # Seconds between samples
+    samples: int = 0  # Sampling passes over all threads
+    stacks: Dict[str, int] = field(default_factory=dict)  # 'thread;outer;...;inner' -> hits
+
+    def merge(self, stacks: Dict[str, int], samples: int) -> None:
+        """Add another process's stacks to this result.
+
+        Args:
+            stacks (Dict[str, int]): Collapsed stacks and their hits
+            samples (int): Sampling passes behind the stacks
+        """
+        self.samples += samples
+        for stack, count in stacks.items():
+            self.stacks[stack] = self.stacks.get(stack, 0) + count
+
+    def collapsed(self) -> str:
+        """Render the stacks in the collapsed format read by flamegraph.pl and speedscope.
+
+        Returns:
+            str: One 'frame;frame;frame count' line per distinct stack, most frequent first
+        """
+        lines = sorted(self.stacks.items(), key=lambda item: item[1], reverse=True)
+        return ''.join(f"{stack} {count}\n" for stack, count in lines)
+
+class SamplingProfiler:
+    """Statistical profiler that periodically reads every thread's stack.
+
+    Stacks are read from a separate thread through sys._current_frames(),
+    so nothing is installed in the profiled code: no tracing hook and no
+    per-call cost, and no cost at all outside a run. Sampling only sees
+    which code is on the stack at each tick, so the result shows where
+    time is spent, not exact call counts.
+    """
+
+    def __init__(self, interval: float = 0.01, modules: Optional[Iterable[str]] = None):
+        """Initialize the profiler.
+
+        Args:
+            interval (float): Seconds between samples
+            modules (Iterable[str], optional): Only keep stacks passing through these modules
+                or their submodules, e.g. one agent's module; all stacks are kept if None
+        """
+        self.interval = interval
+        self.modules: Optional[Tuple[str, ...]] = tuple(modules) if modules is not None else None
+
+    def run(self, duration: float) -> ProfileResult:
+        """Sample all other threads of the process for a while.
+
+        Blocks for the whole duration, so call it from a worker thread
+        when profiling from async code.
+
+        Args:
+            duration (float): Seconds to sample for
+
+        Returns:
+            ProfileResult: Sampled stacks
+
+        Raises:
+            ProfilerBusy: If another profile is running in this process
+        """
+        if not _profile_lock.acquire(blocking=False):
+            raise ProfilerBusy("A profile is already running in this process")
+        try:
+            result = ProfileResult(duration=duration, interval=self.interval)
+            own_thread = threading.get_ident()
+            deadline = time.monotonic() + duration
+            while time.monotonic() < deadline:
+                thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+                for thread_id, frame in sys._current_frames().items():
+                    if thread_id == own_thread:
+                        continue
+                    stack = self._collapse(frame)
+                    if stack is not None:
+                        key = f"{thread_names.get(thread_id, thread_id)};{stack}"
+                        result.stacks[key] = result.stacks.get(key, 0) + 1
+                result.samples += 1
+                time.sleep(self.interval)
+            return result
+        finally:
+            _profile_lock.release()
+
+    def _collapse(self, frame) -> Optional[str]:
+        """Render a thread's stack as semicolon-separated frames, outermost first.
+
+        Args:
+            frame: Innermost frame of the thread
+
+        Returns:
+            Optional[str]: The stack, or None if it does not pass through the profiled modules
+        """
+        labels = []
+        focused = self.modules is None
+        while frame is not None:
+            code = frame.f_code
+            module = frame.f_globals.get('__name__', '?')
+            if not focused:
+                focused = any(module == name or module.startswith(name + '.') for name in self.modules)
+            labels.append(f"{module}:{getattr(code, 'co_qualname', code.co_name)}")
+            frame = frame.f_back
+        if not focused:
+            return None
+        labels.reverse()
+        return ';'.join(labels)
+
+class ProfileListener:
+    """Runs profiles requested over Redis pub/sub in every worker process.
+
+    Each process starts its own listener thread, so a profile request
+    reaches every process of a prefork pool, including the ones busy
+    running the agent code being profiled, and not only the process
+    that would have taken a task.
+    """
+
+    def __init__(self, redis_url: str, targets: Dict[str, str], result_ttl: int = 300):
+        """Initialize the listener.
+
+        Args:
+            redis_url (str): Redis connection URL
+            targets (Dict[str, str]): Agent types mapped to their modules, for focused profiles
+            result_ttl (int): Seconds an uncollected profile is kept
+        """
+        self.redis_url = redis_url
+        self.targets = targets
+        self.result_ttl = result_ttl
+        self._listener_pid: Optional[int] = None  # Process the listener thread runs in
+
+    def start(self) -> None:
+        """Start listening in this process, once per process."""
+        if self._listener_pid == os.getpid():
+            return
+        # A forked worker does not inherit the parent's thread, so it starts its own
+        self._listener_pid = os.getpid()
+        threading.Thread(target=self._run, name='profile-listener', daemon=True).start()
+
+    def _run(self) -> None:
+        """Profile this process for every request published on PROFILE_CHANNEL."""
+        redis = Redis.from_url(self.redis_url, decode_responses=True)
+        pubsub = redis.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(PROFILE_CHANNEL)
+        for message in pubsub.listen():
+            threading.Thread(target=self._profile, args=(redis, loads(message['data'])),
+                             name='profiler', daemon=True).start()
+
+    def _profile(self, redis: Redis, request: Dict[str, Any]) -> None:
+        """Run one requested profile and push its stacks for the requester to collect.
+
+        Args:
+            redis (Redis): Redis client of this process
+            request (Dict[str, Any]): id, duration, interval and optionally agent_type
+        """
+        reply: Dict[str, Any] = {'pid': os.getpid()}
+        agent_type = request.get('agent_type')
+        if agent_type is not None and agent_type not in self.targets:
+            reply['error'] = f"Agent type {agent_type} does not run in this worker"
+        else:
+            modules = None if agent_type is None else [self.targets[agent_type]]
+            try:
+                result = SamplingProfiler(request['interval'], modules).run(request['duration'])
+                reply.update(samples=result.samples, stacks=result.stacks)
+            except ProfilerBusy as e:
+                reply['error'] = str(e)
+        key = f"profile:{request['id']}"
+        pipeline = redis.pipeline()
+        pipeline.rpush(key, dumps(reply))
+        pipeline.expire(key, self.result_ttl)
+        pipeline.execute()
+
+def profile_workers(redis: Redis, duration: float, interval: float = 0.01,
+                    agent_type: Optional[str] = None,
+                    grace: float = 30.0) -> Tuple[int, ProfileResult, List[Dict[str, Any]]]:
+    """Profile every worker process at once and merge their stacks.
+
+    Blocks until every listening process has replied or the grace period
+    after the duration has passed, so call it from a worker thread when
+    profiling from async code.
+
+    Args:
+        redis (Redis): Redis client shared with the workers
+        duration (float): Seconds to sample for
+        interval (float): Seconds between samples
+        agent_type (str, optional): Only keep stacks passing through this agent type's code
+        grace (float): Seconds to wait for replies after the duration
+
+    Returns:
+        Tuple[int, ProfileResult, List[Dict[str, Any]]]: Number of processes the request
+            reached, their merged stacks and the replies received, each with the pid and
+            either samples or an error
+    """
+    request_id = uuid.uuid4().hex
+    key = f"profile:{request_id}"
+    listeners = redis.publish(PROFILE_CHANNEL, dumps({
+        'id': request_id, 'duration': duration, 'interval': interval, 'agent_type': agent_type
+    }))
+    merged = ProfileResult(duration=duration, interval=interval)
+    replies: List[Dict[str, Any]] = []
+    deadline = time.monotonic() + duration + grace
+    while len(replies) < listeners:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        item = redis.blpop(key, timeout=max(1, math.ceil(remaining)))
+        if item is None:
+            break
+        reply = loads(item[1])
+        replies.append(reply)
+        if 'stacks' in reply:
+            merged.merge(reply['stacks'], reply['samples'])
+    redis.delete(key)
+    return listeners, merged, replies
@@ -0,0 +1,282 @@
+"""Latency Quantile Sketch Module for Magnatronic Multi-Agent System"""
+
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+import math
+import os
+import threading
+import time
+from redis import Redis
+from redis.exceptions import RedisError
+
+# Task type under which every task of an agent is also recorded
+ALL_TASK_TYPES = '*'
+
+class LatencySketch:
+    """Mergeable streaming quantile sketch with bounded relative error.
+
+    Values are counted in logarithmically sized buckets, so any quantile is
+    reported within relative_accuracy of a true sample value, memory grows
+    only with the logarithm of the value range, and two sketches with the
+    same accuracy merge exactly by adding bucket counts.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01, min_value: float = 1e-6):
+        """Initialize an empty sketch.
+
+        Args:
+            relative_accuracy (float): Maximum relative error of reported quantiles
+            min_value (float): Values at or below this are counted as zero
+        """
+        self.relative_accuracy = relative_accuracy
+        self.min_value = min_value
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.bins: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+
+    @property
+    def mean(self) -> Optional[float]:
+        """Exact mean of the recorded values, or None if empty."""
+        return self.sum / self.count if self.count else None
+
+    def add(self, value: float, count: int = 1) -> None:
+        """Record a value.
+
+        Args:
+            value (float): Value to record, e.g. a duration in seconds
+            count (int): Number of times to record it
+        """
+        if value <= self.min_value:
+            self.zero_count += count
+        else:
+            index = math.ceil(math.log(value) / self._log_gamma)
+            self.bins[index] = self.bins.get(index, 0) + count
+        self.count += count
+        self.sum += value * count
+
+    def merge(self, other: 'LatencySketch') -> None:
+        """Add another sketch's values into this one.
+
+        Args:
+            other (LatencySketch): Sketch with the same relative accuracy
+
+        Raises:
+            ValueError: If the sketches' accuracies differ
+        """
+        if other.gamma != self.gamma:
+            raise ValueError("Cannot merge sketches with different relative accuracy")
+        for index, count in other.bins.items():
+            self.bins[index] = self.bins.get(index, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate a quantile.
+
+        Args:
+            q (float): Quantile from 0 to 1
+
+        Returns:
+            Optional[float]: Estimated value, or None if the sketch is empty
+        """
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if seen > rank:
+                return 2 * self.gamma ** index / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.bins) / (self.gamma + 1)
+
+    def summary(self, quantiles: Sequence[float] = (0.5, 0.95, 0.99)) -> Dict[str, Any]:
+        """Summarize the sketch.
+
+        Args:
+            quantiles (Sequence[float]): Quantiles to report, from 0 to 1
+
+        Returns:
+            Dict[str, Any]: count, mean and p<N> for each quantile
+        """
+        summary: Dict[str, Any] = {'count': self.count, 'mean': self.mean}
+        for q in quantiles:
+            summary[f'p{q * 100:g}'] = self.quantile(q)
+        return summary
+
+    def to_fields(self) -> Dict[str, Any]:
+        """Serialize the sketch as flat fields, e.g. for a Redis hash.
+
+        Returns:
+            Dict[str, Any]: 'count', 'sum', 'zero' and one 'b:<index>' field per bucket
+        """
+        fields: Dict[str, Any] = {f'b:{index}': count for index, count in self.bins.items()}
+        fields.update(count=self.count, sum=self.sum, zero=self.zero_count)
+        return fields
+
+    @classmethod
+    def from_fields(cls, fields: Dict[str, Any], relative_accuracy: float = 0.01) -> 'LatencySketch':
+        """Rebuild a sketch from flat fields.
+
+        Args:
+            fields (Dict[str, Any]): Fields produced by to_fields, values as numbers or strings
+            relative_accuracy (float): Accuracy the fields were recorded with
+
+        Returns:
+            LatencySketch: The sketch
+        """
+        sketch = cls(relative_accuracy)
+        for name, value in fields.items():
+            if name.startswith('b:'):
+                sketch.bins[int(name[2:])] = int(value)
+        sketch.count = int(fields.get('count', 0))
+        sketch.sum = float(fields.get('sum', 0.0))
+        sketch.zero_count = int(fields.get('zero', 0))
+        return sketch
+
+class LatencySketchStore:
+    """Latency sketches per agent and task type, optionally merged across workers in Redis.
+
+    Every worker adds its new samples to shared Redis hashes as bucket
+    count increments, which is an exact merge, so reads see the
+    distribution across all workers. Samples are pushed by a background
+    thread every flush_interval, so recording a latency never waits on or
+    fails with Redis.
+    """
+
+    def __init__(self, redis_url: Optional[str] = None, relative_accuracy: float = 0.01,
+                 flush_interval: float = 1.0):
+        """Initialize the store.
+
+        Args:
+            redis_url (str, optional): Redis connection URL; sketches stay local to this process if None
+            relative_accuracy (float): Maximum relative error of reported quantiles
+            flush_interval (float): Seconds between pushes of new samples to Redis
+        """
+        self.redis = Redis.from_url(redis_url, decode_responses=True) if redis_url else None
+        self.relative_accuracy = relative_accuracy
+        self.flush_interval = flush_interval
+        self.flush_errors = 0  # Failed pushes; their samples are kept for the next one
+        self._sketches: Dict[Tuple[str, str], LatencySketch] = {}
+        self._pending: Dict[Tuple[str, str], LatencySketch] = {}
+        self._lock = threading.Lock()
+        self._flusher_pid: Optional[int] = None  # Process the flush thread runs in
+
+    def record(self, agent_id: str, task_type: Optional[str], duration: float) -> None:
+        """Record a task duration.
+
+        Args:
+            agent_id (str): Stable identity of the agent shared by its instances in every
+                worker, e.g. its name
+            task_type (str, optional): Type of the task
+            duration (float): Task duration in seconds
+        """
+        keys = [(agent_id, ALL_TASK_TYPES)]
+        if task_type:
+            keys.append((agent_id, task_type))
+        with self._lock:
+            for key in keys:
+                self._sketch(self._sketches, key).add(duration)
+                if self.redis is not None:
+                    self._sketch(self._pending, key).add(duration)
+            if self.redis is not None and self._flusher_pid != os.getpid():
+                # Started on first use, and again in a forked worker, which does not inherit threads
+                self._flusher_pid = os.getpid()
+                threading.Thread(target=self._run, name='latency-sketch-flusher', daemon=True).start()
+
+    def flush(self) -> bool:
+        """Push samples recorded since the last flush to Redis.
+
+        Returns:
+            bool: False if Redis could not be reached; the samples are pushed with the next flush
+        """
+        if self.redis is None:
+            return True
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return True
+        pipeline = self.redis.pipeline()
+        for (agent_id, task_type), sketch in pending.items():
+            key = f"latency_sketch:{agent_id}:{task_type}"
+            for field, value in sketch.to_fields().items():
+                if field == 'sum':
+                    pipeline.hincrbyfloat(key, field, value)
+                else:
+                    pipeline.hincrby(key, field, value)
+            pipeline.sadd(f"latency_sketch:{agent_id}:types", task_type)
+        try:
+            pipeline.execute()
+        except RedisError:
+            # The pipeline is a transaction, so none of it was applied
+            with self._lock:
+                self.flush_errors += 1
+                for key, sketch in pending.items():
+                    self._sketch(self._pending, key).merge(sketch)
+            return False
+        return True
+
+    def get_sketch(self, agent_id: str, task_type: str = ALL_TASK_TYPES) -> Optional[LatencySketch]:
+        """Get the sketch for an agent and task type, merged across workers when shared.
+
+        Args:
+            agent_id (str): ID of the agent
+            task_type (str): Type of task, or ALL_TASK_TYPES for every task of the agent
+
+        Returns:
+            Optional[LatencySketch]: The sketch, or None if nothing was recorded
+        """
+        if self.redis is None:
+            return self._sketches.get((agent_id, task_type))
+        fields = self.redis.hgetall(f"latency_sketch:{agent_id}:{task_type}")
+        with self._lock:
+            pending = self._pending.get((agent_id, task_type))
+            if not fields and pending is None:
+                return None
+            sketch = LatencySketch.from_fields(fields, self.relative_accuracy)
+            if pending is not None:
+                sketch.merge(pending)  # Not flushed yet, so not in Redis
+        return sketch
+
+    def get_task_types(self, agent_id: str) -> List[str]:
+        """Get the task types recorded for an agent.
+
+        Args:
+            agent_id (str): ID of the agent
+
+        Returns:
+            List[str]: Task types, excluding ALL_TASK_TYPES
+        """
+        if self.redis is None:
+            types = {task_type for agent, task_type in self._sketches if agent == agent_id}
+        else:
+            types = set(self.redis.smembers(f"latency_sketch:{agent_id}:types"))
+            with self._lock:
+                types.update(task_type for agent, task_type in self._pending if agent == agent_id)
+        types.discard(ALL_TASK_TYPES)
+        return sorted(types)
+
+    def _run(self) -> None:
+        """Push new samples every flush_interval."""
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    def _sketch(self, sketches: Dict[Tuple[str, str], LatencySketch], key: Tuple[str, str]) -> LatencySketch:
+        """Get or create a sketch.
+
+        Args:
+            sketches (Dict[Tuple[str, str], LatencySketch]): Sketches by agent ID and task type
+            key (Tuple[str, str]): Agent ID and task type
+
+        Returns:
+            LatencySketch: The sketch
+        """
+        sketch = sketches.get(key)
+        if sketch is None:
+            sketch = sketches[key] = LatencySketch(self.relative_accuracy)
+        return sketch
@@ -0,0 +1,216 @@
+"""Rate Limiting Module for Magnatronic Multi-Agent System"""
+
+from typing import Dict, Any, Optional
+from dataclasses import dataclass
+from redis import Redis
+
+# Token bucket reservation. Tokens may go negative so that a caller willing to
+# wait can reserve a future token; callers that would wait longer than
+# max_delay are rejected without consuming anything.
+# KEYS[1]: bucket hash; ARGV: rate, burst, max_delay
+# Returns the delay in seconds as a string, or "-1" when rejected.
+TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local max_delay = tonumber(ARGV[3])
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) + tonumber(now_parts[2]) / 1000000
+
+local tokens = tonumber(redis.call('HGET', KEYS[1], 'tokens'))
+local updated = tonumber(redis.call('HGET', KEYS[1], 'updated'))
+if tokens == nil or updated == nil then
+    tokens = burst
+    updated = now
+end
+tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+
+local delay = 0
+if tokens < 1 then
+    delay = (1 - tokens) / rate
+    if delay > max_delay then
+        return '-1'
+    end
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens - 1), 'updated', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate + max_delay) + 60)
+return tostring(delay)
+"""
+
+# In-flight slot lease. Each running task holds a lease scored by its deadline,
+# so slots of workers that died without releasing lapse on their own.
+# KEYS[1]: lease sorted set; ARGV: max_in_flight, lease seconds, task ID
+# Returns 1 when a slot is held (including by a redelivered task), 0 when the cap is reached.
+ACQUIRE_SLOT_SCRIPT = """
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) + tonumber(now_parts[2]) / 1000000
+local lease = tonumber(ARGV[2])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now)
+if not redis.call('ZSCORE', KEYS[1], ARGV[3]) and
+        redis.call('ZCARD', KEYS[1]) >= tonumber(ARGV[1]) then
+    return 0
+end
+redis.call('ZADD', KEYS[1], now + lease, ARGV[3])
+redis.call('EXPIRE', KEYS[1], math.ceil(lease) + 60)
+return 1
+"""
+
+# Live in-flight leases, pruning lapsed ones. KEYS[1]: lease sorted set
+COUNT_SLOTS_SCRIPT = """
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) + tonumber(now_parts[2]) / 1000000
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now)
+return redis.call('ZCARD', KEYS[1])
+"""
+
+@dataclass
+class AgentLimit:
+    """Data class for storing the dispatch limits of an agent type"""
+    rate: float  # Tokens added per second
+    burst: int  # Bucket capacity
+    max_in_flight: int  # Concurrent tasks across all workers
+    max_queue_delay: float = 30.0  # Longest deferral before a task is rejected
+
+class RateLimitExceeded(Exception):
+    """Raised when a task is rejected by the rate limiter"""
+
+    def __init__(self, agent_type: str, retry_after: float):
+        """Initialize the exception.
+
+        Args:
+            agent_type (str): Agent type whose limit was exceeded
+            retry_after (float): Suggested delay in seconds before retrying
+        """
+        super().__init__(f"Rate limit exceeded for agent type: {agent_type}")
+        self.agent_type = agent_type
+        self.retry_after = retry_after
+
+def load_agent_limits(config: Dict[str, Dict[str, Any]]) -> Dict[str, AgentLimit]:
+    """Build agent limits from a declarative configuration mapping.
+
+    Args:
+        config (Dict[str, Dict[str, Any]]): Agent types mapped to limit settings
+
+    Returns:
+        Dict[str, AgentLimit]: Agent types mapped to their limits
+    """
+    return {agent_type: AgentLimit(**settings) for agent_type, settings in config.items()}
+
+class RateLimiter:
+    """Enforces per-agent-type token-bucket rates and in-flight caps using shared Redis counters"""
+
+    def __init__(self, redis_url: str = "redis://localhost:6379",
+                 limits: Optional[Dict[str, AgentLimit]] = None, slot_lease: float = 900.0):
+        """Initialize the rate limiter.
+
+        Args:
+            redis_url (str): Redis connection URL. Defaults to "redis://localhost:6379".
+            limits (Dict[str, AgentLimit], optional): Agent types mapped to their limits
+            slot_lease (float): Seconds an in-flight slot is held before it lapses, which
+                frees slots of killed workers; tasks should finish well within it
+        """
+        self.redis = Redis.from_url(redis_url, decode_responses=True)
+        self.limits: Dict[str, AgentLimit] = limits or {}
+        self.slot_lease = slot_lease
+        self._reserve_token = self.redis.register_script(TOKEN_BUCKET_SCRIPT)
+        self._acquire_slot = self.redis.register_script(ACQUIRE_SLOT_SCRIPT)
+        self._count_slots = self.redis.register_script(COUNT_SLOTS_SCRIPT)
+
+    def reserve(self, agent_type: str) -> float:
+        """Reserve a dispatch token for an agent type.
+
+        Args:
+            agent_type (str): Type of the agent the task is destined for
+
+        Returns:
+            float: Seconds the task should be deferred before running (0 if immediate)
+
+        Raises:
+            RateLimitExceeded: If the task would have to wait longer than the allowed queue delay
+        """
+        limit = self.limits.get(agent_type)
+        if limit is None:
+            return 0.0
+
+        delay = float(self._reserve_token(
+            keys=[f"rate_limit:bucket:{agent_type}"],
+            args=[limit.rate, limit.burst, limit.max_queue_delay]
+        ))
+        if delay < 0:
+            self._record(agent_type, 'rejected')
+            raise RateLimitExceeded(agent_type, retry_after=limit.burst / limit.rate)
+
+        self._record(agent_type, 'queued' if delay > 0 else 'admitted')
+        return delay
+
+    def acquire_slot(self, agent_type: str, task_id: str, retry: bool = False) -> bool:
+        """Lease an in-flight slot for a task of an agent type.
+
+        Args:
+            agent_type (str): Type of the agent about to run a task
+            task_id (str): ID of the task, which holds the slot until it is released or lapses
+            retry (bool): The task already found the cap reached and was requeued, so it
+                is not counted as queued again
+
+        Returns:
+            bool: True if a slot was taken, False if the in-flight cap is reached
+        """
+        limit = self.limits.get(agent_type)
+        if limit is None:
+            return True
+
+        acquired = bool(self._acquire_slot(
+            keys=[f"rate_limit:leases:{agent_type}"],
+            args=[limit.max_in_flight, self.slot_lease, task_id]
+        ))
+        if not acquired and not retry:
+            self._record(agent_type, 'queued')
+        return acquired
+
+    def release_slot(self, agent_type: str, task_id: str) -> None:
+        """Return a task's in-flight slot for an agent type.
+
+        Args:
+            agent_type (str): Type of the agent that finished a task
+            task_id (str): ID of the task holding the slot
+        """
+        if agent_type in self.limits:
+            self.redis.zrem(f"rate_limit:leases:{agent_type}", task_id)
+
+    def slot_retry_delay(self, agent_type: str) -> float:
+        """Get the delay before re-attempting a task that found no free slot.
+
+        Args:
+            agent_type (str): Type of the agent
+
+        Returns:
+            float: Retry delay in seconds
+        """
+        limit = self.limits.get(agent_type)
+        return 1.0 / limit.rate if limit else 0.0
+
+    def get_stats(self, agent_type: str) -> Dict[str, int]:
+        """Get dispatch accounting for an agent type.
+
+        Args:
+            agent_type (str): Type of the agent
+
+        Returns:
+            Dict[str, int]: Admitted, queued, rejected and in-flight counts
+        """
+        counts = self.redis.hgetall(f"rate_limit:stats:{agent_type}")
+        return {
+            'admitted': int(counts.get('admitted', 0)),
+            'queued': int(counts.get('queued', 0)),
+            'rejected': int(counts.get('rejected', 0)),
+            'in_flight': int(self._count_slots(keys=[f"rate_limit:leases:{agent_type}"]))
+        }
+
+    def _record(self, agent_type: str, outcome: str) -> None:
+        """Increment the shared counter for a dispatch outcome.
+
+        Args:
+            agent_type (str): Type of the agent
+            outcome (str): One of admitted, queued or rejected
+        """
+        self.redis.hincrby(f"rate_limit:stats:{agent_type}", outcome, 1)
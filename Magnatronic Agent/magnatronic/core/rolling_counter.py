@@ -0,0 +1,192 @@
+"""Rolling Event Counter Module for Magnatronic Multi-Agent System"""
+
+import math
+from typing import Dict, Iterable, List, Optional, Tuple
+from dataclasses import dataclass
+
+class RollingCounter:
+    """Count of events over a sliding time window, kept in fixed-width buckets.
+
+    The window is a ring of buckets with a running total. Recording an
+    event clears only the buckets that slid out of the window since the
+    last call and increments one bucket, so updates are amortized O(1)
+    and the windowed count is read from the running total.
+    """
+
+    def __init__(self, window: float, bucket: float = 1.0):
+        """Initialize an empty counter.
+
+        Args:
+            window (float): Window length in seconds
+            bucket (float): Bucket width in seconds; the window slides in steps of one bucket
+        """
+        self.window = window
+        self.bucket = bucket
+        self._buckets: List[int] = [0] * max(1, math.ceil(window / bucket))
+        self._head: Optional[int] = None  # Index of the newest bucket in use
+        self._total = 0
+
+    def add(self, now: float, count: int = 1) -> int:
+        """Record events.
+
+        Args:
+            now (float): Time of the events in epoch seconds; events older than the window are ignored
+            count (int): Number of events
+
+        Returns:
+            int: Events in the window ending at the newest recorded time
+        """
+        index = math.floor(now / self.bucket)
+        self._advance(index)
+        if index > self._head - len(self._buckets):
+            self._buckets[index % len(self._buckets)] += count
+            self._total += count
+        return self._total
+
+    def count(self, now: Optional[float] = None) -> int:
+        """Get the number of events in the window.
+
+        Args:
+            now (float, optional): Time the window ends at; the newest recorded time if None
+
+        Returns:
+            int: Events in the window
+        """
+        if now is not None:
+            self._advance(math.floor(now / self.bucket))
+        return self._total
+
+    def rate(self, now: Optional[float] = None) -> float:
+        """Get the average event rate over the window.
+
+        Args:
+            now (float, optional): Time the window ends at; the newest recorded time if None
+
+        Returns:
+            float: Events per second
+        """
+        return self.count(now) / self.window
+
+    def _advance(self, index: int) -> None:
+        """Slide the window forward so that a bucket is the newest.
+
+        Args:
+            index (int): Absolute index of the bucket; older indexes leave the window as is
+        """
+        if self._head is None:
+            self._head = index
+            return
+        steps = index - self._head
+        if steps <= 0:
+            return
+        if steps >= len(self._buckets):
+            self._buckets = [0] * len(self._buckets)
+            self._total = 0
+        else:
+            for expired in range(self._head + 1, index + 1):
+                slot = expired % len(self._buckets)
+                self._total -= self._buckets[slot]
+                self._buckets[slot] = 0
+        self._head = index
+
+@dataclass(frozen=True)
+class RateThreshold:
+    """Data class for storing an event rate that raises an alert when exceeded"""
+    event_type: str
+    window: float  # Seconds
+    limit: int  # Most events allowed in the window
+    severity: str = 'warning'
+
+class EventRateTracker:
+    """Rolling counts per event type and window, checked against rate thresholds on ingest.
+
+    Every event type is counted over each tracked window, and over the
+    window of each of its thresholds, by one RollingCounter apiece. A
+    threshold is reported once, when its count first goes over the limit,
+    and again only after the count has fallen back within it.
+    """
+
+    def __init__(self, windows: Iterable[float] = (60, 3600), thresholds: Iterable[RateThreshold] = ()):
+        """Initialize the tracker.
+
+        Args:
+            windows (Iterable[float]): Windows in seconds counted for every event type
+            thresholds (Iterable[RateThreshold]): Rates that raise alerts
+        """
+        self.windows = sorted(set(windows))
+        self.thresholds: Dict[str, List[RateThreshold]] = {}
+        for threshold in thresholds:
+            self.thresholds.setdefault(threshold.event_type, []).append(threshold)
+        self._counters: Dict[str, Dict[float, RollingCounter]] = {}
+        self._breached: Dict[RateThreshold, bool] = {}
+
+    def record(self, event_type: str, now: float, count: int = 1) -> List[Tuple[RateThreshold, int]]:
+        """Record events and check the event type's thresholds.
+
+        Args:
+            event_type (str): Type of the events
+            now (float): Time of the events in epoch seconds
+            count (int): Number of events
+
+        Returns:
+            List[Tuple[RateThreshold, int]]: Thresholds newly exceeded, with their windowed counts
+        """
+        counters = self._counters_for(event_type)
+        for counter in counters.values():
+            counter.add(now, count)
+
+        exceeded = []
+        for threshold in self.thresholds.get(event_type, ()):
+            current = counters[threshold.window].count()
+            breached = current > threshold.limit
+            if breached and not self._breached.get(threshold):
+                exceeded.append((threshold, current))
+            self._breached[threshold] = breached
+        return exceeded
+
+    def count(self, event_type: str, window: float, now: Optional[float] = None) -> int:
+        """Get the number of events of a type in a tracked window.
+
+        Args:
+            event_type (str): Type of the events
+            window (float): Tracked window in seconds
+            now (float, optional): Time the window ends at; the newest recorded time if None
+
+        Returns:
+            int: Events in the window
+
+        Raises:
+            KeyError: If the window is not tracked
+        """
+        counters = self._counters_for(event_type)
+        return counters[window].count(now)
+
+    def snapshot(self, now: Optional[float] = None) -> Dict[str, Dict[float, int]]:
+        """Get the count of every event type in every tracked window.
+
+        Args:
+            now (float, optional): Time the windows end at; each counter's newest recorded time if None
+
+        Returns:
+            Dict[str, Dict[float, int]]: Counts by event type and window in seconds
+        """
+        return {
+            event_type: {window: counter.count(now) for window, counter in counters.items()}
+            for event_type, counters in self._counters.items()
+        }
+
+    def _counters_for(self, event_type: str) -> Dict[float, RollingCounter]:
+        """Get or create the counters of an event type.
+
+        Args:
+            event_type (str): Type of the events
+
+        Returns:
+            Dict[float, RollingCounter]: Counters by window in seconds
+        """
+        counters = self._counters.get(event_type)
+        if counters is None:
+            windows = set(self.windows)
+            windows.update(threshold.window for threshold in self.thresholds.get(event_type, ()))
+            counters = self._counters[event_type] = {window: RollingCounter(window) for window in sorted(windows)}
+        return counters
@@ -0,0 +1,156 @@
+"""Shared Load State Module for Magnatronic Multi-Agent System"""
+
+from typing import Dict, Any, List, Optional
+from json import dumps, loads
+import time
+from redis import Redis
+
+# Atomically adjust an agent's in-flight count, never dropping below zero.
+# KEYS[1]: agent load hash; ARGV[1]: delta
+# Returns the new count, or -1 if the agent is not registered.
+ADJUST_TASK_COUNT_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return -1
+end
+local count = redis.call('HINCRBY', KEYS[1], 'task_count', tonumber(ARGV[1]))
+if count < 0 then
+    redis.call('HSET', KEYS[1], 'task_count', 0)
+    count = 0
+end
+return count
+"""
+
+class SharedLoadState:
+    """Keeps agent load in Redis so every gateway replica balances against the same picture"""
+
+    def __init__(self, redis_url: str = "redis://localhost:6379", cache_ttl: float = 0.5):
+        """Initialize the shared load state.
+
+        Args:
+            redis_url (str): Redis connection URL. Defaults to "redis://localhost:6379".
+            cache_ttl (float): Seconds a local snapshot is served before Redis is read again
+        """
+        self.redis = Redis.from_url(redis_url, decode_responses=True)
+        self.cache_ttl = cache_ttl
+        self._adjust_task_count = self.redis.register_script(ADJUST_TASK_COUNT_SCRIPT)
+        self._snapshot: Dict[str, Dict[str, Any]] = {}
+        self._snapshot_time = float('-inf')
+
+    def publish_load(self, agent_id: str, cpu_usage: float, memory_usage: float,
+                     capabilities: List[str]) -> None:
+        """Register an agent or update its resource usage, leaving its in-flight count alone.
+
+        Args:
+            agent_id (str): ID of the agent
+            cpu_usage (float): Current CPU usage
+            memory_usage (float): Current memory usage
+            capabilities (List[str]): Capabilities of the agent
+        """
+        pipeline = self.redis.pipeline()
+        pipeline.hset(f"agent_load:{agent_id}", mapping={
+            'cpu_usage': cpu_usage,
+            'memory_usage': memory_usage,
+            'capabilities': dumps(sorted(capabilities))
+        })
+        pipeline.hsetnx(f"agent_load:{agent_id}", 'task_count', 0)
+        pipeline.sadd("agent_load:agents", agent_id)
+        pipeline.execute()
+        self._update_cached(agent_id, cpu_usage=cpu_usage, memory_usage=memory_usage,
+                            capabilities=sorted(capabilities))
+
+    def remove(self, agent_id: str) -> None:
+        """Remove an agent from the shared state.
+
+        Args:
+            agent_id (str): ID of the agent
+        """
+        pipeline = self.redis.pipeline()
+        pipeline.delete(f"agent_load:{agent_id}")
+        pipeline.srem("agent_load:agents", agent_id)
+        pipeline.execute()
+        self._snapshot.pop(agent_id, None)
+
+    def assign(self, agent_id: str) -> Optional[int]:
+        """Atomically record a task assignment.
+
+        Args:
+            agent_id (str): ID of the agent
+
+        Returns:
+            Optional[int]: The agent's cluster-wide in-flight count, or None if unregistered
+        """
+        return self._adjust(agent_id, 1)
+
+    def complete(self, agent_id: str) -> Optional[int]:
+        """Atomically record a task completion.
+
+        Args:
+            agent_id (str): ID of the agent
+
+        Returns:
+            Optional[int]: The agent's cluster-wide in-flight count, or None if unregistered
+        """
+        return self._adjust(agent_id, -1)
+
+    def get_loads(self) -> Dict[str, Dict[str, Any]]:
+        """Get the load of every registered agent, read through the local cache.
+
+        Returns:
+            Dict[str, Dict[str, Any]]: Agent IDs mapped to cpu_usage, memory_usage,
+                task_count and capabilities
+        """
+        if time.monotonic() - self._snapshot_time < self.cache_ttl:
+            return self._snapshot
+
+        agent_ids = list(self.redis.smembers("agent_load:agents"))
+        pipeline = self.redis.pipeline()
+        for agent_id in agent_ids:
+            pipeline.hgetall(f"agent_load:{agent_id}")
+
+        snapshot = {}
+        for agent_id, fields in zip(agent_ids, pipeline.execute()):
+            if fields:
+                snapshot[agent_id] = {
+                    'cpu_usage': float(fields.get('cpu_usage', 0.0)),
+                    'memory_usage': float(fields.get('memory_usage', 0.0)),
+                    'task_count': int(fields.get('task_count', 0)),
+                    'capabilities': loads(fields.get('capabilities', '[]'))
+                }
+        self._snapshot = snapshot
+        self._snapshot_time = time.monotonic()
+        return snapshot
+
+    def is_fresh(self) -> bool:
+        """Check whether the local snapshot can be served without reading Redis.
+
+        Returns:
+            bool: True if the snapshot is younger than cache_ttl
+        """
+        return time.monotonic() - self._snapshot_time < self.cache_ttl
+
+    def _adjust(self, agent_id: str, delta: int) -> Optional[int]:
+        """Apply an in-flight count change in Redis and mirror it locally.
+
+        Args:
+            agent_id (str): ID of the agent
+            delta (int): Change to apply
+
+        Returns:
+            Optional[int]: New count, or None if the agent is not registered
+        """
+        count = int(self._adjust_task_count(keys=[f"agent_load:{agent_id}"], args=[delta]))
+        if count < 0:
+            return None
+        self._update_cached(agent_id, task_count=count)
+        return count
+
+    def _update_cached(self, agent_id: str, **fields: Any) -> None:
+        """Write fields already applied in Redis into the local snapshot.
+
+        Args:
+            agent_id (str): ID of the agent
+            **fields: Fields to update
+        """
+        cached = self._snapshot.get(agent_id)
+        if cached is not None:
+            cached.update(fields)
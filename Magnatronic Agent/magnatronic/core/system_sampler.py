@@ -0,0 +1,222 @@
+"""System Sampler Module for Magnatronic Multi-Agent System"""
+
+from typing import Dict, Iterable, List, Optional, Tuple
+from dataclasses import dataclass
+import threading
+import time
+import psutil
+
+@dataclass(frozen=True)
+class SystemSnapshot:
+    """Data class for storing one immutable sample of host resource usage"""
+    cpu_percent: float
+    per_cpu_percent: Tuple[float, ...]
+    memory_total: int
+    memory_available: int
+    memory_percent: float
+    disk_total: int
+    disk_used: int
+    disk_free: int
+    disk_percent: float
+    network_io: Dict[str, int]
+    timestamp: float  # Epoch seconds the sample was taken
+
+@dataclass(frozen=True)
+class ProcessSnapshot:
+    """Data class for storing one sample of a process's resource usage"""
+    pid: int
+    cpu_percent: Optional[float]  # None until a second sample gives an interval
+    memory_rss: int  # Resident set size in bytes
+    num_threads: int
+    timestamp: float  # Epoch seconds the sample was taken
+
+def _busy_percent(previous, current) -> float:
+    """Compute CPU busy percentage between two cpu_times readings.
+
+    Args:
+        previous: Earlier psutil cpu_times reading, or None to average since boot
+        current: Later psutil cpu_times reading
+
+    Returns:
+        float: Percentage of time spent busy in the interval
+    """
+    idle = current.idle + getattr(current, 'iowait', 0.0)
+    total = sum(current)
+    if previous is not None:
+        idle -= previous.idle + getattr(previous, 'iowait', 0.0)
+        total -= sum(previous)
+    if total <= 0:
+        return 0.0
+    return round(min(100.0, max(0.0, 100.0 * (1.0 - idle / total))), 1)
+
+class SystemSampler:
+    """Samples host metrics on a background thread so async code never waits on psutil.
+
+    CPU usage is computed from the difference between consecutive cpu_times
+    readings rather than by sleeping inside psutil. Each sample is published
+    as a new immutable SystemSnapshot by a single reference assignment, so
+    readers get the latest complete sample without taking a lock.
+    """
+
+    def __init__(self, interval: float = 1.0, disk_path: str = '/'):
+        """Initialize the sampler.
+
+        Args:
+            interval (float): Seconds between samples
+            disk_path (str): Path whose filesystem usage is reported
+        """
+        self.interval = interval
+        self.disk_path = disk_path
+        self._last_times = None
+        self._last_per_cpu: Optional[List] = None
+        self._snapshot: Optional[SystemSnapshot] = None
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def latest(self) -> SystemSnapshot:
+        """The most recent snapshot, sampled on the spot if none has been taken yet."""
+        snapshot = self._snapshot
+        if snapshot is None:
+            snapshot = self.sample()
+        return snapshot
+
+    def start(self) -> None:
+        """Take a first sample and start the background sampling thread."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self.sample()
+        self._thread = threading.Thread(target=self._run, name='system-sampler', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the background sampling thread."""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 1.0)
+            self._thread = None
+
+    def sample(self) -> SystemSnapshot:
+        """Take one sample and publish it.
+
+        The first sample reports CPU usage averaged since boot; later ones
+        cover the time since the previous sample.
+
+        Returns:
+            SystemSnapshot: The new snapshot
+        """
+        times = psutil.cpu_times()
+        per_cpu = psutil.cpu_times(percpu=True)
+        per_cpu_percent = tuple(
+            _busy_percent(previous, current)
+            for previous, current in zip(self._last_per_cpu or [None] * len(per_cpu), per_cpu)
+        )
+        cpu_percent = _busy_percent(self._last_times, times)
+        self._last_times, self._last_per_cpu = times, per_cpu
+
+        memory = psutil.virtual_memory()
+        disk = psutil.disk_usage(self.disk_path)
+        snapshot = SystemSnapshot(
+            cpu_percent=cpu_percent,
+            per_cpu_percent=per_cpu_percent,
+            memory_total=memory.total,
+            memory_available=memory.available,
+            memory_percent=memory.percent,
+            disk_total=disk.total,
+            disk_used=disk.used,
+            disk_free=disk.free,
+            disk_percent=disk.percent,
+            network_io=dict(psutil.net_io_counters()._asdict()),
+            timestamp=time.time()
+        )
+        self._snapshot = snapshot
+        return snapshot
+
+    def _run(self) -> None:
+        """Sample every interval until stopped."""
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.sample()
+            except Exception:
+                # Keep serving the last good snapshot; the next tick tries again
+                continue
+
+class ProcessSampler:
+    """Samples many processes in one pass through cached psutil handles.
+
+    Handles are kept between passes so cpu_percent measures the interval
+    since the previous pass instead of returning 0 for a fresh handle, and
+    each process's fields are read together under oneshot(). Handles are
+    evicted when their process exits, its PID is reused, or it is no
+    longer asked for.
+    """
+
+    def __init__(self):
+        """Initialize an empty handle cache."""
+        self._handles: Dict[int, psutil.Process] = {}
+
+    def __len__(self) -> int:
+        return len(self._handles)
+
+    def sample(self, pids: Iterable[int]) -> Dict[int, ProcessSnapshot]:
+        """Sample every given process.
+
+        Blocks on /proc reads, so call it from a worker thread when
+        sampling from async code.
+
+        Args:
+            pids (Iterable[int]): Process IDs to sample; duplicates are read once
+
+        Returns:
+            Dict[int, ProcessSnapshot]: Snapshots of the processes that are still running
+        """
+        wanted = set(pids)
+        for pid in list(self._handles):
+            if pid not in wanted:
+                del self._handles[pid]
+
+        snapshots = {}
+        for pid in wanted:
+            handle = self._handles.get(pid)
+            try:
+                if handle is not None and not handle.is_running():
+                    handle = None  # The PID now belongs to a different process
+                fresh = handle is None
+                if fresh:
+                    handle = self._handles[pid] = psutil.Process(pid)
+                with handle.oneshot():
+                    cpu_percent = handle.cpu_percent(interval=None)
+                    memory_rss = handle.memory_info().rss
+                    num_threads = handle.num_threads()
+            except (psutil.NoSuchProcess, psutil.ZombieProcess):
+                self._handles.pop(pid, None)
+                continue
+            except psutil.AccessDenied:
+                continue
+            snapshots[pid] = ProcessSnapshot(
+                pid=pid,
+                cpu_percent=None if fresh else cpu_percent,
+                memory_rss=memory_rss,
+                num_threads=num_threads,
+                timestamp=time.time()
+            )
+        return snapshots
+
+_default_sampler: Optional[SystemSampler] = None
+_default_sampler_lock = threading.Lock()
+
+def get_system_sampler() -> SystemSampler:
+    """Get the process-wide sampler, starting it on first use.
+
+    Returns:
+        SystemSampler: Running sampler shared by every caller in the process
+    """
+    global _default_sampler
+    if _default_sampler is None:
+        with _default_sampler_lock:
+            if _default_sampler is None:
+                sampler = SystemSampler()
+                sampler.start()
+                _default_sampler = sampler
+    return _default_sampler
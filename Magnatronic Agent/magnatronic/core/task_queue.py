@@ -2,8 +2,22 @@
 
 from typing import Dict, Any, List, Optional
 from celery import Celery
+from redis import Redis
 from datetime import datetime
 from enum import Enum
+import asyncio
+import logging
+import math
+import os
+import threading
+import time
+import uuid
+from .rate_limiter import RateLimiter, AgentLimit, RateLimitExceeded, load_agent_limits
+from .metrics_exporter import TASKS_SUBMITTED, TASKS_RATE_LIMITED
+from .fair_queue import DEFAULT_TENANT, FairQueueDispatcher
+from .hash_ring import ConsistentHashRing
+from .tracing import tracer
+from . import celeryconfig
 
 class TaskPriority(Enum):
     """Task priority levels"""
@@ -12,37 +26,268 @@ class TaskPriority(Enum):
     HIGH = 3
     CRITICAL = 4
 
+logger = logging.getLogger(__name__)
+
+def replica_queue(replica: str) -> str:
+    """Get the broker queue of a worker replica, which tasks with its affinity keys are sent to.
+
+    Args:
+        replica (str): Name of the worker replica
+
+    Returns:
+        str: Queue name
+    """
+    return f"agent_tasks.{replica}"
+
 class TaskQueue:
-    """Handles task allocation and load balancing between agents"""
+    """Handles task allocation and load balancing between agents.
+
+    Submitted tasks are held per tenant and released to the broker by
+    deficit round robin, only while the broker queue is shorter than
+    release_depth. Celery drains the broker in FIFO order, so keeping it
+    short leaves the order between tenants to the fair queue, and a tenant
+    flooding the gateway waits behind its own tasks instead of everyone
+    else's. Held tasks live in the submitting process and are released by a
+    background thread of that process.
+
+    Tasks with an affinity key go to the queue of one worker replica, picked
+    on a consistent-hash ring over celeryconfig.affinity_replicas, so tasks
+    about the same entity run where its state is already held.
+    """
 
-    def __init__(self, broker_url: str = "redis://localhost:6379"):
+    def __init__(self, broker_url: str = "redis://localhost:6379",
+                 agent_limits: Optional[Dict[str, AgentLimit]] = None,
+                 tenants: Optional[Dict[str, Dict[str, Any]]] = None,
+                 release_depth: Optional[int] = None, poll_interval: float = 0.1):
         """Initialize the task queue.
 
         Args:
             broker_url (str): Celery broker URL. Defaults to "redis://localhost:6379".
+            agent_limits (Dict[str, AgentLimit], optional): Per-agent-type dispatch limits.
+                Defaults to the limits declared in celeryconfig.
+            tenants (Dict[str, Dict[str, Any]], optional): Tenants mapped to their weight and
+                quota. Defaults to the tenants declared in celeryconfig.
+            release_depth (int, optional): Broker queue length at which held tasks stop being
+                released. Defaults to celeryconfig.fair_queue_release_depth.
+            poll_interval (float): Seconds between releases while tasks are held back
         """
         self.app = Celery('magnatronic', broker=broker_url)
         self.app.conf.task_routes = {
             'agent.*': {'queue': 'agent_tasks'}
         }
+        self.redis = Redis.from_url(broker_url)
+        if agent_limits is None:
+            agent_limits = load_agent_limits(celeryconfig.agent_limits)
+        self.rate_limiter = RateLimiter(broker_url, agent_limits)
+        self.fair_queue = FairQueueDispatcher(
+            self._place,
+            default_quota=celeryconfig.tenant_quota,
+            tenants=celeryconfig.tenants if tenants is None else tenants
+        )
+        self.release_depth = celeryconfig.fair_queue_release_depth if release_depth is None else release_depth
+        self.poll_interval = poll_interval
+        self.release_errors = 0
+        self._lock = threading.Lock()  # Guards the fair queue between submitters and the releaser
+        self._wakeup = threading.Event()
+        self._releaser_pid: Optional[int] = None  # Process the releaser thread runs in
+        self._depths: Dict[str, int] = {}  # Broker queue lengths as of the current release pass
+        self.replicas = ConsistentHashRing()
+        for replica in celeryconfig.affinity_replicas:
+            self.replicas.add(replica)
+        self.affinity_balance = celeryconfig.affinity_balance
 
-    async def submit_task(self, task_data: Dict[str, Any], priority: TaskPriority = TaskPriority.MEDIUM) -> str:
+    async def submit_task(self, task_data: Dict[str, Any], priority: TaskPriority = TaskPriority.MEDIUM,
+                          stream: bool = False, affinity_key: Optional[str] = None,
+                          tenant: Optional[str] = None) -> str:
         """Submit a task to the queue.
 
         Args:
             task_data (Dict[str, Any]): Task data and parameters
             priority (TaskPriority): Task priority level
+            stream (bool): Publish partial results as they are produced, readable
+                through MessageBroker.stream_task_events with the returned task ID
+            affinity_key (str, optional): Entity the task concerns. The task goes to the queue of
+                the key's worker replica while that replica's backlog is within affinity_balance
+                times the average, and to the next replica on the ring otherwise. Tasks go to the
+                shared queue when no replicas are configured.
+            tenant (str, optional): Client or source submitting the task, used for fair
+                queuing between submitters. Defaults to the task data's 'tenant' or 'default'.
 
         Returns:
             str: Task ID
+
+        Raises:
+            TenantQuotaExceeded: If the tenant already has its quota of tasks held
+            RateLimitExceeded: If the agent type's rate limit cannot admit the task in time
         """
-        task = self.app.send_task(
-            'agent.process_task',
-            args=[task_data],
-            kwargs={'priority': priority.value},
-            queue='agent_tasks'
+        if affinity_key is not None:
+            task_data = {**task_data, 'affinity_key': affinity_key}
+        tenant = tenant or task_data.get('tenant', DEFAULT_TENANT)
+        task_data = {**task_data, 'tenant': tenant}
+
+        agent_type = task_data.get('agent_type')
+        with tracer.start_span('task_queue.submit', attributes={'agent_type': agent_type, 'tenant': tenant}) as span:
+            # Checked first, so a tenant over its quota does not spend the agent type's rate
+            with self._lock:
+                self.fair_queue.check_quota(tenant)
+            # Tasks over the agent type's rate are deferred, or rejected past max_queue_delay
+            try:
+                delay = self.rate_limiter.reserve(agent_type)
+            except RateLimitExceeded:
+                TASKS_RATE_LIMITED.labels(agent_type=str(agent_type)).inc()
+                raise
+            task_id = str(uuid.uuid4())
+            with self._lock:
+                self.fair_queue.enqueue({
+                    'tenant': tenant,
+                    'task_id': task_id,
+                    'name': 'agent.stream_task' if stream else 'agent.process_task',
+                    'task_data': task_data,
+                    'priority': priority.value,
+                    'eta': time.time() + delay,
+                    'headers': tracer.inject({})  # The worker's spans continue this trace
+                })
+            if span is not None:
+                span.attributes.update(task_id=task_id, queue_delay=delay)
+        TASKS_SUBMITTED.labels(agent_type=str(agent_type), priority=priority.name).inc()
+        self._start_releaser()
+        self._wakeup.set()
+        return task_id
+
+    def get_fairness_metrics(self) -> Dict[str, Any]:
+        """Get per-tenant accounting of held and released tasks.
+
+        Returns:
+            Dict[str, Any]: Tenant statistics, Jain's fairness index and release errors
+        """
+        with self._lock:
+            metrics = self.fair_queue.get_fairness_metrics()
+        metrics['release_errors'] = self.release_errors
+        return metrics
+
+    def _start_releaser(self) -> None:
+        """Start the releaser thread in this process, once per process."""
+        if self._releaser_pid == os.getpid():
+            return
+        # Started on first use, and again in a forked worker, which does not inherit threads
+        self._releaser_pid = os.getpid()
+        threading.Thread(target=asyncio.run, args=(self._run_releaser(),),
+                         name='task-releaser', daemon=True).start()
+
+    async def _run_releaser(self) -> None:
+        """Release held tasks whenever tasks are submitted and every poll_interval."""
+        while True:
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+            try:
+                await self._release()
+            except Exception:
+                # Held tasks stay queued and are retried on the next pass
+                self.release_errors += 1
+                logger.exception("Releasing held tasks to the broker failed")
+
+    async def _release(self) -> None:
+        """Release held tasks by deficit round robin until none has room."""
+        self._depths = {}
+        while True:
+            # Taken per task, so submitters wait for at most one send
+            with self._lock:
+                released = await self.fair_queue.dispatch_next()
+                credit_pending = self.fair_queue.credit_pending
+            if released is None and not credit_pending:
+                return
+
+    async def _place(self, task: Dict[str, Any]) -> Optional[str]:
+        """Send a held task to the broker if its queue is shorter than release_depth.
+
+        Args:
+            task (Dict[str, Any]): Held task
+
+        Returns:
+            Optional[str]: Queue the task was sent to, or None if it is full
+        """
+        affinity_key = task['task_data'].get('affinity_key')
+        if affinity_key is not None and len(self.replicas):
+            queue = self._affinity_queue(affinity_key)
+        else:
+            queue = 'agent_tasks'
+        depth = self._depth(queue)
+        if depth >= self.release_depth:
+            return None
+        delay = task['eta'] - time.time()
+        self.app.send_task(
+            task['name'],
+            args=[task['task_data']],
+            kwargs={'priority': task['priority']},
+            queue=queue,
+            task_id=task['task_id'],
+            countdown=delay if delay > 0 else None,
+            headers=task['headers']
         )
-        return task.id
+        # Deferred tasks are held by workers until due, so they do not fill the queue
+        self._depths[queue] = depth if delay > 0 else depth + 1
+        return queue
+
+    def _affinity_queue(self, affinity_key: str) -> str:
+        """Pick the replica queue for an affinity key, with bounded load.
+
+        The key's home replica is used unless its queue holds more than
+        affinity_balance times the average replica backlog, in which case the
+        task spills over to the next replica on the ring.
+
+        Args:
+            affinity_key (str): Entity the task concerns
+
+        Returns:
+            str: Queue of the chosen replica
+        """
+        queues = [replica_queue(replica) for replica in celeryconfig.affinity_replicas]
+        total = sum(self._depth(queue) for queue in queues)
+        capacity = math.ceil(self.affinity_balance * (total + 1) / len(queues))
+        for replica in self.replicas.iter_nodes(affinity_key):
+            queue = replica_queue(replica)
+            if self._depth(queue) < capacity:
+                return queue
+        return replica_queue(next(self.replicas.iter_nodes(affinity_key)))
+
+    def _depth(self, queue: str) -> int:
+        """Get a broker queue's length, read once per release pass.
+
+        Args:
+            queue (str): Queue name
+
+        Returns:
+            int: Tasks waiting in the queue
+        """
+        depth = self._depths.get(queue)
+        if depth is None:
+            depth = self._depths[queue] = self.redis.llen(queue)
+        return depth
+
+    def get_backlog(self) -> int:
+        """Count submitted tasks waiting for a worker, held here or in the broker.
+
+        Tasks deferred by the rate limiter are held by workers until due, so
+        they are not counted.
+
+        Returns:
+            int: Tasks held by the fair queue plus the length of the agent task queue
+        """
+        with self._lock:
+            held = len(self.fair_queue)
+        queues = ['agent_tasks'] + [replica_queue(replica) for replica in celeryconfig.affinity_replicas]
+        return held + sum(self.redis.llen(queue) for queue in queues)
+
+    async def get_rate_limit_stats(self, agent_type: str) -> Dict[str, int]:
+        """Get admitted, queued and rejected counts for an agent type.
+
+        Args:
+            agent_type (str): Type of the agent
+
+        Returns:
+            Dict[str, int]: Dispatch accounting shared across all processes
+        """
+        return self.rate_limiter.get_stats(agent_type)
 
     async def get_task_status(self, task_id: str) -> Dict[str, Any]:
         """Get the status of a task.
@@ -1,11 +1,23 @@
 """Celery Tasks Module for Magnatronic Multi-Agent System"""
 
 from celery import Celery
-from typing import Dict, Any
+from celery.signals import celeryd_after_setup, worker_init, worker_process_init
+from typing import Dict, Any, Callable, Optional
+import functools
+import os
+import time
 from ..agents.research_agent import ResearchAgent
 from ..agents.creative_agent import CreativeAgent
 from ..agents.knowledge_agent import KnowledgeAgent
 from ..agents.monitoring_agent import MonitoringAgent
+from .agent_reports import AgentMetricsReporter
+from .communication import MessageBroker
+from .rate_limiter import RateLimiter, RateLimitExceeded, load_agent_limits
+from .profiler import ProfileListener
+from .quantiles import LatencySketchStore
+from .task_queue import replica_queue
+from .tracing import RedisSpanExporter, SpanContext, tracer
+from . import celeryconfig
 
 # Initialize Celery app
 app = Celery('magnatronic')
@@ -19,8 +31,100 @@ agents = {
     'monitoring': MonitoringAgent()
 }
 
-@app.task(name='agent.process_task')
-async def process_task(task_data: Dict[str, Any], priority: int = 2) -> Dict[str, Any]:
+# Limits for agent types no worker runs would never apply
+unknown_limits = set(celeryconfig.agent_limits) - set(agents)
+if unknown_limits:
+    raise ValueError(f"Agent limits configured for unregistered agent types: {sorted(unknown_limits)}")
+
+# In-flight caps are shared by every worker process through Redis
+rate_limiter = RateLimiter(celeryconfig.broker_url, load_agent_limits(celeryconfig.agent_limits),
+                           slot_lease=celeryconfig.slot_lease)
+message_broker = MessageBroker(celeryconfig.broker_url)
+
+# Task latency sketches are merged across worker processes in Redis
+latency_sketches = LatencySketchStore(celeryconfig.broker_url)
+for agent in agents.values():
+    agent.latency_sketches = latency_sketches
+
+# Every worker process answers profile requests, which can focus on one agent type's code
+profile_listener = ProfileListener(celeryconfig.broker_url, {
+    agent_type: type(agent).__module__ for agent_type, agent in agents.items()
+})
+
+# Every pool process reports its agents' metrics and heartbeats to the gateway
+agent_reporter = AgentMetricsReporter(celeryconfig.broker_url, [agent.name for agent in agents.values()],
+                                      interval=celeryconfig.agent_report_interval)
+
+@worker_init.connect
+@worker_process_init.connect
+def start_profile_listener(**kwargs) -> None:
+    """Listen for profile requests in the worker and in each pool process."""
+    profile_listener.start()
+
+@worker_process_init.connect
+def start_agent_reporter(**kwargs) -> None:
+    """Report agent metrics from each pool process; other pools start reporting on their first task."""
+    agent_reporter.start()
+
+@celeryd_after_setup.connect
+def consume_replica_queue(sender, instance, **kwargs) -> None:
+    """Also consume this worker replica's queue, where tasks with its affinity keys are sent."""
+    replica = os.getenv('MAGNATRONIC_WORKER_REPLICA')
+    if replica:
+        instance.app.amqp.queues.select_add(replica_queue(replica))
+
+# Worker spans are exported to the same Redis the gateway reads traces from
+tracer.configure(service='worker', sample_rate=celeryconfig.trace_sample_rate,
+                 exporter=RedisSpanExporter(celeryconfig.broker_url))
+
+def _trace_parent(request) -> Optional[SpanContext]:
+    """Read the trace context sent in a task's message headers.
+
+    Args:
+        request: Celery request of the running task
+
+    Returns:
+        Optional[SpanContext]: The submitter's span, or None if the task was sent outside a trace
+    """
+    return tracer.extract(request) or tracer.extract(request.get('headers'))
+
+def traced(name: str) -> Callable:
+    """Run a bound agent task in a span continuing the submitter's trace.
+
+    Args:
+        name (str): Name of the span
+
+    Returns:
+        Callable: Decorator for the task function
+    """
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        async def wrapper(self, task_data: Dict[str, Any], *args, **kwargs) -> Dict[str, Any]:
+            attributes = {'task_id': self.request.id, 'agent_type': task_data.get('agent_type')}
+            with tracer.start_span(name, parent=_trace_parent(self.request), attributes=attributes):
+                return await func(self, task_data, *args, **kwargs)
+        return wrapper
+    return decorator
+
+def _acquire_slot(task, agent_type: str) -> None:
+    """Lease an in-flight slot for the running task, requeueing it while the cap is reached.
+
+    Args:
+        task: Bound Celery task
+        agent_type (str): Type of the agent about to run the task
+
+    Raises:
+        Retry: To run the task again after the agent type's slot retry delay
+        RateLimitExceeded: If the task was already requeued max_retries times
+    """
+    if rate_limiter.acquire_slot(agent_type, task.request.id, retry=task.request.retries > 0):
+        return
+    delay = rate_limiter.slot_retry_delay(agent_type)
+    raise task.retry(countdown=delay, exc=RateLimitExceeded(agent_type, retry_after=delay))
+
+@app.task(name='agent.process_task', bind=True, max_retries=celeryconfig.slot_max_retries)
+@traced('worker.process_task')
+async def process_task(self, task_data: Dict[str, Any], priority: int = 2) -> Dict[str, Any]:
     """Process a task using the appropriate agent.
 
     Args:
@@ -34,8 +138,18 @@ async def process_task(task_data: Dict[str, Any], priority: int = 2) -> Dict[str
     if agent_type not in agents:
         raise ValueError(f"Unknown agent type: {agent_type}")
 
+    # Requeue instead of running when the agent type is at its in-flight cap
+    _acquire_slot(self, agent_type)
+
     agent = agents[agent_type]
-    result = await agent.process_task(task_data)
+    start = time.perf_counter()
+    success = False
+    try:
+        result = await agent.execute_task(task_data)
+        success = True
+    finally:
+        rate_limiter.release_slot(agent_type, self.request.id)
+        agent_reporter.record(agent.name, time.perf_counter() - start, success)
 
     # Notify monitoring agent of task completion
     monitoring_agent = agents['monitoring']
@@ -49,6 +163,59 @@ async def process_task(task_data: Dict[str, Any], priority: int = 2) -> Dict[str
 
     return result
 
+@app.task(name='agent.stream_task', bind=True, max_retries=celeryconfig.slot_max_retries)
+@traced('worker.stream_task')
+async def stream_task(self, task_data: Dict[str, Any], priority: int = 2) -> Dict[str, Any]:
+    """Process a task, publishing partial results for clients as they are produced.
+
+    Args:
+        task_data (Dict[str, Any]): Task data and parameters
+        priority (int): Task priority level
+
+    Returns:
+        Dict[str, Any]: Task processing results
+    """
+    agent_type = task_data.get('agent_type')
+    task_id = self.request.id
+    if agent_type not in agents:
+        # The client is already waiting on the stream, so it is told before the task fails
+        message_broker.publish_task_event(task_id, {'type': 'error', 'error': f"Unknown agent type: {agent_type}"})
+        raise ValueError(f"Unknown agent type: {agent_type}")
+
+    try:
+        _acquire_slot(self, agent_type)
+    except RateLimitExceeded as e:
+        message_broker.publish_task_event(task_id, {'type': 'error', 'error': str(e)})
+        raise
+
+    agent = agents[agent_type]
+    result: Dict[str, Any] = {}
+    start = time.perf_counter()
+    success = False
+    try:
+        async for event in agent.execute_stream(task_data):
+            message_broker.publish_task_event(task_id, event)
+            if event['type'] == 'result':
+                result = event['data']
+        success = True
+    except Exception as e:
+        message_broker.publish_task_event(task_id, {'type': 'error', 'error': str(e)})
+        raise
+    finally:
+        rate_limiter.release_slot(agent_type, self.request.id)
+        agent_reporter.record(agent.name, time.perf_counter() - start, success)
+
+    monitoring_agent = agents['monitoring']
+    await monitoring_agent.handle_message({
+        'type': 'performance_update',
+        'agent_id': agent.agent_id,
+        'task_id': task_data.get('task_id'),
+        'status': 'completed',
+        'result': result
+    })
+
+    return result
+
 @app.task(name='agent.health_check')
 async def health_check() -> Dict[str, Any]:
     """Perform system health check using monitoring agent.
@@ -57,6 +224,8 @@ async def health_check() -> Dict[str, Any]:
         Dict[str, Any]: Health check results
     """
     monitoring_agent = agents['monitoring']
+    # Reports other agents sent through the broker are taken in first, each continuing its sender's trace
+    await monitoring_agent.receive_messages(message_broker)
     return await monitoring_agent.process_task({
         'type': 'system_health_check',
         'components': list(agents.keys())
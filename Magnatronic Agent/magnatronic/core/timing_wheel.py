@@ -0,0 +1,93 @@
+"""Timing Wheel Module for Magnatronic Multi-Agent System"""
+
+import math
+from typing import Dict, List, Optional
+
+class TimingWheel:
+    """Hashed timing wheel of keyed deadlines.
+
+    Deadlines are rounded up to whole ticks and hashed into a ring of slots.
+    Scheduling, rescheduling and cancelling are O(1), and advancing the
+    clock only visits the slots of the ticks that elapsed, so expiry is
+    found in amortized O(1) per key rather than by scanning every key.
+    """
+
+    def __init__(self, tick: float = 1.0, slots: int = 512, start: float = 0.0):
+        """Initialize an empty wheel.
+
+        Args:
+            tick (float): Seconds per slot; deadlines are detected up to one tick late
+            slots (int): Slots in the ring; deadlines further out than slots * tick
+                stay in their slot across revolutions
+            start (float): Current time, in the same clock as later deadlines
+        """
+        self.tick = tick
+        self.slots = slots
+        self._wheel: List[Dict[str, int]] = [{} for _ in range(slots)]  # Key -> deadline tick
+        self._slot_of: Dict[str, int] = {}
+        self._current_tick = math.floor(start / tick)
+
+    def __len__(self) -> int:
+        return len(self._slot_of)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._slot_of
+
+    def schedule(self, key: str, deadline: float) -> None:
+        """Set a key's deadline, replacing any earlier one.
+
+        Args:
+            key (str): Key to schedule
+            deadline (float): Time the key expires at
+        """
+        self.cancel(key)
+        deadline_tick = max(math.ceil(deadline / self.tick), self._current_tick + 1)
+        slot = deadline_tick % self.slots
+        self._wheel[slot][key] = deadline_tick
+        self._slot_of[key] = slot
+
+    def cancel(self, key: str) -> None:
+        """Remove a key's deadline if it has one.
+
+        Args:
+            key (str): Key to cancel
+        """
+        slot = self._slot_of.pop(key, None)
+        if slot is not None:
+            del self._wheel[slot][key]
+
+    def advance(self, now: float) -> List[str]:
+        """Move the clock forward and collect the keys whose deadline has passed.
+
+        Args:
+            now (float): Current time
+
+        Returns:
+            List[str]: Expired keys, which are no longer scheduled
+        """
+        target_tick = math.floor(now / self.tick)
+        steps = min(target_tick - self._current_tick, self.slots)
+        expired = []
+        for step in range(1, steps + 1):
+            bucket = self._wheel[(self._current_tick + step) % self.slots]
+            due = [key for key, deadline_tick in bucket.items() if deadline_tick <= target_tick]
+            for key in due:
+                del bucket[key]
+                del self._slot_of[key]
+            expired.extend(due)
+        self._current_tick = max(self._current_tick, target_tick)
+        return expired
+
+    def deadline(self, key: str) -> Optional[float]:
+        """Get a key's deadline, rounded up to the tick it expires on.
+
+        Args:
+            key (str): Scheduled key
+
+        Returns:
+            Optional[float]: Deadline, or None if the key is not scheduled
+        """
+        slot = self._slot_of.get(key)
+        if slot is None:
+            return None
+        return self._wheel[slot][key] * self.tick
@@ -0,0 +1,371 @@
+"""Distributed Tracing Module for Magnatronic Multi-Agent System
+
+Trace context travels as a W3C ``traceparent`` value: in HTTP headers at
+the gateway, in Celery message headers through the task queue, and in
+message broker envelopes. Within a process the current span is held in a
+context variable, so spans opened by the gateway, the task queue, the
+broker and the agents nest without being passed around explicitly.
+
+Whether a trace is recorded is decided once, at its root span, and
+carried in the context's sampled flag. Spans that are not sampled only
+propagate context, and recorded spans are buffered and exported in
+batches on a background thread, so tracing adds little to a request.
+"""
+
+from typing import Dict, Any, Iterator, List, Mapping, Optional
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field, asdict
+from json import dumps, loads
+import os
+import random
+import threading
+import time
+from redis import Redis
+
+TRACEPARENT = 'traceparent'
+
+@dataclass(frozen=True)
+class SpanContext:
+    """Data class for storing the identity of a span as propagated between services"""
+    trace_id: str  # 32 hex digits
+    span_id: str  # 16 hex digits
+    sampled: bool = True
+
+    @property
+    def traceparent(self) -> str:
+        """The context as a W3C traceparent value."""
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+@dataclass
+class Span:
+    """Data class for storing one timed operation of a trace"""
+    name: str
+    service: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    start: float  # Epoch seconds
+    end: Optional[float] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    status: str = 'ok'
+
+    @property
+    def duration(self) -> Optional[float]:
+        """Seconds from start to end, or None while the span is open."""
+        return None if self.end is None else self.end - self.start
+
+def parse_traceparent(value: Optional[str]) -> Optional[SpanContext]:
+    """Parse a W3C traceparent value.
+
+    Args:
+        value (str, optional): traceparent value
+
+    Returns:
+        Optional[SpanContext]: The context, or None if the value is missing or malformed
+    """
+    if not value:
+        return None
+    parts = value.strip().split('-')
+    if len(parts) < 4 or len(parts[1]) != 32 or len(parts[2]) != 16 or len(parts[3]) != 2:
+        return None
+    try:
+        trace_id, span_id, flags = int(parts[1], 16), int(parts[2], 16), int(parts[3], 16)
+    except ValueError:
+        return None
+    if not trace_id or not span_id:
+        return None
+    return SpanContext(parts[1].lower(), parts[2].lower(), bool(flags & 1))
+
+def build_waterfall(spans: List[Span]) -> Dict[str, Any]:
+    """Lay out a trace's spans as a waterfall.
+
+    Args:
+        spans (List[Span]): Spans of one trace, in any order
+
+    Returns:
+        Dict[str, Any]: Trace ID, total duration and the spans in start order, each
+            with its nesting depth and offset from the start of the trace in milliseconds
+    """
+    if not spans:
+        return {'trace_id': None, 'duration_ms': 0.0, 'spans': []}
+    ordered = sorted(spans, key=lambda span: span.start)
+    trace_start = ordered[0].start
+    trace_end = max(span.end if span.end is not None else span.start for span in ordered)
+    by_id = {span.span_id: span for span in ordered}
+
+    def depth(span: Span) -> int:
+        level = 0
+        parent = by_id.get(span.parent_id)
+        while parent is not None and level < len(by_id):
+            level += 1
+            parent = by_id.get(parent.parent_id)
+        return level
+
+    return {
+        'trace_id': ordered[0].trace_id,
+        'duration_ms': round((trace_end - trace_start) * 1000, 3),
+        'spans': [
+            {
+                'name': span.name,
+                'service': span.service,
+                'span_id': span.span_id,
+                'parent_id': span.parent_id,
+                'depth': depth(span),
+                'offset_ms': round((span.start - trace_start) * 1000, 3),
+                'duration_ms': None if span.duration is None else round(span.duration * 1000, 3),
+                'status': span.status,
+                'attributes': span.attributes
+            }
+            for span in ordered
+        ]
+    }
+
+class RedisSpanExporter:
+    """Exports spans to per-trace Redis lists, shared by the gateway and every worker"""
+
+    def __init__(self, redis_url: str = "redis://localhost:6379", ttl: int = 3600):
+        """Initialize the exporter.
+
+        Args:
+            redis_url (str): Redis connection URL
+            ttl (int): Seconds a trace is kept after its last span was exported
+        """
+        self.redis = Redis.from_url(redis_url, decode_responses=True)
+        self.ttl = ttl
+
+    def export(self, spans: List[Span]) -> None:
+        """Write a batch of finished spans.
+
+        Args:
+            spans (List[Span]): Spans to write
+        """
+        pipeline = self.redis.pipeline()
+        for span in spans:
+            key = f"trace:{span.trace_id}"
+            pipeline.rpush(key, dumps(asdict(span)))
+            pipeline.expire(key, self.ttl)
+        pipeline.execute()
+
+    def get_trace(self, trace_id: str) -> List[Span]:
+        """Read the exported spans of a trace.
+
+        Args:
+            trace_id (str): ID of the trace
+
+        Returns:
+            List[Span]: Spans in export order
+        """
+        return [Span(**loads(item)) for item in self.redis.lrange(f"trace:{trace_id}", 0, -1)]
+
+class FileSpanExporter:
+    """Exports spans as JSON lines to a local file, for development without a collector"""
+
+    def __init__(self, path: str):
+        """Initialize the exporter.
+
+        Args:
+            path (str): File spans are appended to
+        """
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def export(self, spans: List[Span]) -> None:
+        """Append a batch of finished spans.
+
+        Args:
+            spans (List[Span]): Spans to write
+        """
+        with open(self.path, 'a') as span_file:
+            span_file.write(''.join(dumps(asdict(span)) + '\n' for span in spans))
+
+    def get_trace(self, trace_id: str) -> List[Span]:
+        """Read the exported spans of a trace by scanning the file.
+
+        Args:
+            trace_id (str): ID of the trace
+
+        Returns:
+            List[Span]: Spans in export order
+        """
+        if not os.path.exists(self.path):
+            return []
+        spans = []
+        with open(self.path) as span_file:
+            for line in span_file:
+                if trace_id in line:
+                    span = loads(line)
+                    if span['trace_id'] == trace_id:
+                        spans.append(Span(**span))
+        return spans
+
+_current_context: ContextVar[Optional[SpanContext]] = ContextVar('magnatronic_span_context', default=None)
+
+class Tracer:
+    """Creates spans, propagates their context and exports sampled ones in batches"""
+
+    def __init__(self, service: str = 'magnatronic', sample_rate: float = 1.0, exporter=None,
+                 flush_interval: float = 1.0, max_buffered: int = 10000):
+        """Initialize the tracer.
+
+        Args:
+            service (str): Name of the service recorded on every span
+            sample_rate (float): Fraction of new traces that are recorded, from 0 to 1
+            exporter (optional): RedisSpanExporter, FileSpanExporter or any object with
+                export(spans) and get_trace(trace_id); spans are not recorded if None
+            flush_interval (float): Seconds between exports of buffered spans
+            max_buffered (int): Spans held for export before new ones are dropped
+        """
+        self.service = service
+        self.sample_rate = sample_rate
+        self.exporter = exporter
+        self.flush_interval = flush_interval
+        self.max_buffered = max_buffered
+        self.dropped = 0
+        self._buffer: List[Span] = []
+        self._lock = threading.Lock()
+        self._flusher_pid: Optional[int] = None  # Process the export thread runs in
+
+    def configure(self, service: Optional[str] = None, sample_rate: Optional[float] = None,
+                  exporter=None) -> None:
+        """Change the service name, sample rate or exporter.
+
+        Args:
+            service (str, optional): Name of the service recorded on every span
+            sample_rate (float, optional): Fraction of new traces that are recorded
+            exporter (optional): Destination of recorded spans
+        """
+        if service is not None:
+            self.service = service
+        if sample_rate is not None:
+            self.sample_rate = sample_rate
+        if exporter is not None:
+            self.exporter = exporter
+
+    @contextmanager
+    def start_span(self, name: str, parent: Optional[SpanContext] = None,
+                   attributes: Optional[Dict[str, Any]] = None) -> Iterator[Optional[Span]]:
+        """Open a span that is the current span until the block exits.
+
+        Args:
+            name (str): Operation the span times
+            parent (SpanContext, optional): Remote parent, e.g. extracted from a message;
+                defaults to the current span, and a new trace is started if there is none
+            attributes (Dict[str, Any], optional): Attributes to record on the span
+
+        Yields:
+            Optional[Span]: The span to add attributes to, or None if the trace is not sampled
+        """
+        if parent is None:
+            parent = _current_context.get()
+        if parent is None:
+            context = SpanContext(f"{random.getrandbits(128):032x}", f"{random.getrandbits(64):016x}",
+                                  random.random() < self.sample_rate)
+        else:
+            context = SpanContext(parent.trace_id, f"{random.getrandbits(64):016x}", parent.sampled)
+
+        span = None
+        if context.sampled and self.exporter is not None:
+            span = Span(name=name, service=self.service, trace_id=context.trace_id,
+                        span_id=context.span_id, parent_id=parent.span_id if parent else None,
+                        start=time.time(), attributes=dict(attributes or {}))
+        token = _current_context.set(context)
+        try:
+            yield span
+        except BaseException as e:
+            if span is not None:
+                span.status = 'error'
+                span.attributes['error'] = repr(e)
+            raise
+        finally:
+            try:
+                _current_context.reset(token)
+            except ValueError:
+                pass  # Closed from another context, e.g. an abandoned async generator
+            if span is not None:
+                span.end = time.time()
+                self._record(span)
+
+    def current_context(self) -> Optional[SpanContext]:
+        """Get the context of the current span.
+
+        Returns:
+            Optional[SpanContext]: The context, or None outside any span
+        """
+        return _current_context.get()
+
+    def inject(self, carrier: Dict[str, Any]) -> Dict[str, Any]:
+        """Add the current span's context to outgoing headers or an envelope.
+
+        Args:
+            carrier (Dict[str, Any]): Headers or message to add a traceparent to
+
+        Returns:
+            Dict[str, Any]: The same carrier
+        """
+        context = _current_context.get()
+        if context is not None:
+            carrier[TRACEPARENT] = context.traceparent
+        return carrier
+
+    def extract(self, carrier: Optional[Mapping[str, Any]]) -> Optional[SpanContext]:
+        """Read a propagated span context from incoming headers or an envelope.
+
+        Args:
+            carrier (Mapping[str, Any], optional): Anything with a get method holding a traceparent
+
+        Returns:
+            Optional[SpanContext]: The remote parent, or None if there is none
+        """
+        return parse_traceparent(carrier.get(TRACEPARENT)) if carrier is not None else None
+
+    def flush(self) -> None:
+        """Export buffered spans now."""
+        with self._lock:
+            spans, self._buffer = self._buffer, []
+        if spans and self.exporter is not None:
+            try:
+                self.exporter.export(spans)
+            except Exception:
+                self.dropped += len(spans)  # Tracing never fails the traced work
+
+    def get_trace(self, trace_id: str) -> List[Span]:
+        """Read the exported spans of a trace, after exporting this process's buffered spans.
+
+        Args:
+            trace_id (str): ID of the trace
+
+        Returns:
+            List[Span]: Spans of the trace
+        """
+        if self.exporter is None:
+            return []
+        self.flush()
+        return self.exporter.get_trace(trace_id)
+
+    def _record(self, span: Span) -> None:
+        """Buffer a finished span for the background exporter.
+
+        Args:
+            span (Span): Finished span
+        """
+        with self._lock:
+            if len(self._buffer) >= self.max_buffered:
+                self.dropped += 1
+                return
+            self._buffer.append(span)
+            if self._flusher_pid != os.getpid():
+                # Started on first use, and again in a forked worker, which does not inherit threads
+                self._flusher_pid = os.getpid()
+                threading.Thread(target=self._run, name='span-exporter', daemon=True).start()
+
+    def _run(self) -> None:
+        """Export buffered spans every flush_interval."""
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+# Process-wide tracer; services set their name, sample rate and exporter at startup
+tracer = Tracer()
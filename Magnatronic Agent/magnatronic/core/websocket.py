@@ -1,6 +1,7 @@
 from fastapi import WebSocket
 from typing import List, Dict
 from datetime import datetime
+import asyncio
 import json
 
 class AgentWebSocketManager:
@@ -27,6 +28,17 @@ class AgentWebSocketManager:
         }
         await self.broadcast(message)
 
+    def watch_monitoring(self, monitoring):
+        # Push liveness changes as they are detected instead of waiting for a poll
+        def push_status(agent_id: str, status: str):
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                return  # No event loop, so no clients to push to
+            loop.create_task(self.broadcast_agent_status(agent_id, {'status': status}))
+
+        monitoring.subscribe_status(push_status)
+
     async def broadcast_system_metrics(self, metrics: dict):
         message = {
             'type': 'system_metrics',
@@ -89,10 +89,6 @@ const AgentPage = ({ agent, onBack }) => {
               <h2 className="text-xl font-semibold text-[#0066FF] p-4">Performance Metrics</h2>
             </div>
             <div className="p-6 space-y-4">
-              <div className="bg-gray-800 p-4 rounded-lg border-l-4 border-[#0066FF] flex justify-between items-center">
-                <p className="text-sm text-gray-400 font-medium">Total Tasks</p>
-                <p className="text-2xl font-mono text-[#0066FF] tabular-nums">{agentData.task_stats.total_assigned}</p>
-              </div>
               <div className="bg-gray-800 p-4 rounded-lg border-l-4 border-[#FFCC00] flex justify-between items-center">
                 <p className="text-sm text-gray-400 font-medium">Success Rate</p>
                 <p className="text-2xl font-mono text-vibrant-green tabular-nums">{agentData.current_metrics.task_completion_rate}%</p>
@@ -0,0 +1 @@
+"""Load Balancer Simulations for Magnatronic Multi-Agent System"""
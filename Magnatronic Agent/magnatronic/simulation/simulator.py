@@ -0,0 +1,345 @@
+"""Discrete-Event Load Balancer Simulator for Magnatronic Multi-Agent System
+
+Drives LoadBalancer with synthetic or recorded arrival traces against agents
+of different speeds and capability mixes, and reports throughput, latency,
+utilization skew and dispatch CPU cost per selection policy. Run with
+``python -m magnatronic.simulation.simulator``.
+"""
+
+import argparse
+import asyncio
+import csv
+import heapq
+import json
+import random
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from ..core.load_balancer import LoadBalancer
+from ..core.monitoring import MonitoringSystem
+
+@dataclass
+class AgentSpec:
+    """Data class describing a simulated agent"""
+    agent_id: str
+    capabilities: List[str]
+    speed: float = 1.0  # Work units completed per second
+    concurrency: int = 1  # Tasks processed at the same time
+    failure_rate: float = 0.0
+
+@dataclass
+class TaskArrival:
+    """Data class describing one task in an arrival trace"""
+    time: float
+    capabilities: List[str]
+    work: float = 1.0  # Seconds of processing on a speed 1.0 agent
+    task_type: Optional[str] = None
+    affinity_key: Optional[str] = None
+
+@dataclass
+class SimulationReport:
+    """Data class for storing the results of one simulation run"""
+    policy: str
+    completed: int
+    unroutable: int
+    stranded: int  # Tasks still backlogged when the trace ran out
+    throughput: float
+    mean_latency: float
+    p50_latency: float
+    p99_latency: float
+    utilization_skew: float  # Busiest agent's utilization over the mean
+    dispatch_us: float  # Mean CPU time of one find_best_agent call, in microseconds
+    utilization: Dict[str, float] = field(default_factory=dict)
+
+def percentile(values: List[float], pct: float) -> float:
+    """Get a percentile of a list of values by nearest rank.
+
+    Args:
+        values (List[float]): Sample values
+        pct (float): Percentile between 0 and 100
+
+    Returns:
+        float: Value at the requested percentile, or 0.0 for no values
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+def synthetic_trace(arrival_rate: float, num_tasks: int, capability_mix: Dict[Tuple[str, ...], float],
+                    mean_work: float = 1.0, num_keys: int = 0, seed: int = 0) -> List[TaskArrival]:
+    """Generate a Poisson arrival trace with exponentially distributed work.
+
+    Args:
+        arrival_rate (float): Mean tasks per second
+        num_tasks (int): Number of tasks to generate
+        capability_mix (Dict[Tuple[str, ...], float]): Required capability sets mapped to their weights
+        mean_work (float): Mean work per task
+        num_keys (int): Distinct affinity keys to draw from, 0 for none
+        seed (int): Random seed
+
+    Returns:
+        List[TaskArrival]: Tasks in arrival order
+    """
+    rng = random.Random(seed)
+    requirements = list(capability_mix)
+    weights = [capability_mix[requirement] for requirement in requirements]
+    now = 0.0
+    trace = []
+    for _ in range(num_tasks):
+        now += rng.expovariate(arrival_rate)
+        required = rng.choices(requirements, weights)[0]
+        trace.append(TaskArrival(
+            time=now,
+            capabilities=list(required),
+            work=rng.expovariate(1.0 / mean_work),
+            task_type='+'.join(required) or None,
+            affinity_key=f"key-{rng.randrange(num_keys)}" if num_keys else None
+        ))
+    return trace
+
+def load_trace(path: str) -> List[TaskArrival]:
+    """Load a recorded arrival trace.
+
+    JSON Lines files hold one object per task with the TaskArrival fields.
+    CSV files have time, capabilities (separated by ';'), work and task_type columns.
+
+    Args:
+        path (str): Path to a .jsonl or .csv trace file
+
+    Returns:
+        List[TaskArrival]: Tasks in arrival order
+    """
+    trace = []
+    with open(path, newline='') as trace_file:
+        if path.endswith('.csv'):
+            for row in csv.DictReader(trace_file):
+                trace.append(TaskArrival(
+                    time=float(row['time']),
+                    capabilities=[cap for cap in row.get('capabilities', '').split(';') if cap],
+                    work=float(row.get('work') or 1.0),
+                    task_type=row.get('task_type') or None,
+                    affinity_key=row.get('affinity_key') or None
+                ))
+        else:
+            for line in trace_file:
+                if line.strip():
+                    trace.append(TaskArrival(**json.loads(line)))
+    trace.sort(key=lambda task: task.time)
+    return trace
+
+class Simulator:
+    """Discrete-event simulation of gateway replicas dispatching through LoadBalancer"""
+
+    def __init__(self, agents: List[AgentSpec], policy: str, replicas: int = 1,
+                 sync_interval: Optional[float] = None, load_threshold: Optional[float] = None,
+                 seed: int = 0):
+        """Initialize the simulator.
+
+        Args:
+            agents (List[AgentSpec]): Simulated agents
+            policy (str): LoadBalancer selection policy
+            replicas (int): Gateway replicas, each with its own LoadBalancer
+            sync_interval (float, optional): Seconds between in-flight count syncs across
+                replicas. Each replica otherwise only sees its own dispatches.
+            load_threshold (float, optional): Override for the balancer's load threshold
+            seed (int): Random seed
+        """
+        self.agents = {agent.agent_id: agent for agent in agents}
+        self.policy = policy
+        self.replicas = replicas
+        self.sync_interval = sync_interval
+        self.load_threshold = load_threshold
+        self.seed = seed
+
+    async def run(self, trace: List[TaskArrival]) -> SimulationReport:
+        """Replay a trace and measure the outcome.
+
+        Args:
+            trace (List[TaskArrival]): Tasks in arrival order
+
+        Returns:
+            SimulationReport: Throughput, latency, utilization and dispatch cost
+        """
+        rng = random.Random(self.seed)
+        monitoring = MonitoringSystem()
+        await monitoring.update_agent_metrics_batch({
+            agent_id: {'cpu_usage': 0.0, 'memory_usage': 0.0} for agent_id in self.agents
+        })
+        balancers = []
+        for replica in range(self.replicas):
+            balancer = LoadBalancer(monitoring, selection_policy=self.policy, seed=self.seed * 1000 + replica)
+            if self.load_threshold is not None:
+                balancer.load_threshold = self.load_threshold
+            await balancer.refresh_agent_loads({
+                agent_id: agent.capabilities for agent_id, agent in self.agents.items()
+            })
+            balancers.append(balancer)
+
+        in_flight = {agent_id: 0 for agent_id in self.agents}
+        running = {agent_id: 0 for agent_id in self.agents}
+        waiting: Dict[str, deque] = {agent_id: deque() for agent_id in self.agents}
+        busy_time = {agent_id: 0.0 for agent_id in self.agents}
+        backlog: deque = deque()  # Tasks no agent would accept yet
+        latencies: List[float] = []
+        dispatch_ns = 0
+        dispatch_calls = 0
+        unroutable = 0
+
+        events: List = [(task.time, index, 'arrival', index) for index, task in enumerate(trace)]
+        heapq.heapify(events)
+        sequence = len(events)
+        if self.sync_interval and self.replicas > 1:
+            heapq.heappush(events, (self.sync_interval, sequence, 'sync', None))
+            sequence += 1
+        now = 0.0
+
+        def start(agent_id: str, index: int, replica: int) -> None:
+            nonlocal sequence
+            agent = self.agents[agent_id]
+            service = trace[index].work / agent.speed
+            busy_time[agent_id] += service
+            running[agent_id] += 1
+            heapq.heappush(events, (now + service, sequence, 'complete', (agent_id, index, replica, service)))
+            sequence += 1
+
+        async def dispatch(index: int, replica: int) -> bool:
+            nonlocal dispatch_ns, dispatch_calls, unroutable
+            task = trace[index]
+            balancer = balancers[replica]
+            started = time.process_time_ns()
+            agent_id = await balancer.find_best_agent(
+                task.capabilities, task_type=task.task_type, affinity_key=task.affinity_key
+            )
+            dispatch_ns += time.process_time_ns() - started
+            dispatch_calls += 1
+            if agent_id is None:
+                if not balancer.get_capable_agents(task.capabilities):
+                    unroutable += 1
+                    return True
+                return False
+            await balancer.assign_task(agent_id)
+            in_flight[agent_id] += 1
+            if running[agent_id] < self.agents[agent_id].concurrency:
+                start(agent_id, index, replica)
+            else:
+                waiting[agent_id].append((index, replica))
+            return True
+
+        while events:
+            now, _, kind, payload = heapq.heappop(events)
+            if kind == 'arrival':
+                replica = rng.randrange(self.replicas)
+                if not await dispatch(payload, replica):
+                    backlog.append((payload, replica))
+            elif kind == 'complete':
+                agent_id, index, replica, service = payload
+                running[agent_id] -= 1
+                in_flight[agent_id] -= 1
+                latencies.append(now - trace[index].time)
+                success = rng.random() >= self.agents[agent_id].failure_rate
+                await balancers[replica].complete_task(agent_id, duration=service, success=success,
+                                                       task_type=trace[index].task_type)
+                if waiting[agent_id]:
+                    start(agent_id, *waiting[agent_id].popleft())
+                # Freed capacity may let backlogged tasks through, oldest first
+                for _ in range(len(backlog)):
+                    index, replica = backlog.popleft()
+                    if not await dispatch(index, replica):
+                        backlog.appendleft((index, replica))
+                        break
+            elif events:  # Keep syncing only while arrivals or completions are pending
+                for balancer in balancers:
+                    balancer.sync_task_counts(in_flight)
+                heapq.heappush(events, (now + self.sync_interval, sequence, 'sync', None))
+                sequence += 1
+
+        elapsed = max(now, 1e-9)
+        utilization = {agent_id: busy / (elapsed * self.agents[agent_id].concurrency)
+                       for agent_id, busy in busy_time.items()}
+        mean_utilization = sum(utilization.values()) / len(utilization)
+        return SimulationReport(
+            policy=self.policy,
+            completed=len(latencies),
+            unroutable=unroutable,
+            stranded=len(backlog),
+            throughput=len(latencies) / elapsed,
+            mean_latency=sum(latencies) / len(latencies) if latencies else 0.0,
+            p50_latency=percentile(latencies, 50),
+            p99_latency=percentile(latencies, 99),
+            utilization_skew=max(utilization.values()) / mean_utilization if mean_utilization else 0.0,
+            dispatch_us=dispatch_ns / dispatch_calls / 1000 if dispatch_calls else 0.0,
+            utilization=utilization
+        )
+
+def heterogeneous_agents(num_agents: int, seed: int = 0) -> List[AgentSpec]:
+    """Build a mixed fleet: research, creative and NLP agents of varying speed.
+
+    Args:
+        num_agents (int): Number of agents
+        seed (int): Random seed
+
+    Returns:
+        List[AgentSpec]: Agent specifications
+    """
+    rng = random.Random(seed)
+    kinds = [['research', 'analysis'], ['creative', 'content'], ['nlp', 'analysis']]
+    return [
+        AgentSpec(
+            agent_id=f"agent-{i}",
+            capabilities=kinds[i % len(kinds)],
+            speed=rng.choice([0.5, 1.0, 1.0, 2.0]),
+            failure_rate=rng.choice([0.0, 0.0, 0.0, 0.2])
+        )
+        for i in range(num_agents)
+    ]
+
+def print_reports(reports: List[SimulationReport]) -> None:
+    """Print simulation reports as a table.
+
+    Args:
+        reports (List[SimulationReport]): One report per policy
+    """
+    print(f"{'policy':<14}{'done':>8}{'left':>6}{'tput/s':>9}{'mean':>8}{'p50':>8}{'p99':>8}{'skew':>7}{'dispatch us':>13}")
+    for report in reports:
+        print(f"{report.policy:<14}{report.completed:>8}{report.stranded:>6}{report.throughput:>9.2f}"
+              f"{report.mean_latency:>8.2f}{report.p50_latency:>8.2f}{report.p99_latency:>8.2f}{report.utilization_skew:>7.2f}"
+              f"{report.dispatch_us:>13.1f}")
+
+def main() -> None:
+    """Compare selection policies on a synthetic or recorded trace."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--trace', help='Recorded trace (.jsonl or .csv); synthetic if omitted')
+    parser.add_argument('--policies', nargs='+', default=list(LoadBalancer.POLICIES))
+    parser.add_argument('--agents', type=int, default=60)
+    parser.add_argument('--replicas', type=int, default=1)
+    parser.add_argument('--sync-interval', type=float, default=None)
+    parser.add_argument('--utilization', type=float, default=0.8)
+    parser.add_argument('--tasks', type=int, default=20000)
+    parser.add_argument('--keys', type=int, default=0, help='Distinct affinity keys in the synthetic trace')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    agents = heterogeneous_agents(args.agents, args.seed)
+    if args.trace:
+        trace = load_trace(args.trace)
+    else:
+        capacity = sum(agent.speed * agent.concurrency for agent in agents)
+        trace = synthetic_trace(
+            arrival_rate=args.utilization * capacity, num_tasks=args.tasks,
+            capability_mix={('analysis',): 3, ('research',): 1, ('creative',): 1, ('nlp',): 1},
+            num_keys=args.keys, seed=args.seed
+        )
+
+    reports = [
+        asyncio.run(Simulator(agents, policy, replicas=args.replicas, sync_interval=args.sync_interval,
+                              seed=args.seed).run(trace))
+        for policy in args.policies
+    ]
+    print_reports(reports)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1 @@
+"""Tests for the Magnatronic Multi-Agent System"""
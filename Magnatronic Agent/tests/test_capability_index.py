@@ -0,0 +1,66 @@
+"""Tests for the capability bitset index"""
+
+import random
+from magnatronic.core.capability_index import CapabilityIndex
+
+CAPABILITIES = ['nlp', 'vision', 'search', 'code', 'math']
+
+def test_lookup_matches_scan_under_updates_and_removals():
+    rng = random.Random(11)
+    index = CapabilityIndex()
+    agents = {}
+    for step in range(500):
+        agent_id = f"agent-{rng.randrange(60)}"
+        if rng.random() < 0.2:
+            index.remove(agent_id)
+            agents.pop(agent_id, None)
+        else:
+            capabilities = set(rng.sample(CAPABILITIES, rng.randrange(len(CAPABILITIES) + 1)))
+            index.update(agent_id, capabilities)
+            agents[agent_id] = capabilities
+        required = set(rng.sample(CAPABILITIES, rng.randrange(3)))
+        expected = {agent for agent, caps in agents.items() if required <= caps}
+        assert set(index.lookup(required)) == expected
+    assert len(index) == len(agents)
+    for agent_id, capabilities in agents.items():
+        assert index.get_capabilities(agent_id) == capabilities
+
+def test_update_replaces_capabilities():
+    index = CapabilityIndex()
+    index.update('a', ['nlp', 'search'])
+    index.update('a', ['vision'])
+    assert index.lookup(['nlp']) == []
+    assert index.lookup(['vision']) == ['a']
+
+def test_removed_slot_is_reused_without_stale_bits():
+    index = CapabilityIndex()
+    index.update('a', ['nlp'])
+    index.update('b', ['nlp', 'code'])
+    index.remove('a')
+    index.update('c', ['code'])
+    assert 'a' not in index
+    assert index.lookup(['nlp']) == ['b']
+    assert sorted(index.lookup(['code'])) == ['b', 'c']
+    assert sorted(index.lookup([])) == ['b', 'c']
+
+def test_exclusions_and_unknown_capabilities():
+    index = CapabilityIndex()
+    for agent_id in ('a', 'b', 'c'):
+        index.update(agent_id, ['nlp'])
+    assert sorted(index.lookup(['nlp'], exclude_agents=['b', 'missing'])) == ['a', 'c']
+    assert index.lookup(['nlp', 'unknown']) == []
+    assert index.lookup_bits(['unknown']) == 0
+
+def test_sample_picks_distinct_members_of_the_bitset():
+    rng = random.Random(5)
+    index = CapabilityIndex()
+    for i in range(50):
+        index.update(f"agent-{i}", ['nlp'] if i % 5 == 0 else ['code'])
+    bits = index.lookup_bits(['nlp'])
+    members = set(index.agents_in(bits))
+    for _ in range(20):
+        picked = index.sample(bits, 3, rng)
+        assert len(picked) == len(set(picked)) == 3
+        assert set(picked) <= members
+    assert sorted(index.sample(bits, 100, rng)) == sorted(members)
+    assert index.sample(0, 3, rng) == []
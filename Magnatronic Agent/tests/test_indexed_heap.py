@@ -0,0 +1,67 @@
+"""Tests for the indexed priority queue"""
+
+import random
+from magnatronic.core.indexed_heap import IndexedHeap
+
+def drain(heap: IndexedHeap):
+    """Pop every entry in priority order through peek and remove."""
+    order = []
+    while len(heap):
+        key, priority = heap.peek()
+        order.append((priority, key))
+        heap.remove(key)
+    return order
+
+def test_matches_reference_under_random_updates():
+    rng = random.Random(7)
+    heap = IndexedHeap()
+    reference = {}
+    for _ in range(2000):
+        key = f"agent-{rng.randrange(200)}"
+        action = rng.random()
+        if action < 0.6:
+            priority = rng.uniform(0, 100)
+            heap.push(key, priority)
+            reference[key] = priority
+        else:
+            heap.remove(key)
+            reference.pop(key, None)
+        assert len(heap) == len(reference)
+        if reference:
+            assert heap.peek()[1] == min(reference.values())
+    assert all(heap.priority(key) == priority for key, priority in reference.items())
+    assert drain(heap) == sorted((priority, key) for key, priority in reference.items())
+
+def test_push_updates_existing_key_in_both_directions():
+    heap = IndexedHeap()
+    for key, priority in (('a', 5.0), ('b', 3.0), ('c', 4.0)):
+        heap.push(key, priority)
+    heap.push('a', 1.0)
+    assert heap.peek() == ('a', 1.0)
+    heap.push('a', 10.0)
+    assert heap.peek() == ('b', 3.0)
+    assert len(heap) == 3
+    assert drain(heap) == [(3.0, 'b'), (4.0, 'c'), (10.0, 'a')]
+
+def test_remove_missing_key_is_a_no_op():
+    heap = IndexedHeap()
+    heap.push('a', 1.0)
+    heap.remove('missing')
+    assert 'a' in heap and 'missing' not in heap
+    assert heap.priority('missing') is None
+
+def test_iter_smallest_is_ordered_and_leaves_heap_intact():
+    rng = random.Random(3)
+    heap = IndexedHeap()
+    for i in range(100):
+        heap.push(f"k{i}", rng.random())
+    smallest = [priority for _, priority in heap.iter_smallest()]
+    assert smallest == sorted(smallest) and len(smallest) == 100
+    first_five = []
+    for entry in heap.iter_smallest():
+        first_five.append(entry)
+        if len(first_five) == 5:
+            break
+    assert [priority for _, priority in first_five] == smallest[:5]
+    assert len(heap) == 100
+    assert IndexedHeap().peek() is None and list(IndexedHeap().iter_smallest()) == []
@@ -0,0 +1,107 @@
+"""Tests for the metrics ring buffer, cursor paging and rollups"""
+
+import asyncio
+import numpy as np
+from magnatronic.core.metrics_buffer import MetricsRingBuffer, MetricsRollup, bucketize, from_epoch_us
+from magnatronic.core.monitoring import MonitoringSystem
+
+MINUTE = 60_000_000
+BASE = 28_333_333 * MINUTE  # Epoch microseconds, on a bucket boundary
+
+def filled_buffer(capacity: int, samples: int, repeat: int = 1) -> MetricsRingBuffer:
+    """Build a buffer of samples whose 'value' is their sequence number.
+
+    Args:
+        capacity (int): Buffer capacity
+        samples (int): Samples to append
+        repeat (int): Consecutive samples sharing each timestamp
+    """
+    buffer = MetricsRingBuffer(capacity, ['value'])
+    for i in range(samples):
+        buffer.append(BASE + (i // repeat) * 1000, {'value': float(i)})
+    return buffer
+
+def test_ring_buffer_keeps_the_newest_samples_in_order():
+    buffer = filled_buffer(capacity=8, samples=13)
+    assert len(buffer) == 8
+    assert buffer.column('value').tolist() == [float(i) for i in range(5, 13)]
+    assert buffer.timestamps().tolist() == [BASE + i * 1000 for i in range(5, 13)]
+    assert not buffer.covers(BASE + 4000) and buffer.covers(BASE + 5000)
+
+def test_ring_buffer_windows_across_the_wrap():
+    buffer = filled_buffer(capacity=8, samples=13)
+    window = buffer.column('value', start=BASE + 6000, end=BASE + 11000)
+    assert window.tolist() == [6.0, 7.0, 8.0, 9.0, 10.0]
+    assert buffer.count(start=BASE + 11000) == 2
+    timestamps, columns, has_more = buffer.select(start=BASE + 6000, skip=2, limit=3)
+    assert columns['value'].tolist() == [8.0, 9.0, 10.0] and has_more
+    assert buffer.aggregate('value')['max'] == 12.0
+
+def test_missing_and_new_metrics_are_nan_filled():
+    buffer = MetricsRingBuffer(4, ['a'])
+    buffer.append(BASE, {'a': 1.0})
+    buffer.append(BASE + 1, {'b': 2.0, 'label': 'ignored'})
+    assert np.isnan(buffer.column('a')[1]) and np.isnan(buffer.column('b')[0])
+    assert buffer.to_records()[1]['metrics'] == {'b': 2.0}
+    assert 'label' not in buffer.fields
+
+def page_through(monitoring: MonitoringSystem, limit: int, **query):
+    """Collect every page of an agent's history, following next_cursor."""
+    values, cursor, pages = [], None, 0
+    while True:
+        page = asyncio.run(monitoring.query_agent_metrics('agent', limit=limit, cursor=cursor, **query))
+        values.extend(point['metrics']['value'] for point in page['points'])
+        pages += 1
+        cursor = page['next_cursor']
+        if cursor is None:
+            return values, pages
+
+def test_cursor_pages_cover_every_sample_once_across_repeated_timestamps():
+    monitoring = MonitoringSystem()
+    # Three samples per timestamp, so pages of four split runs of equal timestamps
+    monitoring.metrics_history['agent'] = filled_buffer(capacity=20, samples=30, repeat=3)
+    for limit in (1, 2, 4, 5, 7, 100):
+        values, pages = page_through(monitoring, limit)
+        assert values == [float(i) for i in range(10, 30)], limit
+        assert pages == max(1, -(-20 // limit)), limit
+
+def test_cursor_pages_respect_the_time_range():
+    monitoring = MonitoringSystem()
+    monitoring.metrics_history['agent'] = filled_buffer(capacity=50, samples=30, repeat=3)
+    start, end = from_epoch_us(BASE + 4000), from_epoch_us(BASE + 8000)
+    values, _ = page_through(monitoring, 4, start=start, end=end)
+    assert values == [float(i) for i in range(12, 24)]
+
+def test_rollup_matches_bucketized_samples():
+    rng = np.random.default_rng(6)
+    timestamps = BASE + np.cumsum(rng.integers(1, 40_000_000, size=3000))
+    values = rng.normal(50, 10, size=timestamps.size)
+    rollup = MetricsRollup(MINUTE, capacity=5000, fields=['cpu'])
+    for timestamp, value in zip(timestamps.tolist(), values.tolist()):
+        rollup.append(timestamp, {'cpu': value})
+    expected = bucketize(timestamps, values, MINUTE)
+    buckets = rollup.buckets('cpu')
+    assert np.array_equal(buckets['timestamp'], expected['timestamp'])
+    for statistic in ('min', 'max', 'avg', 'count'):
+        assert np.allclose(buckets[statistic], expected[statistic]), statistic
+
+def test_rollup_overwrites_the_oldest_buckets_once_full():
+    rollup = MetricsRollup(MINUTE, capacity=40)
+    for minute in range(100):
+        rollup.append(BASE + minute * MINUTE + 1, {'cpu': float(minute)})
+    buckets = rollup.buckets('cpu')
+    assert len(rollup) == 40
+    assert buckets['avg'].tolist() == [float(minute) for minute in range(60, 100)]
+    assert rollup.covers(BASE + 60 * MINUTE) and not rollup.covers(BASE + 59 * MINUTE)
+    assert rollup.count(start=BASE + 90 * MINUTE) == 10
+    window = rollup.buckets('cpu', start=BASE + 70 * MINUTE, end=BASE + 75 * MINUTE)
+    assert window['avg'].tolist() == [70.0, 71.0, 72.0, 73.0, 74.0]
+
+def test_rollup_allocates_buckets_as_they_are_opened():
+    rollup = MetricsRollup(MINUTE, capacity=1500, fields=['cpu', 'memory'])
+    per_bucket = rollup.nbytes // MetricsRollup.INITIAL_BUCKETS
+    for minute in range(100):
+        rollup.append(BASE + minute * MINUTE, {'cpu': 1.0})
+    assert rollup.nbytes == 128 * per_bucket  # Doubled from 16 until 100 buckets fit
+    assert np.isnan(rollup.buckets('memory')['avg']).all()
+    assert rollup.buckets('cpu')['count'].sum() == 100
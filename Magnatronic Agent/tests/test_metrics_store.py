@@ -0,0 +1,99 @@
+"""Tests for the durable metrics store"""
+
+import os
+import numpy as np
+import pytest
+from magnatronic.core.metrics_store import MetricsStore, MetricsStoreLocked
+
+FIELDS = ['cpu_usage', 'memory_usage']
+BASE = 1_700_000_000_000_000  # Epoch microseconds
+SECOND = 1_000_000
+
+def segments(directory: str):
+    """Names of the segment files in a store directory."""
+    return sorted(name for name in os.listdir(directory) if name.endswith('.dat'))
+
+def fill(store: MetricsStore, agents, samples: int, start: int = BASE) -> None:
+    """Append one sample per agent per second, with cpu_usage set to the sample number."""
+    for i in range(samples):
+        for agent_id in agents:
+            store.append(agent_id, start + i * SECOND, {'cpu_usage': float(i)})
+        store.flush()
+
+def test_select_reads_back_samples_and_pages(tmp_path):
+    store = MetricsStore(str(tmp_path), FIELDS, segment_records=8)
+    fill(store, ['a', 'b'], 20)
+    timestamps, columns, has_more = store.select('a')
+    assert timestamps.tolist() == [BASE + i * SECOND for i in range(20)] and not has_more
+    assert columns['cpu_usage'].tolist() == [float(i) for i in range(20)]
+    assert np.isnan(columns['memory_usage']).all()
+    _, page, has_more = store.select('b', start=BASE + 5 * SECOND, skip=2, limit=4)
+    assert page['cpu_usage'].tolist() == [7.0, 8.0, 9.0, 10.0] and has_more
+    assert 'c' not in store and store.select('c')[0].size == 0
+    store.close()
+
+def test_compaction_merges_small_segments_and_drops_expired_ones(tmp_path):
+    store = MetricsStore(str(tmp_path), FIELDS, segment_records=4)
+    fill(store, ['a'], 8)  # Two segments, far in the past
+    later = BASE + 1000 * SECOND
+    fill(store, ['a'], 12, start=later)
+    store.close()
+    assert len(segments(str(tmp_path))) == 5
+
+    # Reopened with larger segments, so the existing ones are small enough to merge
+    reopened = MetricsStore(str(tmp_path), FIELDS, segment_records=16, retention=100)
+    reopened.compact(now=(later + 60 * SECOND) / SECOND)
+    # The oldest segment ends before the cutoff; the next holds records up to the later run
+    assert len(segments(str(tmp_path))) == 2
+    timestamps, columns, _ = reopened.select('a')
+    assert timestamps.tolist() == ([BASE + i * SECOND for i in range(4, 8)] +
+                                   [later + i * SECOND for i in range(12)])
+    assert not [name for name in os.listdir(tmp_path) if name.endswith('.compact')]
+    fill(reopened, ['a'], 1, start=later + 12 * SECOND)
+    assert reopened.select('a', start=later)[0].size == 13
+    reopened.close()
+
+def test_reopened_store_keeps_history_and_appends(tmp_path):
+    store = MetricsStore(str(tmp_path), FIELDS, segment_records=8)
+    fill(store, ['a', 'b'], 10)
+    store.append('a', BASE + 10 * SECOND, {'cpu_usage': 10.0})
+    store.close()  # Flushes the buffered sample
+
+    reopened = MetricsStore(str(tmp_path), FIELDS, segment_records=8)
+    assert 'a' in reopened and 'b' in reopened
+    reopened.append('c', BASE + 11 * SECOND, {'cpu_usage': 1.0})
+    reopened.append('a', BASE + 11 * SECOND, {'cpu_usage': 11.0})
+    _, columns, _ = reopened.select('a')
+    assert columns['cpu_usage'].tolist() == [float(i) for i in range(12)]
+    assert reopened.select('b')[0].size == 10
+    assert reopened.select('c')[1]['cpu_usage'].tolist() == [1.0]
+    reopened.close()
+
+def test_partial_record_is_dropped_on_restart(tmp_path):
+    store = MetricsStore(str(tmp_path), FIELDS)
+    fill(store, ['a'], 3)
+    store.close()
+    with open(os.path.join(tmp_path, segments(str(tmp_path))[-1]), 'ab') as segment:
+        segment.write(b'\x01\x02\x03')  # A write interrupted mid-record
+    reopened = MetricsStore(str(tmp_path), FIELDS)
+    fill(reopened, ['a'], 1, start=BASE + 3 * SECOND)
+    assert reopened.select('a')[1]['cpu_usage'].tolist() == [0.0, 1.0, 2.0, 0.0]
+    reopened.close()
+
+def test_directory_has_a_single_writer(tmp_path):
+    first = MetricsStore.claim(str(tmp_path), FIELDS)
+    with pytest.raises(MetricsStoreLocked):
+        MetricsStore(first.directory, FIELDS)
+    second = MetricsStore.claim(str(tmp_path), FIELDS)
+    assert second.directory != first.directory
+    first.close()
+    assert MetricsStore.claim(str(tmp_path), FIELDS).directory == first.directory
+    second.close()
+
+def test_reopening_with_different_fields_is_refused(tmp_path):
+    store = MetricsStore(str(tmp_path), FIELDS)
+    fill(store, ['a'], 1)
+    store.close()
+    with pytest.raises(ValueError):
+        MetricsStore(str(tmp_path), ['other'])
+    MetricsStore(str(tmp_path), FIELDS).close()  # The refused open released its lock
@@ -0,0 +1,61 @@
+"""Tests for the latency quantile sketch"""
+
+import random
+import numpy as np
+import pytest
+from magnatronic.core.quantiles import LatencySketch
+
+QUANTILES = (0.5, 0.9, 0.95, 0.99)
+
+def assert_within_accuracy(sketch: LatencySketch, values: np.ndarray, accuracy: float) -> None:
+    """Check every tested quantile against the exact order statistic at the same rank."""
+    ordered = np.sort(values)
+    for q in QUANTILES:
+        exact = ordered[int(q * (len(ordered) - 1))]
+        assert abs(sketch.quantile(q) - exact) <= accuracy * exact
+
+@pytest.mark.parametrize('accuracy', [0.01, 0.05])
+def test_quantiles_within_relative_accuracy(accuracy):
+    rng = np.random.default_rng(1)
+    values = rng.lognormal(mean=-3, sigma=1.5, size=20000)
+    sketch = LatencySketch(relative_accuracy=accuracy)
+    for value in values:
+        sketch.add(float(value))
+    assert sketch.count == values.size
+    assert sketch.mean == pytest.approx(values.mean())
+    assert_within_accuracy(sketch, values, accuracy)
+
+def test_merge_equals_a_sketch_of_all_values():
+    rng = random.Random(4)
+    parts = [[rng.paretovariate(1.5) for _ in range(3000)] for _ in range(3)]
+    merged = LatencySketch()
+    for part in parts:
+        sketch = LatencySketch()
+        for value in part:
+            sketch.add(value)
+        merged.merge(sketch)
+    whole = LatencySketch()
+    for value in (value for part in parts for value in part):
+        whole.add(value)
+    assert merged.bins == whole.bins and merged.count == whole.count
+    assert_within_accuracy(merged, np.array([v for part in parts for v in part]), 0.01)
+
+def test_merge_rejects_different_accuracy():
+    with pytest.raises(ValueError):
+        LatencySketch(0.01).merge(LatencySketch(0.02))
+
+def test_round_trips_through_fields():
+    sketch = LatencySketch()
+    for value in (0.0, 0.002, 0.5, 1.5, 30.0):
+        sketch.add(value)
+    restored = LatencySketch.from_fields(sketch.to_fields())
+    assert restored.count == sketch.count and restored.bins == sketch.bins
+    assert restored.quantile(0.5) == sketch.quantile(0.5)
+
+def test_empty_and_zero_values():
+    sketch = LatencySketch()
+    assert sketch.quantile(0.5) is None and sketch.mean is None
+    sketch.add(0.0, count=3)
+    sketch.add(1.0)
+    assert sketch.quantile(0.5) == 0.0
+    assert sketch.quantile(1.0) == pytest.approx(1.0, rel=0.01)
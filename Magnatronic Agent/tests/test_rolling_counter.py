@@ -0,0 +1,43 @@
+"""Tests for the rolling event counter"""
+
+import random
+from magnatronic.core.rolling_counter import EventRateTracker, RateThreshold, RollingCounter
+
+def test_counts_events_in_the_sliding_window():
+    counter = RollingCounter(window=10, bucket=1)
+    counter.add(100.0)
+    counter.add(105.5, 2)
+    assert counter.count() == 3
+    assert counter.count(109.9) == 3
+    assert counter.count(110.0) == 2  # The bucket at 100 slid out
+    assert counter.count(116.0) == 0
+    assert counter.rate() == 0.0
+
+def test_events_older_than_the_window_are_ignored():
+    counter = RollingCounter(window=5, bucket=1)
+    counter.add(50.0)
+    assert counter.add(44.0) == 1
+    assert counter.add(46.0) == 2  # Still inside the window ending at 50
+
+def test_matches_reference_over_random_events():
+    rng = random.Random(9)
+    counter = RollingCounter(window=30, bucket=1)
+    events = []
+    now = 0.0
+    for _ in range(1000):
+        now += rng.expovariate(2.0) * rng.choice([1, 1, 1, 40])
+        counter.add(now)
+        events.append(now)
+        newest_bucket = int(now)
+        expected = sum(1 for event in events if int(event) > newest_bucket - 30)
+        assert counter.count() == expected
+
+def test_thresholds_fire_once_until_the_rate_falls_back():
+    threshold = RateThreshold('login_failed', window=60, limit=3)
+    tracker = EventRateTracker(windows=(60,), thresholds=[threshold])
+    fired = [tracker.record('login_failed', 1000.0 + i) for i in range(6)]
+    assert [len(alerts) for alerts in fired] == [0, 0, 0, 1, 0, 0]
+    assert fired[3] == [(threshold, 4)]
+    assert tracker.record('login_failed', 2000.0) == []
+    assert [len(tracker.record('login_failed', 2001.0)) for _ in range(3)] == [0, 0, 1]
+    assert tracker.snapshot() == {'login_failed': {60: 4}}
@@ -0,0 +1,54 @@
+"""Tests for the hashed timing wheel"""
+
+import random
+from magnatronic.core.timing_wheel import TimingWheel
+
+def test_keys_expire_on_the_tick_their_deadline_falls_in():
+    wheel = TimingWheel(tick=1.0, slots=8, start=0.0)
+    wheel.schedule('a', 2.5)
+    wheel.schedule('b', 3.0)
+    assert wheel.deadline('a') == 3.0
+    assert wheel.advance(2.9) == []
+    assert sorted(wheel.advance(3.0)) == ['a', 'b']
+    assert len(wheel) == 0 and 'a' not in wheel
+
+def test_deadlines_beyond_one_revolution_wait_for_their_turn():
+    wheel = TimingWheel(tick=1.0, slots=4, start=0.0)
+    wheel.schedule('far', 10.0)
+    for now in range(1, 10):
+        assert wheel.advance(now) == []
+    assert wheel.advance(10.0) == ['far']
+
+def test_reschedule_and_cancel():
+    wheel = TimingWheel(tick=1.0, slots=16, start=0.0)
+    wheel.schedule('a', 2.0)
+    wheel.schedule('a', 5.0)
+    wheel.schedule('b', 3.0)
+    wheel.cancel('b')
+    wheel.cancel('missing')
+    assert wheel.advance(4.0) == []
+    assert wheel.advance(5.0) == ['a']
+
+def test_past_deadlines_expire_on_the_next_tick():
+    wheel = TimingWheel(tick=1.0, slots=8, start=10.0)
+    wheel.schedule('late', 3.0)
+    assert wheel.advance(10.5) == []
+    assert wheel.advance(11.0) == ['late']
+
+def test_matches_reference_with_large_jumps():
+    rng = random.Random(2)
+    wheel = TimingWheel(tick=0.5, slots=32, start=0.0)
+    deadlines = {}
+    now = 0.0
+    for _ in range(300):
+        key = f"k{rng.randrange(40)}"
+        deadline = now + rng.uniform(0, 40)
+        wheel.schedule(key, deadline)
+        deadlines[key] = wheel.deadline(key)
+        now += rng.choice([0.1, 0.7, 3.0, 25.0])
+        expired = set(wheel.advance(now))
+        due = {key for key, tick_deadline in deadlines.items() if tick_deadline <= now}
+        assert expired == due
+        for key in due:
+            del deadlines[key]
+        assert len(wheel) == len(deadlines)